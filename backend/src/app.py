@@ -1,8 +1,15 @@
 from fastapi import FastAPI,WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from .routes import Dashboard, streaks, users, resources, groups, study_sessions, notifications, notifications_ws, messages, activity, communities, audio_video_call
-from .routes import chatbot, documents, friends
+from .routes import chatbot, documents, friends, search, storage, fake_llm
 from .routes.project import projects, team_members, tasks, time_logs, invitations
+from .services.progress_ingest_service import progress_ingestor
+from .services import pdf_extraction_service
+from .services.summary_service import summary_jobs
+from .services.llm_gateway import llm_gateway
+from .services.object_store import OBJECT_STORE, UPLOAD_MAX_SIZE_MB, LOCAL_STORAGE_DIR
+from .middleware import UploadSizeLimitMiddleware
 import os
 from dotenv import load_dotenv
 
@@ -13,6 +20,10 @@ app = FastAPI(
     redirect_slashes=False 
 )
 
+# Reject oversized uploads while the body streams in, not after it's spooled
+# (added before CORS so 413s still carry CORS headers)
+app.add_middleware(UploadSizeLimitMiddleware, max_body_bytes=UPLOAD_MAX_SIZE_MB * 1024 * 1024)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", 
@@ -22,9 +33,15 @@ app.add_middleware(
                    ], # In production, specify exact origins
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"]  # keyset cursor of paged array responses (GET /groups)
 )
 
+if OBJECT_STORE == "local":
+    # Serve files written by LocalObjectStore
+    os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount("/storage", StaticFiles(directory=LOCAL_STORAGE_DIR), name="storage")
+
 
 # Include routers
 app.include_router(Dashboard.router, prefix="/api")
@@ -48,6 +65,15 @@ app.include_router(invitations.router, prefix="/api")
 app.include_router(communities.router, prefix="/api")
 app.include_router(friends.router, prefix="/api")
 app.include_router(messages.chat_router, prefix = "/api")
+app.include_router(search.router, prefix="/api")
+
+if OBJECT_STORE == "local":
+    # Mock storage endpoint for direct uploads
+    app.include_router(storage.router, prefix="/api")
+
+if os.getenv("FAKE_LLM_SERVER", "false").lower() == "true":
+    # Mock OpenAI-compatible LLM for offline chatbot development
+    app.include_router(fake_llm.router, prefix="/api")
 
 
 
@@ -63,3 +89,15 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+@app.on_event("shutdown")
+async def flush_buffered_progress():
+    # Don't lose buffered page turns on a graceful restart
+    await progress_ingestor.flush()
+
+
+@app.on_event("shutdown")
+async def stop_pdf_extraction():
+    await summary_jobs.shutdown()
+    await pdf_extraction_service.shutdown()
+    await llm_gateway.shutdown()
@@ -5,7 +5,9 @@ from datetime import datetime, date
 from .database import Base
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column, relationship
-from sqlalchemy import ForeignKey, func, PrimaryKeyConstraint, Boolean, Enum, UniqueConstraint, Text, Integer, DateTime, String, Numeric, Text, Index
+from sqlalchemy import ForeignKey, func, PrimaryKeyConstraint, Boolean, Enum, UniqueConstraint, Text, Integer, DateTime, String, Numeric, Text, Index, LargeBinary
+from sqlalchemy import Computed, DDL, event, text as sql_text  # `text` is also a Posts column
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 class GroupRole(enum.Enum):
     LEADER="leader" #Can have multiple leaders in shared group
@@ -44,6 +46,32 @@ class MessageType(enum.Enum):
     IMAGE="image"
     TEXT = "text"
 
+# ============================================================
+# FULL-TEXT SEARCH
+# ============================================================
+# Searchable tables carry a `search_vector` generated column, so Postgres
+# keeps it in sync on every INSERT/UPDATE without any service-layer code.
+# Title-like fields get weight A, body fields weight B (used by ts_rank_cd).
+# deferred=True keeps the vector out of normal SELECTs.
+
+def _search_vector(title_col: str, body_col: str):
+    return mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('english', coalesce({title_col}, '')), 'A') || "
+            f"setweight(to_tsvector('english', coalesce({body_col}, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
+# Trigram indexes (index-backed ILIKE '%q%' on names/titles) need pg_trgm
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
 # ============================================================
 # ENUMS — Project Tracker
 # ============================================================
@@ -172,11 +200,24 @@ class Groups(Base):
     # For private groups
     invite_code: Mapped[str | None] = mapped_column(unique=True, index=True)
     max_members: Mapped[int | None]  # Optional capacity limit
+    # Accepted members; kept in step by group_service on every join/leave
+    member_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
 
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime] = mapped_column(default=func.now())
     updated_at: Mapped[datetime] = mapped_column(default=func.now(), onupdate=func.now())
 
+    search_vector: Mapped[str | None] = _search_vector("group_name", "description")
+
+    __table_args__ = (
+        Index('ix_groups_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_groups_group_name_trgm', 'group_name',
+              postgresql_using='gin', postgresql_ops={'group_name': 'gin_trgm_ops'}),
+        # Keyset paging of the public discovery listing
+        Index('ix_groups_discovery_keyset', 'created_at', 'id',
+              postgresql_where=sql_text("is_active AND visibility = 'PUBLIC'")),
+    )
+
 class Groupings(Base):
     """
     User-Group membership with roles and invitation tracking
@@ -202,6 +243,8 @@ class Groupings(Base):
 
     __table_args__ = (
         PrimaryKeyConstraint('user_id', 'group_id'),
+        # Keyset paging of a user's joined groups, newest membership first
+        Index('ix_groupings_user_joined_keyset', 'user_id', 'joined_at', 'group_id'),
     )
 
 class GroupInvitations(Base):
@@ -228,6 +271,49 @@ class GroupInvitations(Base):
     responded_at: Mapped[datetime | None]
 
 
+class StoredBlobs(Base):
+    """
+    Content-addressed storage objects
+
+    One row per distinct file content (sha256), shared by every resource
+    uploaded with the same bytes. ref_count is the number of Resources rows
+    pointing at it; the storage object is removed when it drops to zero.
+    """
+    __tablename__ = 'stored_blobs'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    content_hash: Mapped[str] = mapped_column(String(64), unique=True)  # sha256 hex
+    storage_key: Mapped[str]
+    url: Mapped[str]
+    size: Mapped[int]  # bytes
+    content_type: Mapped[str | None]
+    storage: Mapped[str | None] = mapped_column(Text)  # JSON: backend details for delete()
+    ref_count: Mapped[int] = mapped_column(Integer, default=1, server_default='1')
+    created_at: Mapped[datetime] = mapped_column(default=func.now())
+
+
+class DirectUploads(Base):
+    """
+    Tickets issued for direct-to-storage uploads (upload_service)
+
+    One row per ticket, shared by every worker: completion stamps
+    completed_at with a conditional UPDATE, so a retried completion can't
+    create a second resource, and tickets never completed can have their
+    storage objects removed once they expire.
+    """
+    __tablename__ = 'direct_uploads'
+
+    storage_key: Mapped[str] = mapped_column(primary_key=True)
+    user_id: Mapped[str] = mapped_column(ForeignKey('users.user_id'))
+    storage: Mapped[str | None] = mapped_column(Text)  # JSON: backend details for stat()/delete()
+
+    resource_id: Mapped[int | None] = mapped_column(ForeignKey('resources.id', ondelete='SET NULL'))
+    completed_at: Mapped[datetime | None]
+
+    created_at: Mapped[datetime] = mapped_column(default=func.now())
+    expires_at: Mapped[datetime] = mapped_column(index=True)
+
+
 class Resources(Base):
     """
     Resources shared within groups
@@ -251,11 +337,89 @@ class Resources(Base):
     
     file_size: Mapped[int | None]  # bytes
     total_pages: Mapped[int | None]
+    # Shared storage object (NULL for links, folders and pre-dedup uploads)
+    blob_id: Mapped[int | None] = mapped_column(ForeignKey('stored_blobs.id'), index=True)
     is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
     
     created_at: Mapped[datetime] = mapped_column(default=func.now())
     updated_at: Mapped[datetime] = mapped_column(default=func.now(), onupdate=func.now())
+
+    search_vector: Mapped[str | None] = _search_vector("title", "description")
+
+    __table_args__ = (
+        Index('ix_resources_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_resources_title_trgm', 'title',
+              postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+        # "Everything I can see" = my personal rows + my groups' rows
+        Index('ix_resources_owner_live', 'uploaded_by', 'created_at',
+              postgresql_where=sql_text('is_deleted = false')),
+        Index('ix_resources_group_live', 'group_id', 'created_at',
+              postgresql_where=sql_text('is_deleted = false')),
+    )
     
+class ResourceExtractions(Base):
+    """
+    Text extracted from a resource's PDF, keyed by (resource, sha256 of
+    the file) so a re-upload with different bytes gets a fresh row
+    """
+    __tablename__ = 'resource_extractions'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    resource_id: Mapped[int] = mapped_column(ForeignKey('resources.id'))
+    content_hash: Mapped[str] = mapped_column(String(64), index=True)
+
+    page_count: Mapped[int]
+    # Per-page text as a JSON list (same Text-as-JSON pattern as Posts.type_data);
+    # at most EXTRACTION_MAX_PAGES entries
+    pages: Mapped[str] = mapped_column(Text)
+
+    created_at: Mapped[datetime] = mapped_column(default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('resource_id', 'content_hash', name='uq_resource_extractions_resource_hash'),
+    )
+
+
+class ResourceSummaries(Base):
+    """
+    Cached LLM summaries, keyed by (resource, sha256 of the file, prompt
+    version): changed bytes or a new prompt both miss the cache
+    """
+    __tablename__ = 'resource_summaries'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    resource_id: Mapped[int] = mapped_column(ForeignKey('resources.id'))
+    content_hash: Mapped[str] = mapped_column(String(64))
+    prompt_version: Mapped[str] = mapped_column(String(32))
+
+    model: Mapped[str]
+    summary: Mapped[str] = mapped_column(Text)
+
+    created_at: Mapped[datetime] = mapped_column(default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('resource_id', 'content_hash', 'prompt_version', name='uq_resource_summaries_key'),
+    )
+
+
+class SummaryChunks(Base):
+    """
+    Cached summary of one piece of a long document (map step) or of a
+    group of piece summaries (reduce step). Keyed by a hash of the exact
+    prompt and model, not by resource, so an edited PDF reuses every chunk
+    whose text didn't change -- as does any other copy of the same text
+    """
+    __tablename__ = 'summary_chunks'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    chunk_hash: Mapped[str] = mapped_column(String(64), unique=True)
+
+    model: Mapped[str]
+    summary: Mapped[str] = mapped_column(Text)
+
+    created_at: Mapped[datetime] = mapped_column(default=func.now())
+
+
 class ResourceProgress(Base):
     """
     Page-based progress tracking for PDFs and documents
@@ -292,6 +456,11 @@ class ResourceProgress(Base):
     
     created_at: Mapped[datetime] = mapped_column(default=func.now())
 
+    __table_args__ = (
+        # One progress row per (user, resource); also the index for per-user scans
+        UniqueConstraint('user_id', 'resource_id', name='uq_resource_progress_user_resource'),
+    )
+
 class StudySessions(Base):
     """
     NEW TABLE (replaces TimeSpends): Track study sessions with group context
@@ -445,15 +614,30 @@ class Document(Base):
     created_at: Mapped[datetime] = mapped_column(default=func.now())
     updated_at: Mapped[datetime] = mapped_column(default=func.now(), onupdate=func.now())
 
+    # to_tsvector's parser skips HTML tags, so the raw editor content is fine here
+    search_vector: Mapped[str | None] = _search_vector("title", "content")
+
+    __table_args__ = (
+        Index('ix_documents_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
 
 class DocumentVersion(Base):
-    """History of saved document revisions."""
+    """
+    History of saved document revisions.
+
+    Delta-compressed (see services/document_version_store.py): snapshot
+    rows keep the full text in `content`; every other row keeps only a
+    zlib-compressed reverse diff in `delta` against the next version.
+    """
     __tablename__ = 'document_versions'
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     document_id: Mapped[int] = mapped_column(ForeignKey('documents.id'), index=True)
     version_number: Mapped[int] = mapped_column(index=True)
-    content: Mapped[str]
+    content: Mapped[str | None]  # full text, snapshots only
+    delta: Mapped[bytes | None] = mapped_column(LargeBinary)  # reverse diff, non-snapshots only
+    is_snapshot: Mapped[bool] = mapped_column(Boolean, default=True)
     change_summary: Mapped[str | None]
     created_by: Mapped[str] = mapped_column(ForeignKey('users.user_id'))
     created_at: Mapped[datetime] = mapped_column(default=func.now())
@@ -793,6 +977,19 @@ class Posts(Base):
     created_at: Mapped[datetime] = mapped_column(default=func.now(), index=True)
     updated_at: Mapped[datetime] = mapped_column(default=func.now(), onupdate=func.now())
 
+    search_vector: Mapped[str | None] = _search_vector("title", "text")
+
+    __table_args__ = (
+        Index('ix_posts_search_vector', 'search_vector', postgresql_using='gin'),
+        # Keyset feed pagination on (created_at, id), live posts only
+        Index('ix_posts_feed_keyset', 'created_at', 'id',
+              postgresql_where=sql_text('is_deleted = false')),
+        Index('ix_posts_group_feed_keyset', 'group_id', 'created_at', 'id',
+              postgresql_where=sql_text('is_deleted = false')),
+        Index('ix_posts_type_feed_keyset', 'post_type', 'created_at', 'id',
+              postgresql_where=sql_text('is_deleted = false')),
+    )
+
 class PostLikes(Base):
     """
     Toggle table for likes/upvotes. One row = one user has liked/
@@ -844,4 +1041,51 @@ class PostComments(Base):
     is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
 
     created_at: Mapped[datetime] = mapped_column(default=func.now(), index=True)
-    updated_at: Mapped[datetime] = mapped_column(default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at: Mapped[datetime] = mapped_column(default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Keyset paging of a post's top-level comments and of one comment's replies
+        Index('ix_post_comments_thread_keyset', 'post_id', 'created_at', 'id',
+              postgresql_where=sql_text('parent_comment_id IS NULL AND is_deleted = false')),
+        Index('ix_post_comments_replies_keyset', 'parent_comment_id', 'created_at', 'id',
+              postgresql_where=sql_text('is_deleted = false')),
+    )
+
+class TimelineEntries(Base):
+    """
+    Fan-out-on-write home timeline. When a post is created, one row is
+    pushed here for every reader who should see it (group members for
+    group posts, the author's friends for public posts), so reading
+    "posts from my groups and friends" is a single keyset scan on
+    (user_id, created_at, post_id) instead of joins through Groupings
+    and Friends. `created_at` is copied from the post so the scan never
+    has to touch `posts`. Bounded per user by timeline_service.
+    """
+    __tablename__ = 'timeline_entries'
+
+    user_id: Mapped[str] = mapped_column(ForeignKey('users.user_id'))
+    post_id: Mapped[int] = mapped_column(ForeignKey('posts.id'))
+
+    created_at: Mapped[datetime]
+
+    __table_args__ = (
+        PrimaryKeyConstraint('user_id', 'post_id'),
+        Index('ix_timeline_entries_user_keyset', 'user_id', 'created_at', 'post_id'),
+    )
+
+class ContributorStats(Base):
+    """
+    Running per-user contribution counters for the community sidebar
+    ("top contributors"). Bumped by community_service whenever a post or
+    comment is created or deleted, so the leaderboard is an index scan on
+    `contributions` instead of GROUP BYs over posts and post_comments.
+    Kept exact by those bumps alone: init_db creates it empty alongside
+    empty posts/comments, so there is no history to backfill.
+    """
+    __tablename__ = 'contributor_stats'
+
+    user_id: Mapped[str] = mapped_column(ForeignKey('users.user_id'), primary_key=True)
+
+    post_count: Mapped[int] = mapped_column(Integer, default=0)
+    comment_count: Mapped[int] = mapped_column(Integer, default=0)
+    contributions: Mapped[int] = mapped_column(Integer, default=0, index=True)  # posts + comments
@@ -0,0 +1,80 @@
+"""
+ASGI middleware.
+
+UploadSizeLimitMiddleware caps request bodies on upload endpoints while
+they stream in. Without it, Starlette spools the whole multipart body to
+a temp file before the route runs, so a 2 GB upload is only rejected
+after all 2 GB arrived.
+    - a Content-Length over the limit is refused with 413 before reading
+    - otherwise bytes are counted as they arrive; once over the limit the
+      body is cut off and the client gets 413
+"""
+
+import json
+
+# Multipart framing (boundaries, part headers, other form fields) on top of the file
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    def __init__(self, app, max_body_bytes: int, path_suffixes=("/upload",)):
+        self.app = app
+        self.max_body_bytes = max_body_bytes + MULTIPART_OVERHEAD_BYTES
+        self.path_suffixes = tuple(path_suffixes)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("POST", "PUT")
+            or not scope["path"].rstrip("/").endswith(self.path_suffixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        tripped = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, tripped
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    tripped = True
+                    # Looks like a disconnect to the form parser: stops spooling
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if tripped and not response_started:
+                # Swallow the app's parse-error response; we answer 413 below
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+        if tripped and not response_started:
+            await self._reject(send)
+
+    async def _reject(self, send):
+        limit_mb = (self.max_body_bytes - MULTIPART_OVERHEAD_BYTES) // (1024 * 1024)
+        body = json.dumps({"detail": f"File too large. Maximum size: {limit_mb}MB"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
+import json
 from ..schemas.chatbot import ChatRequest, ChatResponse, ConversationHistory, Message
 from ..services.chatbot_service import ChatbotService
 from ..services.chatbot_conversation_service import ConversationService
+from ..services.llm_gateway import llm_gateway
 from ..database.models import Users
 from ..dependencies import get_current_user, get_db
 
@@ -45,6 +48,65 @@ async def chat(
             detail=f"Failed to process message: {str(e)}"
         )
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    current_user: Users = Depends(get_current_user), 
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Streaming chat (Server-Sent Events)
+    
+    Events, in order:
+        session  {"session_id": ...}   sent first
+        token    {"text": ...}         one per text delta from the model
+        done     {"session_id": ...}   the reply was saved to history
+        error    {"detail": ...}       generation failed (instead of done)
+    
+    Disconnecting stops generation upstream; an unfinished reply isn't saved.
+    """
+    print(f"📝 User {current_user.username} asked (stream): {request.message}")
+    
+    service = ChatbotService(db, current_user)
+    try:
+        tokens, session_id = await service.stream_personalized_response(
+            request.message,
+            session_id=request.session_id
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to process message: {str(e)}"
+        )
+
+    async def events():
+        yield _sse("session", {"session_id": session_id})
+        try:
+            async for text in tokens:
+                if await http_request.is_disconnected():
+                    print(f"🔌 Client left, cancelling generation (session: {session_id[:8]}...)")
+                    return
+                yield _sse("token", {"text": text})
+        except Exception as e:
+            print(f"❌ Error streaming response: {e}")
+            yield _sse("error", {"detail": f"Failed to get response from AI: {str(e)}"})
+            return
+        finally:
+            await tokens.aclose()
+        yield _sse("done", {"session_id": session_id})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # no-transform / X-Accel-Buffering: keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"}
+    )
+
 router.get("/history", response_model=ConversationHistory)
 async def get_conversation_history(
     limit: int = 20,
@@ -136,6 +198,17 @@ async def get_conversation_stats(
             detail=f"Failed to get stats: {str(e)}"
         )
 
+@router.get("/llm-stats", response_model=dict)
+async def get_llm_stats(
+    current_user: Users = Depends(get_current_user)
+):
+    """
+    Calls, errors, retries, tokens and latency per model from the LLM gateway
+    
+    Counters are per API worker and reset on restart.
+    """
+    return llm_gateway.stats()
+
 @router.get("/test")
 async def test_groq():
     """Test endpoint - NO authentication, NO database"""
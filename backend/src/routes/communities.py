@@ -4,16 +4,17 @@ from typing import Optional, List
 import json
 
 from ..database.database import get_db
-from ..database.models import Users, PostType, Groups, Resources
+from ..database.models import Users, PostType, Resources
 from ..schemas.communities import (
     PostCreate, PostUpdate, PostResponse, PostListResponse, AuthorSummary,
     ToggleResponse, ShareResponse,
-    CommentCreate, CommentResponse,
+    CommentCreate, CommentResponse, CommentThreadResponse, CommentRepliesResponse,
     RecentUploadItem, TopContributorItem,ResourceSummary
 )
 from ..dependencies import get_current_user
-from ..services import community_service, resources_service
+from ..services import community_service, resources_service, timeline_service
 from ..services.group_service import is_user_in_group, get_group_by_id
+from ..services.keyset import encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/community", tags=["Community"])
 
@@ -23,21 +24,15 @@ router = APIRouter(prefix="/community", tags=["Community"])
 # construction, since Posts has computed/derived fields __dict__ can't give us)
 # ============================================================================
 
-async def _build_post_response(
-    db: AsyncSession, post, current_user: Users
-) -> PostResponse:
-    author_result = await db.get(Users, post.user_id)
-    group = await db.get(Groups, post.group_id) if post.group_id else None
-
-    reaction_state = await community_service.get_post_reaction_state(
-        db, current_user.user_id, post.id
-    )
+def _to_post_response(post, hydrated: dict) -> PostResponse:
+    author = hydrated["authors"].get(post.user_id)
+    group = hydrated["groups"].get(post.group_id) if post.group_id else None
 
     type_data = json.loads(post.type_data) if post.type_data else None
 
     resource_summary = None
     if post.resource_id:
-        resource = await db.get(Resources, post.resource_id)
+        resource = hydrated["resources"].get(post.resource_id)
         if resource:
             resource_summary = ResourceSummary(
                 id=resource.id,
@@ -59,22 +54,36 @@ async def _build_post_response(
         resource=resource_summary,   # NEW
         type_data=type_data,
         author=AuthorSummary(
-            user_id=author_result.user_id,
-            username=author_result.username,
-            first_name=author_result.first_name,
-            last_name=author_result.last_name,
+            user_id=author.user_id,
+            username=author.username,
+            first_name=author.first_name,
+            last_name=author.last_name,
         ),
         like_count=post.like_count,
         save_count=post.save_count,
         share_count=post.share_count,
         comment_count=post.comment_count,
-        liked_by_me=reaction_state["liked_by_me"],
-        saved_by_me=reaction_state["saved_by_me"],
+        liked_by_me=post.id in hydrated["liked"],
+        saved_by_me=post.id in hydrated["saved"],
         created_at=post.created_at,
         updated_at=post.updated_at,
     )
 
 
+async def _build_post_responses(
+    db: AsyncSession, posts, current_user: Users
+) -> List[PostResponse]:
+    """Whole page at once: related rows are batch-loaded, not fetched per post."""
+    hydrated = await community_service.hydrate_posts(db, current_user.user_id, posts)
+    return [_to_post_response(p, hydrated) for p in posts]
+
+
+async def _build_post_response(
+    db: AsyncSession, post, current_user: Users
+) -> PostResponse:
+    return (await _build_post_responses(db, [post], current_user))[0]
+
+
 # ============================================================================
 # CREATE
 # ============================================================================
@@ -132,8 +141,9 @@ async def list_posts(
     post_type: Optional[PostType] = Query(None),
     group_id: Optional[int] = Query(None),
     search: Optional[str] = Query(None),
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     limit: int = Query(20, ge=1, le=100),
+    include_total: bool = Query(False, description="Add a cached, approximate total"),
     db: AsyncSession = Depends(get_db),
     current_user: Users = Depends(get_current_user)
 ):
@@ -148,19 +158,56 @@ async def list_posts(
                 detail="You must be a member to view this group's posts"
             )
 
-    posts, total = await community_service.get_posts(
-        session=db,
-        post_type=post_type,
-        group_id=group_id,
-        search=search,
-        skip=skip,
+    try:
+        posts, next_cursor = await community_service.get_posts(
+            session=db,
+            post_type=post_type,
+            group_id=group_id,
+            search=search,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    total = None
+    if include_total:
+        total = await community_service.get_posts_total(
+            session=db, post_type=post_type, group_id=group_id, search=search
+        )
+
+    return PostListResponse(
+        posts=await _build_post_responses(db, posts, current_user),
+        next_cursor=next_cursor,
+        has_more=next_cursor is not None,
+        total=total,
         limit=limit,
     )
 
+
+@router.get("/timeline", response_model=PostListResponse)
+async def get_timeline(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    ranked: bool = Query(True, description="Order each page by engagement instead of recency"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Users = Depends(get_current_user)
+):
+    """Personalized feed: posts from the caller's groups and friends."""
+    try:
+        decoded = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    posts, next_key = await timeline_service.get_timeline(
+        db, current_user.user_id, cursor=decoded, limit=limit, ranked=ranked
+    )
+    next_cursor = encode_cursor(*next_key) if next_key else None
+
     return PostListResponse(
-        posts=[await _build_post_response(db, p, current_user) for p in posts],
-        total=total,
-        skip=skip,
+        posts=await _build_post_responses(db, posts, current_user),
+        next_cursor=next_cursor,
+        has_more=next_cursor is not None,
         limit=limit,
     )
 
@@ -310,39 +357,84 @@ async def share_post(
 @router.get("/posts/{post_id}/comments", response_model=List[CommentResponse])
 async def list_comments(
     post_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    replies_per_comment: int = Query(3, ge=0, le=20),
+    db: AsyncSession = Depends(get_db),
+    current_user: Users = Depends(get_current_user)
+):
+    """
+    The first page of the thread as a plain list, for older clients; use
+    /comments/thread to page further.
+    """
+    if not await community_service.can_user_view_post(db, current_user.user_id, post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    comments, _ = await community_service.get_comment_thread(
+        db, post_id, limit=limit, replies_per_comment=replies_per_comment,
+    )
+    return [CommentResponse(**c) for c in comments]
+
+
+@router.get("/posts/{post_id}/comments/thread", response_model=CommentThreadResponse)
+async def get_comment_thread(
+    post_id: int,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    replies_per_comment: int = Query(3, ge=0, le=20),
     db: AsyncSession = Depends(get_db),
     current_user: Users = Depends(get_current_user)
 ):
     if not await community_service.can_user_view_post(db, current_user.user_id, post_id):
         raise HTTPException(status_code=404, detail="Post not found")
 
-    all_comments = await community_service.get_post_comments(db, post_id)
-
-    by_parent = {}
-    for c in all_comments:
-        by_parent.setdefault(c.parent_comment_id, []).append(c)
-
-    async def to_response(comment) -> CommentResponse:
-        author = await db.get(Users, comment.user_id)
-        return CommentResponse(
-            id=comment.id,
-            post_id=comment.post_id,
-            parent_comment_id=comment.parent_comment_id,
-            text=comment.text,
-            author=AuthorSummary(
-                user_id=author.user_id,
-                username=author.username,
-                first_name=author.first_name,
-                last_name=author.last_name,
-            ),
-            is_edited=comment.is_edited,
-            created_at=comment.created_at,
-            updated_at=comment.updated_at,
-            replies=[await to_response(r) for r in by_parent.get(comment.id, [])],
+    try:
+        comments, next_cursor = await community_service.get_comment_thread(
+            db, post_id, cursor=cursor, limit=limit, replies_per_comment=replies_per_comment,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return CommentThreadResponse(
+        comments=[CommentResponse(**c) for c in comments],
+        next_cursor=next_cursor,
+        has_more=next_cursor is not None,
+    )
+
+
+@router.get("/comments/{comment_id}/replies", response_model=CommentRepliesResponse)
+async def get_comment_replies(
+    comment_id: int,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    replies_per_comment: int = Query(3, ge=0, le=20),
+    db: AsyncSession = Depends(get_db),
+    current_user: Users = Depends(get_current_user)
+):
+    from ..database.models import PostComments
+    from sqlalchemy import select
+
+    result = await db.execute(
+        select(PostComments.post_id).where(
+            PostComments.id == comment_id, PostComments.is_deleted == False
         )
+    )
+    post_id = result.scalar_one_or_none()
+    if post_id is None or not await community_service.can_user_view_post(db, current_user.user_id, post_id):
+        raise HTTPException(status_code=404, detail="Comment not found")
 
-    top_level = by_parent.get(None, [])
-    return [await to_response(c) for c in top_level]
+    try:
+        replies, next_cursor = await community_service.get_comment_replies(
+            db, post_id, comment_id, cursor=cursor, limit=limit,
+            replies_per_comment=replies_per_comment,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return CommentRepliesResponse(
+        replies=[CommentResponse(**r) for r in replies],
+        next_cursor=next_cursor,
+        has_more=next_cursor is not None,
+    )
 
 
 @router.post("/posts/{post_id}/comments", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
@@ -423,23 +515,8 @@ async def recent_uploads(
     db: AsyncSession = Depends(get_db),
     current_user: Users = Depends(get_current_user)
 ):
-    posts = await community_service.get_recent_uploads(db, limit=limit)
-
-    items = []
-    for p in posts:
-        meta = "Resource"
-        if p.resource_id:
-            resource = await db.get(Resources, p.resource_id)
-            if resource:
-                parts = []
-                if resource.total_pages:
-                    parts.append(f"{resource.total_pages} pages")
-                if resource.resource_type:
-                    parts.append(resource.resource_type.value.upper())
-                meta = " · ".join(parts) if parts else meta
-        items.append(RecentUploadItem(post_id=p.id, title=p.title, meta=meta))
-
-    return items
+    uploads = await community_service.get_recent_uploads(db, limit=limit)
+    return [RecentUploadItem(**u) for u in uploads]
 
 
 @router.get("/sidebar/top-contributors", response_model=List[TopContributorItem])
@@ -449,18 +526,4 @@ async def top_contributors(
     current_user: Users = Depends(get_current_user)
 ):
     ranked = await community_service.get_top_contributors(db, limit=limit)
-
-    result = []
-    for rank, entry in enumerate(ranked, start=1):
-        user = await db.get(Users, entry["user_id"])
-        if not user:
-            continue
-        result.append(
-            TopContributorItem(
-                user_id=entry["user_id"],
-                username=user.username,
-                contributions=entry["contributions"],
-                rank=rank,
-            )
-        )
-    return result
\ No newline at end of file
+    return [TopContributorItem(**entry) for entry in ranked]
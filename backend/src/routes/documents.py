@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
 
 from ..dependencies import get_current_user
-from ..database.database import get_db
+from ..utils import authenticate_token
+from ..database.database import get_db, async_session_local
 from ..database.models import Users
 from ..services import document_service as svc
+from ..services.document_collab_service import collab_manager, get_collab_access
 from ..schemas.documents import (
     DocumentCreate,
     DocumentUpdate,
@@ -173,6 +175,71 @@ def revert_document_version(
     return svc.restore_version(db, doc, version_id, current_user)
 
 
+# ── Live co-editing ──────────────────────────────────────────────────────────
+
+@router.websocket("/{document_id}/live")
+async def live_edit_document(
+    websocket: WebSocket,
+    document_id: int,
+    token: str = Query(..., description="Clerk session token (browsers can't set headers on a WebSocket)"),
+):
+    """
+    Real-time editing channel (see services/document_collab_service.py).
+
+    Connect to /documents/{id}/live?token=<session token>; the editor is
+    whoever the token belongs to.
+
+    Client -> server: {"action": "operation", "payload": {"revision": n, "ops": [...]}}
+    Server -> client: "init", "ack", "operation", "resync", "presence"
+    """
+    try:
+        user_id = authenticate_token(token)
+    except HTTPException:
+        await websocket.close(code=4401)
+        return
+
+    # Short-lived session: a Depends(get_db) one would hold a pooled
+    # connection for as long as the socket stays open
+    async with async_session_local() as session:
+        access = await get_collab_access(session, document_id, user_id)
+    if access is None:
+        await websocket.close(code=4403)
+        return
+
+    await websocket.accept()
+    room = await collab_manager.join(websocket, document_id, user_id)
+    await websocket.send_json({
+        "action": "init",
+        "revision": room.revision,
+        "content": room.content,
+        "can_edit": access == "edit",
+        "participants": sorted(set(room.connections.values())),
+    })
+
+    try:
+        while True:
+            data = await websocket.receive_json()
+            action = data.get("action")
+
+            if action == "operation":
+                if access != "edit":
+                    await websocket.send_json({"error": "You don't have edit access to this document"})
+                    continue
+                await collab_manager.handle_operation(websocket, room, user_id, data.get("payload", {}))
+            else:
+                await websocket.send_json({
+                    "error": f"Invalid action: {action}",
+                    "available_actions": ["operation"],
+                })
+
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"⚠️ Live edit error for user {user_id} on document {document_id}: {e}")
+    finally:
+        await collab_manager.leave(websocket, room)
+
+
 # ── Collaborators & share link ──────────────────────────────────────────────
 
 @router.post("/{document_id}/collaborators", response_model=CollaboratorResponse)
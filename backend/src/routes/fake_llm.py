@@ -0,0 +1,88 @@
+"""
+Mock OpenAI-compatible chat completions for FAKE_LLM_SERVER=true
+
+Stands in for Groq the way routes/storage.py stands in for Cloudinary:
+set CHATBOT_LLM_BASE_URL=http://localhost:8000/api/fake-llm/v1 and the
+chatbot (plain and streaming) runs offline. Replies are deterministic
+(they echo the last user message); FAKE_LLM_TOKEN_DELAY_SECONDS spaces
+out streamed chunks so disconnects can be exercised mid-stream. Only
+mounted when enabled (see app.py).
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+router = APIRouter(prefix="/fake-llm/v1", tags=["fake-llm"])
+
+FAKE_LLM_TOKEN_DELAY_SECONDS = float(os.getenv("FAKE_LLM_TOKEN_DELAY_SECONDS", "0.02"))
+
+
+def _reply_words(body: dict) -> list:
+    last_user = next(
+        (m.get("content", "") for m in reversed(body.get("messages", [])) if m.get("role") == "user"),
+        ""
+    )
+    words = f"You said: {last_user}".split(" ")
+    return words[:body.get("max_tokens") or len(words)]
+
+
+def _usage(body: dict, completion_tokens: int) -> dict:
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+@router.post("/chat/completions")
+async def chat_completions(body: dict):
+    """Just enough of POST /chat/completions for AsyncOpenAI, with and without stream=True"""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    model = body.get("model", "fake")
+    words = _reply_words(body)
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(body, len(words)),
+        }
+
+    def chunk(delta: dict, finish_reason=None, usage=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+        }
+        if usage is not None:
+            payload["usage"] = usage
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def stream():
+        yield chunk({"role": "assistant", "content": ""})
+        for i, word in enumerate(words):
+            await asyncio.sleep(FAKE_LLM_TOKEN_DELAY_SECONDS)
+            yield chunk({"content": word if i == 0 else f" {word}"})
+        yield chunk({}, finish_reason="stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield chunk(None, usage=_usage(body, len(words)))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
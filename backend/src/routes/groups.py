@@ -3,7 +3,7 @@ Group management routes
 Handles group CRUD, membership, invitations, and permissions
 """
 
-from fastapi import APIRouter, Depends, HTTPException,Form, Query
+from fastapi import APIRouter, Depends, HTTPException,Form, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
@@ -75,18 +75,18 @@ async def create_group(
     
     return GroupDetailResponse(
         **group.__dict__,
-        member_count=len(member_list),
         user_role=await group_service.get_user_role_in_group(db, current_user.user_id, group.id),
         members=member_list
     )
 
 @router.get("", response_model=List[GroupResponse])
 async def list_groups(
+    response: Response,
     search: Optional[str] = Query(None, description="Search by group name"),
     group_type: Optional[GroupType] = Query(None, description="Filter by group type"),
     visibility: Optional[GroupVisibility] = Query(None, description="Filter by visibility"),
     only_joined: bool = Query(False, description="Only show groups user is a member of"),
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
     limit: int = Query(20, ge=1, le=100),
     current_user: Users = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
@@ -97,41 +97,32 @@ async def list_groups(
     - **only_joined=true**: Shows groups the user is a member of
     - **only_joined=false**: Shows public groups (for discovery)
     
-    Supports filtering by name, type, and visibility.
+    Supports filtering by name, type, and visibility. Keyset-paginated:
+    when there are more results the `X-Next-Cursor` response header holds
+    the value to pass as `cursor` for the next page.
     """
     
-    if only_joined:
-        groups, total = await group_service.get_user_groups(
+    try:
+        rows, next_cursor = await group_service.list_groups(
             session=db,
             user_id=current_user.user_id,
-            skip=skip,
-            limit=limit,
+            only_joined=only_joined,
             search=search,
             group_type=group_type,
-            visibility=visibility
-        )
-    else:
-        groups, total = await group_service.get_public_groups(
-            session=db,
-            skip=skip,
-            limit=limit,
-            search=search,
-            group_type=group_type
+            visibility=visibility,
+            cursor=cursor,
+            limit=limit
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Add member count and user role to each group
-    result = []
-    for group in groups:
-        member_count = await group_service.get_group_member_count(db, group.id)
-        user_role = await group_service.get_user_role_in_group(db, current_user.user_id, group.id)
-        
-        result.append(GroupResponse(
-            **group.__dict__,
-            member_count=member_count,
-            user_role=user_role
-        ))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    return result
+    return [
+        GroupResponse(**group.__dict__, user_role=user_role)
+        for group, user_role in rows
+    ]
 
 @router.get("/{group_id}", response_model=GroupDetailResponse)
 async def get_group(
@@ -182,7 +173,6 @@ async def get_group(
     
     return GroupDetailResponse(
         **group.__dict__,
-        member_count=len(member_list),
         user_role=user_role,
         members=member_list
     )
@@ -223,12 +213,10 @@ async def update_group(
     
     await db.commit()
     
-    member_count = await group_service.get_group_member_count(db, group_id)
     user_role = await group_service.get_user_role_in_group(db, current_user.user_id, group_id)
     
     return GroupResponse(
         **group.__dict__,
-        member_count=member_count,
         user_role=user_role
     )
 
@@ -654,4 +642,15 @@ async def check_resource_permissions(
     return {
         "group_id": group_id,
         "can_manage_resources": can_manage
-    }
\ No newline at end of file
+    }
+@router.get("/authz-cache/stats", response_model=dict)
+async def authz_cache_stats(
+    current_user: Users = Depends(get_current_user)
+):
+    """
+    Hit-rate metrics for the in-process membership/role cache
+    
+    Counters are per API worker and reset on restart.
+    """
+    
+    return group_service.get_authz_cache_stats()
@@ -3,35 +3,44 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from sqlalchemy import select
 from ..services.upload_service import (
-    upload_file_to_cloudinary,
-    validate_file_size,
+    delete_stored_file,
+    create_direct_upload,
+    read_upload_token,
+    verify_direct_upload,
+    get_direct_upload,
+    mark_direct_upload_completed,
     sanitize_filename
 )
+from ..services.object_store import UPLOAD_MAX_SIZE_MB
 from ..database.database import get_db
-from ..database.models import Users, ResourceType, Resources, Groups, ResourceStatus
+from ..database.models import Users, ResourceType, Resources, Groups, ResourceStatus, DirectUploads
 from ..schemas.resources import (
     ResourceCreate, 
     ResourceResponse, 
     ResourceUpdate,
     ResourceWithProgress,
+    ResourceLibraryPage,
+    ResourceTreeNode,
     ShareResourceRequest,
     MoveResourceRequest,
+    DirectUploadRequest,
+    DirectUploadTicket,
+    DirectUploadComplete,
     ResourceProgressUpdate,
     PageProgressUpdate,
-    ResourceProgressResponse)
+    ResourceProgressResponse,
+    SummaryJobResponse)
 from ..dependencies import get_current_user
-from ..services import resources_service
+from ..services import resources_service, resource_tree_service, blob_service, pdf_extraction_service, summary_service
+from ..services.pdf_worker import ExtractionError, ExtractionTimeout
+from ..services.group_service import is_user_in_group
 from ..services.user_service import get_user_by_id
-from ..database.models import Users
-from google import genai
-import os
-import httpx
-import pdfplumber
-from io import BytesIO
-
-client = genai.Client(
-    api_key=os.getenv("GOOGLE_GEMINI_API_KEY")
-)
+from ..services.progress_ingest_service import progress_ingestor
+import asyncio
+
+# How long POST /resources/summarize waits on its job before giving up
+SUMMARY_WAIT_SECONDS = 120
+
 router = APIRouter(prefix="/resources", tags=["Resources"])
 
 # ============================================================================
@@ -164,6 +173,53 @@ async def get_group_resources(
         for resource in resources
     ]
 
+@router.get("/library", response_model=ResourceLibraryPage)
+async def get_resource_library(
+    group_id: Optional[int] = Query(None, description="Only this group's resources"),
+    status: Optional[ResourceStatus] = Query(None, description="Filter by your progress status"),
+    resource_type: Optional[ResourceType] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    current_user: Users = Depends(get_current_user)
+):
+    """
+    Resource cards with your progress, in one request
+
+    Replaces listing via /all or /group/{id} and then calling
+    /{id}/progress/me per card. Newest first, keyset-paginated.
+    """
+
+    if group_id is not None and not await is_user_in_group(db, current_user.user_id, group_id):
+        raise HTTPException(status_code=403, detail="You are not a member of this group")
+
+    try:
+        rows, next_cursor = await resources_service.list_resources_with_progress(
+            session=db,
+            user_id=current_user.user_id,
+            group_id=group_id,
+            status=status,
+            resource_type=resource_type,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ResourceLibraryPage(
+        items=[
+            ResourceWithProgress(
+                **resource.__dict__,
+                is_personal=(resource.group_id is None),
+                my_progress=ResourceProgressResponse(**progress.__dict__) if progress else None
+            )
+            for resource, progress in rows
+        ],
+        next_cursor=next_cursor,
+        has_more=next_cursor is not None
+    )
+
+
 @router.get("/{resource_id}", response_model=ResourceResponse)
 async def get_resource(
     resource_id: int,
@@ -212,14 +268,17 @@ async def update_resource(
         )
     
     # Step 2: Update resource
-    resource = await resources_service.update_resource(
-        session=db,
-        resource_id=resource_id,
-        title=payload.title,
-        description=payload.description,
-        url=payload.url,
-        parent_folder_id=payload.parent_folder_id
-    )
+    try:
+        resource = await resources_service.update_resource(
+            session=db,
+            resource_id=resource_id,
+            title=payload.title,
+            description=payload.description,
+            url=payload.url,
+            parent_folder_id=payload.parent_folder_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
@@ -299,6 +358,46 @@ async def get_all_my_resources(
     ]
 
 
+# ============================================================================
+# FOLDER TREE
+# ============================================================================
+
+@router.get("/folders/tree", response_model=ResourceTreeNode)
+async def get_folder_tree(
+    folder_id: Optional[int] = Query(None, description="Subtree root; omit for a whole library"),
+    group_id: Optional[int] = Query(None, description="Group library (when folder_id is omitted)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Users = Depends(get_current_user)
+):
+    """
+    Whole folder tree in one request
+
+    - **folder_id**: that folder and everything below it
+    - **group_id**: the group's library
+    - neither: your personal library
+
+    Every node carries rolled-up sizes and file/folder counts.
+    """
+
+    if folder_id is not None:
+        if not await resources_service.can_user_view_resource(db, current_user.user_id, folder_id):
+            raise HTTPException(status_code=404, detail="Folder not found")
+    elif group_id is not None:
+        if not await is_user_in_group(db, current_user.user_id, group_id):
+            raise HTTPException(status_code=403, detail="You are not a member of this group")
+
+    tree = await resource_tree_service.get_tree(
+        db,
+        user_id=current_user.user_id,
+        root_id=folder_id,
+        group_id=group_id
+    )
+    if tree is None:
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    return tree
+
+
 @router.get("/stats/me", response_model=dict)
 async def get_my_resource_stats(
     db: AsyncSession = Depends(get_db),
@@ -657,33 +756,70 @@ async def update_progress_by_page(
     Update resource progress by current page
     
     Automatically calculates percentage: (current_page / total_pages) * 100
+
+    Page turns are buffered and written in batches (see
+    progress_ingest_service); the response already reflects this event.
     """
     
-    # Check if user can view resource
-    if not await resources_service.can_user_view_resource(
-        db, current_user.user_id, resource_id
-    ):
-        raise HTTPException(status_code=404, detail="Resource not found")
+    # Check if user can view resource (remembered for a short while, so
+    # steady page turns cost no queries)
+    resource_total_pages = progress_ingestor.known_total_pages(current_user.user_id, resource_id)
+    if resource_total_pages is False:
+        if not await resources_service.can_user_view_resource(
+            db, current_user.user_id, resource_id
+        ):
+            raise HTTPException(status_code=404, detail="Resource not found")
+        resource = await resources_service.get_resource_by_id(db, resource_id)
+        resource_total_pages = resource.total_pages
+        progress_ingestor.remember_reader(current_user.user_id, resource_id, resource_total_pages)
     
-    # Update progress by page
-    progress = await resources_service.update_resource_progress_by_page(
-        session=db,
+    pending = await progress_ingestor.record(
         user_id=current_user.user_id,
         resource_id=resource_id,
         current_page=payload.current_page,
+        resource_total_pages=resource_total_pages,
         total_pages=payload.total_pages,
         notes=payload.notes
     )
     
-    if not progress:
-        raise HTTPException(
-            status_code=500,
-            detail="Failed to update progress"
-        )
-    
-    await db.commit()
-    
-    return ResourceProgressResponse(**progress.__dict__)
+    return _pending_progress_response(current_user.user_id, resource_id, pending)
+
+
+@router.post("/{resource_id}/progress/flush", status_code=204)
+async def flush_page_progress(
+    resource_id: int,
+    current_user: Users = Depends(get_current_user)
+):
+    """Persist buffered page progress now (call when the reader closes the document)"""
+    await progress_ingestor.flush(keys=[(current_user.user_id, resource_id)])
+
+
+def _pending_progress_response(
+    user_id: str,
+    resource_id: int,
+    pending,
+    stored=None,
+) -> ResourceProgressResponse:
+    """Progress as the reader should see it: the stored row overlaid with a buffered event"""
+    started_at = stored.started_at if stored else None
+    completed_at = stored.completed_at if stored else None
+    if started_at is None and pending.status != ResourceStatus.NOT_STARTED:
+        started_at = pending.received_at
+    if completed_at is None and pending.status == ResourceStatus.COMPLETED:
+        completed_at = pending.received_at
+
+    return ResourceProgressResponse(
+        id=stored.id if stored else 0,
+        user_id=user_id,
+        resource_id=resource_id,
+        current_page=pending.current_page,
+        total_pages=pending.total_pages,
+        progress_percentage=pending.progress_percentage,
+        status=pending.status.value,
+        notes=pending.notes if pending.notes is not None else (stored.notes if stored else None),
+        started_at=started_at,
+        completed_at=completed_at
+    )
 
 
 @router.get("/{resource_id}/progress/page", response_model=ResourceProgressResponse)
@@ -703,6 +839,10 @@ async def get_page_progress(
         db, current_user.user_id, resource_id
     )
     
+    pending = progress_ingestor.pending(current_user.user_id, resource_id)
+    if pending:
+        return _pending_progress_response(current_user.user_id, resource_id, pending, progress)
+    
     if not progress:
         # Return default state
         from datetime import datetime
@@ -1076,7 +1216,7 @@ async def upload_file(
     print("GROUP ID RECEIVED:", group_id)
 
     """
-    Upload file to Cloudinary and create resource
+    Upload file to object storage and create resource
 """
     print("=" * 60)
     print("📤 UPLOAD ENDPOINT CALLED")
@@ -1104,9 +1244,6 @@ async def upload_file(
     print(f"✅ Parsed group_id: {parsed_group_id}")
  
     
-    # Step 1: Validate file size (optional, adjust as needed)
-    validate_file_size(file, max_size_mb=50)
-    
     # Step 2: Check upload permission
     if not await resources_service.can_user_upload_resource(
         db, current_user.user_id, parsed_group_id
@@ -1126,36 +1263,28 @@ async def upload_file(
             raise HTTPException(status_code=404, detail="Group not found")
     
     
-    # Step 5: Upload to Cloudinary
+    # Step 5: Upload to storage (off the event loop; size limit enforced while
+    # streaming). Content already stored by anyone is reused, not re-uploaded.
     try:
-        print("☁️ Uploading to Cloudinary...")
-        upload_result = await upload_file_to_cloudinary(
+        print("☁️ Uploading to storage...")
+        blob = await blob_service.store_deduplicated(
+            db,
             file=file,
-            folder="study-resources"
+            folder="study-resources",
+            max_size_mb=UPLOAD_MAX_SIZE_MB
         )
-        print(f"✅ Cloudinary upload successful: {upload_result['url']}")
+        print(f"✅ Storage upload successful: {blob.url} (refs: {blob.ref_count})")
     except HTTPException as e:
         raise e
     except Exception as e:
-        print(f"❌ Cloudinary upload failed: {e}")
+        print(f"❌ Storage upload failed: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Upload failed: {str(e)}"
         )
     
     # Step 6: Detect resource type from content type
-    from ..database.models import ResourceType
-    
-    content_type = file.content_type or "application/octet-stream"
-    
-    if content_type.startswith('image/'):
-        resource_type = ResourceType.IMAGE
-    elif content_type.startswith('video/'):
-        resource_type = ResourceType.VIDEO
-    elif content_type.startswith('pdf/'):
-        resource_type = ResourceType.PDF
-    else:
-        resource_type = ResourceType.FILE
+    resource_type = _resource_type_for_upload(file.content_type)
     
     print(f"📁 Detected resource type: {resource_type.value}")
     
@@ -1172,12 +1301,13 @@ async def upload_file(
         session=db,
         user_id=current_user.user_id,
         title=clean_title,
-        url=upload_result['url'],
+        url=blob.url,
         resource_type=resource_type,
         group_id=parsed_group_id,  # ⚠️ Use parsed version
         description=description,
         parent_folder_id=parent_folder_id,
-        file_size=upload_result['size']
+        file_size=blob.size,
+        blob_id=blob.id
     )
     
     print(f"✅ Resource created with ID: {resource.id}")
@@ -1188,6 +1318,10 @@ async def upload_file(
     await db.commit()
     await db.refresh(resource)
     
+    if file.content_type == "application/pdf":
+        # Text + page count in the background (cached for summaries)
+        pdf_extraction_service.schedule_extraction(resource.id)
+    
     print(f"✅ Upload complete! Resource ID: {resource.id}")
     print("=" * 60)
     
@@ -1201,6 +1335,146 @@ async def upload_file(
 
 
 
+def _resource_type_for_upload(content_type: Optional[str]) -> ResourceType:
+    content_type = content_type or "application/octet-stream"
+    
+    if content_type.startswith('image/'):
+        return ResourceType.IMAGE
+    elif content_type.startswith('video/'):
+        return ResourceType.VIDEO
+    elif content_type.startswith('pdf/'):
+        return ResourceType.PDF
+    return ResourceType.FILE
+
+
+# ============================================================================
+# DIRECT-TO-STORAGE UPLOADS
+# ============================================================================
+# 1. POST /resources/uploads/sign      -> ticket (signed URL + upload_token)
+# 2. client sends the file to ticket.upload_url (never through this API)
+# 3. POST /resources/uploads/complete  -> verifies size/type, creates resource
+#    (once: tickets live in direct_uploads, shared by all workers)
+# Objects of tickets never completed are swept after they expire
+# (upload_service.sweep_abandoned_direct_uploads).
+
+@router.post("/uploads/sign", response_model=DirectUploadTicket)
+async def sign_direct_upload(
+    payload: DirectUploadRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Users = Depends(get_current_user)
+):
+    """Issue a short-lived ticket to upload a file directly to storage"""
+    
+    if not await resources_service.can_user_upload_resource(
+        db, current_user.user_id, payload.group_id
+    ):
+        raise HTTPException(
+            status_code=403,
+            detail="You don't have permission to upload to this location"
+        )
+    
+    if payload.group_id:
+        from ..services.group_service import get_group_by_id
+        group = await get_group_by_id(db, payload.group_id)
+        if not group:
+            raise HTTPException(status_code=404, detail="Group not found")
+    
+    return DirectUploadTicket(**await create_direct_upload(
+        session=db,
+        user_id=current_user.user_id,
+        filename=payload.filename,
+        content_type=payload.content_type,
+        size=payload.size,
+        group_id=payload.group_id,
+        parent_folder_id=payload.parent_folder_id,
+        description=payload.description
+    ))
+
+
+async def _completed_upload_resource(db: AsyncSession, ticket: DirectUploads) -> Resources:
+    """The resource an already-completed upload created"""
+    resource = (
+        await resources_service.get_resource_by_id(db, ticket.resource_id)
+        if ticket.resource_id else None
+    )
+    if resource is None:
+        raise HTTPException(status_code=409, detail="Upload already completed; its resource was deleted")
+    return resource
+
+
+@router.post("/uploads/complete", response_model=ResourceResponse, status_code=status.HTTP_201_CREATED)
+async def complete_direct_upload(
+    payload: DirectUploadComplete,
+    db: AsyncSession = Depends(get_db),
+    current_user: Users = Depends(get_current_user)
+):
+    """
+    Create the resource for a finished direct upload
+    
+    Size and type come from storage, not from the client. Completing the
+    same upload twice returns the existing resource.
+    """
+    
+    claims = read_upload_token(payload.upload_token, current_user.user_id)
+    
+    ticket = await get_direct_upload(db, current_user.user_id, claims["key"])
+    if ticket is None:
+        raise HTTPException(status_code=400, detail="Upload ticket expired")
+    
+    if ticket.completed_at is not None:
+        resource = await _completed_upload_resource(db, ticket)
+    else:
+        stored = await verify_direct_upload(claims)
+        
+        # Permissions may have changed since the ticket was issued
+        if not await resources_service.can_user_upload_resource(
+            db, current_user.user_id, claims.get("group_id")
+        ):
+            raise HTTPException(
+                status_code=403,
+                detail="You don't have permission to upload to this location"
+            )
+        
+        # Same bytes already stored: share that blob and drop this copy
+        blob = await blob_service.adopt_stored_object(db, stored.content_hash, stored)
+        
+        resource = await resources_service.create_resource(
+            session=db,
+            user_id=current_user.user_id,
+            title=sanitize_filename(claims["filename"]),
+            url=blob.url if blob else stored.url,
+            resource_type=_resource_type_for_upload(claims["content_type"]),
+            group_id=claims.get("group_id"),
+            description=claims.get("description"),
+            parent_folder_id=claims.get("parent_folder_id"),
+            file_size=blob.size if blob else stored.size,
+            blob_id=blob.id if blob else None
+        )
+        
+        if not await mark_direct_upload_completed(db, claims["key"], resource.id):
+            # A retry on another worker completed it first (or the ticket
+            # was swept meanwhile): drop ours and answer like that retry
+            await db.rollback()
+            ticket = await get_direct_upload(db, current_user.user_id, claims["key"])
+            if ticket is None:
+                raise HTTPException(status_code=400, detail="Upload ticket expired")
+            resource = await _completed_upload_resource(db, ticket)
+        else:
+            await db.commit()
+            await db.refresh(resource)
+            
+            if claims["content_type"] == "application/pdf":
+                pdf_extraction_service.schedule_extraction(resource.id)
+            
+            if blob and blob.storage_key != stored.key:
+                await blob_service.delete_released_object(stored.key, stored.storage)
+    
+    return ResourceResponse(
+        **resource.__dict__,
+        is_personal=(resource.group_id is None)
+    )
+
+
 # ============================================================================
 # OPTIONAL: DELETE WITH CLOUDINARY CLEANUP
 # ============================================================================
@@ -1215,7 +1489,7 @@ async def delete_resource_permanently(
     current_user: Users = Depends(get_current_user)
 ):
     """
-    Delete resource from database AND Cloudinary
+    Delete resource from database AND object storage
     
     WARNING: This is permanent! The file will be removed from cloud storage.
     
@@ -1233,22 +1507,9 @@ async def delete_resource_permanently(
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
     
-    # Delete from Cloudinary (if URL is from Cloudinary)
-    if "cloudinary.com" in resource.url:
-        # Extract public_id from URL
-        # URL format: https://res.cloudinary.com/{cloud_name}/{resource_type}/upload/{public_id}.{format}
-        try:
-            from ..services.upload_service import delete_file_from_cloudinary
-            
-            # Simple extraction (works for most cases)
-            url_parts = resource.url.split('/')
-            public_id_with_ext = '/'.join(url_parts[-2:])  # folder/filename.ext
-            public_id = public_id_with_ext.rsplit('.', 1)[0]  # Remove extension
-            
-            await delete_file_from_cloudinary(public_id)
-        except Exception as e:
-            print(f"Warning: Could not delete from Cloudinary: {e}")
-            # Continue with database deletion anyway
+    # A folder goes with its whole subtree. Deduplicated content is only
+    # removed from storage with its last reference.
+    released, unshared_urls = await blob_service.release_subtree_blobs(db, resource_id)
     
     # Delete from database
     success = await resources_service.delete_resource(db, resource_id)
@@ -1257,6 +1518,11 @@ async def delete_resource_permanently(
         raise HTTPException(status_code=404, detail="Resource not found")
     
     await db.commit()
+    for key, storage in released:
+        await blob_service.delete_released_object(key, storage)
+    for url in unshared_urls:
+        # Only deletes URLs that belong to our object store
+        await delete_stored_file(url)
 
 
 @router.post("/debug-upload")
@@ -1299,91 +1565,124 @@ async def debug_upload(
     }
 
 #summarizer
+def _summary_job_response(job) -> SummaryJobResponse:
+    return SummaryJobResponse(
+        job_id=job.id,
+        resource_id=job.resource_id,
+        status=job.status,
+        summary=job.summary,
+        model=job.model,
+        error=job.error,
+        cached=job.cached,
+        created_at=job.created_at,
+        finished_at=job.finished_at
+    )
+
+
+@router.post("/{resource_id}/summaries", response_model=SummaryJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def request_resource_summary(
+    resource_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Users = Depends(get_current_user)
+):
+    """
+    Start summarizing a PDF resource
+    
+    Returns a job to poll. If the summary for the file's current content
+    is already cached the job comes back finished.
+    """
+    
+    if not await resources_service.can_user_view_resource(
+        db, current_user.user_id, resource_id
+    ):
+        raise HTTPException(status_code=404, detail="Resource not found")
+    
+    resource = await resources_service.get_resource_by_id(db, resource_id)
+    job = await summary_service.request_summary(db, resource, current_user.user_id)
+    return _summary_job_response(job)
+
+
+@router.get("/summaries/jobs/{job_id}", response_model=SummaryJobResponse)
+async def get_summary_job(
+    job_id: str,
+    current_user: Users = Depends(get_current_user)
+):
+    """Status (and result, once finished) of a summarization job"""
+    
+    job = summary_service.summary_jobs.get(job_id)
+    if job is None or current_user.user_id not in job.user_ids:
+        raise HTTPException(status_code=404, detail="Summary job not found")
+    return _summary_job_response(job)
+
+
 @router.post("/summarize")
 async def summarize_pdf(
     request: dict,
     current_user = Depends(get_current_user),  # Your auth dependency
     session = Depends(get_db),  # Your DB dependency
 ):
-    """Free PDF summarizer using Google Gemini"""
-    try:
-        resource_url = request.get("resource_url")
-        resource_id = request.get("resource_id")
-        resource_title = request.get("resource_title", "PDF Document")
-
-        if not resource_url:
-            raise HTTPException(status_code=400, detail="resource_url is required")
-
-        print(f"📥 Summarizing: {resource_title}")
-
-        # Download PDF from Cloudinary
-        print("📥 Downloading PDF...")
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.get(resource_url, timeout=30.0)
-            if response.status_code != 200:
-                raise HTTPException(status_code=400, detail="Failed to download PDF")
-        pdf_content = response.content
-
-        # Extract text
-        print("🔍 Extracting text...")
-        pdf_file = BytesIO(pdf_content)
-        text = ""
-        
-        with pdfplumber.open(pdf_file) as pdf:
-            # Limit to first 10 pages for free tier
-            for page_num, page in enumerate(pdf.pages[:10], 1):
-                page_text = page.extract_text()
-                if page_text:
-                    text += f"\n--- Page {page_num} ---\n{page_text}"
-
-        if not text.strip():
-            raise HTTPException(status_code=400, detail="Could not extract text from PDF")
-
-        # Limit text size (Gemini free tier limit)
-        max_chars = 50000
-        if len(text) > max_chars:
-            text = text[:max_chars]
-            print(f"⚠️ Text truncated to {max_chars} chars")
-
-        print(f"📝 Text extracted: {len(text)} characters")
-
-        # Call Google Gemini (FREE)
-        print("🤖 Calling Google Gemini...")
-        
-        
-        prompt = f"""Please provide a concise summary of this PDF content.
-
-Summary should be:
-- 2-3 paragraphs
-- Clear and accessible
-- Include main points and key findings
-- Include important conclusions
-
-PDF Title: {resource_title}
-
-Content:
-{text}
-
-Summary:"""
-
-        response = client.models.generate_content(
-            model="gemini-flash-latest",
-            contents=prompt,
-        )
+    """
+    Free PDF summarizer using Google Gemini
+    
+    Blocking wrapper over the summary jobs above (waits for the result),
+    kept for clients that don't poll.
+    """
+    resource_url = request.get("resource_url")
+    resource_id = request.get("resource_id")
+    resource_title = request.get("resource_title", "PDF Document")
 
-        summary = response.text
+    if not resource_url:
+        raise HTTPException(status_code=400, detail="resource_url is required")
 
-        print("✅ Summary generated successfully")
+    print(f"📥 Summarizing: {resource_title}")
 
+    if resource_id:
+        resource_id = int(resource_id)
+        if not await resources_service.can_user_view_resource(
+            session, current_user.user_id, resource_id
+        ):
+            raise HTTPException(status_code=404, detail="Resource not found")
+        resource = await resources_service.get_resource_by_id(session, resource_id)
+        
+        job = await summary_service.request_summary(session, resource, current_user.user_id)
+        try:
+            await summary_service.summary_jobs.wait(job, timeout=SUMMARY_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=504,
+                detail=f"Summary is still being generated (job {job.id})"
+            )
+        if job.error:
+            raise HTTPException(status_code=502, detail=f"Summarization failed: {job.error}")
+        
+        print("✅ Summary generated successfully" + (" (cached)" if job.cached else ""))
         return {
             "success": True,
-            "summary": summary,
+            "summary": job.summary,
             "resource_id": resource_id,
-            "model": "gemini-pro (FREE)",
+            "model": job.model,
         }
 
-    except HTTPException:
-        raise
+    # Bare URL, no resource: no whole-document cache, but chunks are still shared
+    try:
+        pdf_content = await pdf_extraction_service.download_pdf(resource_url)
+        _, pages = await pdf_extraction_service.extract_pdf_bytes(pdf_content)
+    except ExtractionTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ExtractionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        summary, model = await summary_service.summarize_pages(session, resource_title, pages)
+    except summary_service.SummaryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Error: {e}")
-        raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=502, detail=f"Summarization failed: {str(e)}")
+
+    return {
+        "success": True,
+        "summary": summary,
+        "resource_id": resource_id,
+        "model": model,
+    }
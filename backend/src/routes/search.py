@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from ..database.database import get_db
+from ..database.models import Users
+from ..dependencies import get_current_user
+from ..schemas.search import SearchResponse, SearchResultItem, EntityType
+from ..services import search_service
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get("", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[List[EntityType]] = Query(None, description="Restrict to these entity types"),
+    limit: int = Query(20, ge=1, le=50),
+    current_user: Users = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Ranked full-text search across documents, community posts, resources
+    and groups. Only returns rows the caller is allowed to see.
+    """
+    rows = await search_service.search_all(
+        session=db,
+        user_id=current_user.user_id,
+        search=q,
+        entity_types=types,
+        limit=limit,
+    )
+    return SearchResponse(
+        query=q,
+        results=[SearchResultItem(**row) for row in rows],
+    )
@@ -0,0 +1,47 @@
+"""
+Mock storage service for OBJECT_STORE=local
+
+Plays the part Cloudinary plays in production for direct uploads: the
+client PUTs the raw file to the upload_url from a ticket, authorised by
+the signed X-Upload-Token header instead of a user session. Only mounted
+when the local object store is active (see app.py).
+"""
+
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from ..services.object_store import (
+    InvalidUploadToken,
+    UploadTooLarge,
+    get_object_store,
+    verify_token,
+)
+
+router = APIRouter(prefix="/storage-uploads", tags=["storage"])
+
+
+@router.put("/{key:path}", status_code=201)
+async def receive_direct_upload(
+    key: str,
+    request: Request,
+    x_upload_token: str = Header(...)
+):
+    """Store a file uploaded with a ticket from POST /resources/uploads/sign"""
+
+    try:
+        claims = verify_token(x_upload_token)
+    except InvalidUploadToken as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    if claims["key"] != key:
+        raise HTTPException(status_code=403, detail="Upload token is for a different object")
+
+    max_bytes = claims["max_bytes"]
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    try:
+        size = await get_object_store().receive(key, request.stream(), max_bytes)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    return {"key": key, "size": size}
@@ -20,6 +20,7 @@ from ..schemas.study_sessions import (
 from ..services.activity_service import update_daily_stats
 from ..services import study_session_service
 from ..services.group_service import get_group_by_id, is_user_in_group
+from ..services.progress_ingest_service import progress_ingestor
 
 router = APIRouter(prefix="/study-sessions", tags=["study-sessions"])
 
@@ -85,6 +86,9 @@ async def create_study_session(
     )
     
     await db.commit()
+
+    # Session over: persist any buffered reading progress
+    await progress_ingestor.flush(user_id=current_user.user_id)
     
     # Return with computed fields
     return StudySessionResponse(
@@ -93,8 +93,11 @@ class PostResponse(BaseModel):
 
 class PostListResponse(BaseModel):
     posts: list[PostResponse]
-    total: int
-    skip: int
+    # Keyset pagination: pass next_cursor back as ?cursor= for the next page
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    # Only with ?include_total=true; cached, so may lag by up to a minute
+    total: Optional[int] = None
     limit: int
 
 
@@ -134,12 +137,28 @@ class CommentResponse(BaseModel):
     is_edited: bool
     created_at: datetime
     updated_at: datetime
-    replies: list["CommentResponse"] = []  # populated in the route for top-level comments
+    replies: list["CommentResponse"] = []  # the first few replies, a few levels deep
+    reply_count: int = 0
+    # reply_count > len(replies): the rest come from /comments/{id}/replies,
+    # with ?cursor=replies_cursor when some were already shown
+    replies_cursor: Optional[str] = None
 
 
 CommentResponse.model_rebuild()  # needed for the self-referencing `replies` field
 
 
+class CommentThreadResponse(BaseModel):
+    comments: list[CommentResponse]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
+class CommentRepliesResponse(BaseModel):
+    replies: list[CommentResponse]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
 # ============================================================
 # Sidebar
 # ============================================================
@@ -149,7 +168,7 @@ class RecentUploadItem(BaseModel):
 
     post_id: int
     title: str
-    meta: str  # e.g. "PDF · 8 pages" — built in the route from resource fields
+    meta: str  # e.g. "8 pages · PDF" — built by community_service from resource fields
 
 
 class TopContributorItem(BaseModel):
@@ -167,7 +186,7 @@ class PostFilterParams(BaseModel):
     post_type: Optional[PostType] = None
     group_id: Optional[int] = None
     search: Optional[str] = None
-    skip: int = 0
+    cursor: Optional[str] = None
     limit: int = 20
 
 
@@ -7,6 +7,7 @@ from ..database.models import ResourceType, ResourceStatus
 class ResourceType(str, Enum):
     image = "image"
     video = "video"
+    pdf = "pdf"
     file = "file"
     folder = "folder"
     link = "link"
@@ -65,6 +66,28 @@ class ResourceWithUploaderInfo(ResourceResponse):
     uploader_first_name: Optional[str] = None
     uploader_last_name: Optional[str] = None
 
+class ResourceTreeNode(BaseModel):
+    """
+    One node of a folder tree (GET /resources/folders/tree)
+
+    total_size / file_count / folder_count are rolled up over everything
+    below this node (the node itself excluded). The virtual root of a
+    whole library has id = null.
+    """
+    id: Optional[int]
+    title: Optional[str]
+    resource_type: str
+    parent_folder_id: Optional[int]
+    group_id: Optional[int]
+    file_size: Optional[int]
+    depth: int
+    total_size: int = 0
+    file_count: int = 0
+    folder_count: int = 0
+    children: list["ResourceTreeNode"] = []
+
+ResourceTreeNode.model_rebuild()
+
 # ============================================================================
 # SHARING SCHEMAS - For moving resources between contexts
 # ============================================================================
@@ -97,6 +120,33 @@ class MoveResourceRequest(BaseModel):
         description="Target group ID (null = make personal)"
     )
 
+class DirectUploadRequest(BaseModel):
+    """
+    Ask for a signed ticket to upload a file straight to storage
+    
+    Example:
+        POST /resources/uploads/sign
+        { "filename": "notes.pdf", "content_type": "application/pdf", "size": 1048576 }
+    """
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: str = Field(..., description="MIME type the client will upload")
+    size: int = Field(..., ge=0, description="File size in bytes")
+    group_id: Optional[int] = Field(None, description="GroupId None, resource is personal")
+    parent_folder_id: Optional[int] = None
+    description: Optional[str] = Field(None, max_length=1000)
+
+class DirectUploadTicket(BaseModel):
+    """Where to send the file; hand upload_token to /resources/uploads/complete afterwards"""
+    upload_url: str
+    method: str
+    fields: dict = Field(default_factory=dict, description="Form fields to send along with the file")
+    headers: dict = Field(default_factory=dict)
+    upload_token: str
+    expires_in: int = Field(..., description="Seconds the ticket stays valid")
+
+class DirectUploadComplete(BaseModel):
+    upload_token: str
+
 # ============================================================================
 # PROGRESS TRACKING SCHEMAS - For Pillar 2
 # ============================================================================
@@ -174,5 +224,31 @@ class ResourceWithProgress(ResourceResponse):
         description="User's progress on this resource"
     )
 
+class ResourceLibraryPage(BaseModel):
+    """
+    One page of GET /resources/library
 
+    Pass next_cursor back as ?cursor= for the next page.
+    """
+    items: list[ResourceWithProgress]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
 
+
+class SummaryJobResponse(BaseModel):
+    """
+    A summarization job (POST /resources/{id}/summaries)
+    
+    Poll GET /resources/summaries/jobs/{job_id} until status is
+    "succeeded" or "failed". cached=True means the summary came straight
+    from the cache without a model call.
+    """
+    job_id: str
+    resource_id: int
+    status: str  # queued | running | succeeded | failed
+    summary: Optional[str] = None
+    model: Optional[str] = None
+    error: Optional[str] = None
+    cached: bool = False
+    created_at: datetime
+    finished_at: Optional[datetime] = None
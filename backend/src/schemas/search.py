@@ -0,0 +1,21 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+from typing import List, Literal, Optional
+
+EntityType = Literal["document", "post", "resource", "group"]
+
+
+class SearchResultItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    entity_type: EntityType
+    id: int
+    title: str
+    snippet: Optional[str] = None  # escaped text; the only markup is <mark> around matches
+    rank: float
+    created_at: datetime
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResultItem]
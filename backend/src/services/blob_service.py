@@ -0,0 +1,200 @@
+"""
+Content-addressed, reference-counted file storage.
+
+Uploads are identified by the sha256 of their bytes. The first upload of
+some content stores it and creates a StoredBlobs row; every later upload
+of the same bytes (the lecture PDF each course member uploads) skips the
+transfer to storage and just takes another reference. Resources point at
+their blob through Resources.blob_id, and the storage object is deleted
+only when the last reference is released.
+
+Concurrency relies on row locks, not application locks:
+    - acquire_existing bumps ref_count with a conditional UPDATE, which
+      waits for a concurrent release of the same row and then sees
+      whether the blob survived
+    - register_blob upserts on content_hash, so two simultaneous first
+      uploads of the same bytes converge on one row; the loser deletes
+      its now-redundant object
+    - release_blob decrements and deletes the row in the caller's
+      transaction, so a ref_count of 0 is never visible to others;
+      storage is removed after commit (see delete_released_object)
+"""
+
+import json
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..database.models import StoredBlobs, Resources
+from .object_store import StoredObject, get_object_store
+from .upload_service import store_upload, hash_upload
+from .resource_tree_service import subtree_ids
+
+
+async def acquire_existing(session: AsyncSession, content_hash: str) -> Optional[StoredBlobs]:
+    """Take a reference on a live blob with this content, if there is one."""
+    result = await session.execute(
+        update(StoredBlobs)
+        .where(and_(StoredBlobs.content_hash == content_hash, StoredBlobs.ref_count > 0))
+        .values(ref_count=StoredBlobs.ref_count + 1)
+        .returning(StoredBlobs)
+    )
+    return result.scalars().first()
+
+
+async def register_blob(
+    session: AsyncSession,
+    content_hash: str,
+    stored: StoredObject,
+) -> StoredBlobs:
+    """
+    Record a freshly stored object as the blob for content_hash, holding
+    one reference. If another upload of the same bytes registered first,
+    returns that blob instead (with our reference added); the caller must
+    then discard its own object.
+    """
+    stmt = pg_insert(StoredBlobs).values(
+        content_hash=content_hash,
+        storage_key=stored.key,
+        url=stored.url,
+        size=stored.size,
+        content_type=stored.content_type,
+        storage=json.dumps(stored.storage) if stored.storage else None,
+        ref_count=1,
+    )
+    result = await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[StoredBlobs.content_hash],
+            set_={"ref_count": StoredBlobs.ref_count + 1},
+        ).returning(StoredBlobs)
+    )
+    return result.scalars().one()
+
+
+async def release_blob(
+    session: AsyncSession,
+    blob_id: int,
+    references: int = 1,
+) -> Optional[Tuple[str, Optional[dict]]]:
+    """
+    Drop `references` references. If those were the last ones, returns the
+    (storage key, storage details) to delete once the transaction commits,
+    else None.
+    """
+    result = await session.execute(
+        update(StoredBlobs)
+        .where(StoredBlobs.id == blob_id)
+        .values(ref_count=StoredBlobs.ref_count - references)
+        .returning(StoredBlobs.ref_count)
+    )
+    remaining = result.scalar()
+    if remaining is None or remaining > 0:
+        return None
+
+    result = await session.execute(
+        delete(StoredBlobs)
+        .where(and_(StoredBlobs.id == blob_id, StoredBlobs.ref_count <= 0))
+        .returning(StoredBlobs.storage_key, StoredBlobs.storage)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return row.storage_key, json.loads(row.storage) if row.storage else None
+
+
+async def release_subtree_blobs(
+    session: AsyncSession,
+    root_id: int,
+) -> Tuple[List[Tuple[str, Optional[dict]]], List[str]]:
+    """
+    Detach a resource and all of its live descendants from their blobs, for
+    deleting a folder for good. Several files of the subtree sharing one
+    blob release it in a single UPDATE. Returns ((key, storage) of fully
+    released blobs, URLs of files that never had a blob); delete both once
+    the transaction commits.
+    """
+    result = await session.execute(
+        select(Resources.id, Resources.blob_id, Resources.url)
+        .where(Resources.id.in_(subtree_ids(root_id)))
+    )
+    rows = result.all()
+
+    references = Counter(blob_id for _, blob_id, _ in rows if blob_id is not None)
+    if references:
+        await session.execute(
+            update(Resources)
+            .where(Resources.id.in_([id for id, blob_id, _ in rows if blob_id is not None]))
+            .values(blob_id=None)
+            .execution_options(synchronize_session="fetch")
+        )
+
+    released = []
+    for blob_id, count in references.items():
+        released_object = await release_blob(session, blob_id, count)
+        if released_object is not None:
+            released.append(released_object)
+    return released, [url for _, blob_id, url in rows if blob_id is None]
+
+
+async def delete_released_object(storage_key: Optional[str], storage: Optional[dict] = None) -> None:
+    """
+    Remove the storage object of a fully released blob (call after commit).
+    `storage` is the blob's backend details: Cloudinary needs the resource
+    type to delete anything but images.
+    """
+    if storage_key is None:
+        return
+    try:
+        await get_object_store().delete(storage_key, storage)
+    except Exception as e:
+        print(f"Warning: Could not delete blob {storage_key} from storage: {e}")
+
+
+async def adopt_stored_object(
+    session: AsyncSession,
+    content_hash: Optional[str],
+    stored: StoredObject,
+) -> Optional[StoredBlobs]:
+    """
+    Reference-count an object that already landed in storage (direct
+    uploads). When the same bytes were already stored, the existing blob
+    is returned and the caller should delete stored.key (with
+    stored.storage) after commit.
+    Returns None when the store couldn't hash the object (no dedup).
+    """
+    if content_hash is None:
+        return None
+
+    blob = await acquire_existing(session, content_hash)
+    if blob is None:
+        blob = await register_blob(session, content_hash, stored)
+    return blob
+
+
+async def store_deduplicated(
+    session: AsyncSession,
+    file: UploadFile,
+    folder: str,
+    max_size_mb: int,
+) -> StoredBlobs:
+    """
+    Store an upload by content: hash it, reuse the existing blob if the
+    bytes are already stored, otherwise upload once and register it.
+    Raises HTTPException like upload_service.store_upload.
+    """
+    content_hash = await hash_upload(file, max_size_mb)
+
+    blob = await acquire_existing(session, content_hash)
+    if blob is not None:
+        return blob
+
+    stored = await store_upload(file, folder=folder, max_size_mb=max_size_mb)
+    blob = await register_blob(session, content_hash, stored)
+    if blob.storage_key != stored.key:
+        # A concurrent upload of the same bytes won the race
+        await delete_released_object(stored.key, stored.storage)
+    return blob
@@ -0,0 +1,84 @@
+"""
+Small in-process TTL cache shared by services that memoize hot reads.
+
+Keys are tuples so a whole family of entries can be dropped at once with
+invalidate_prefix(), e.g. every cached feed count for one group. Entries
+live in this process only (same as the WebSocket connection managers),
+so TTLs should stay short enough that a missed invalidation on another
+worker self-heals quickly.
+
+Writers invalidate through invalidate_after_commit(): the entries go at
+once and again when the writing transaction commits, so a read that
+races the write (flushed, not yet committed) can't put the old rows back
+for the whole TTL.
+"""
+
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, ttl_seconds: float, max_entries: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[Hashable, ...], Tuple[float, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[Hashable, ...], default: Any = None) -> Any:
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING or entry[0] < time.monotonic():
+            if entry is not _MISSING:
+                del self._entries[key]
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Tuple[Hashable, ...], value: Any, ttl_seconds: float | None = None) -> None:
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            # Dicts keep insertion order: drop the oldest entry
+            del self._entries[next(iter(self._entries))]
+        expires_at = time.monotonic() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        self._entries[key] = (expires_at, value)
+
+    def invalidate(self, key: Tuple[Hashable, ...]) -> None:
+        self._entries.pop(key, None)
+
+    def invalidate_prefix(self, prefix: Tuple[Hashable, ...]) -> None:
+        n = len(prefix)
+        for key in [k for k in self._entries if k[:n] == prefix]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def invalidate_after_commit(session: Optional[Any], cache: TTLCache, prefix: Tuple[Hashable, ...]) -> None:
+    """
+    Drop `cache` entries under `prefix` now and once more after `session`
+    commits. Pass session=None when the write is already committed.
+    """
+    cache.invalidate_prefix(prefix)
+    if session is not None:
+        session.info.setdefault("cache_invalidations", set()).add((cache, prefix))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(sync_session):
+    for cache, prefix in sync_session.info.pop("cache_invalidations", ()):
+        cache.invalidate_prefix(prefix)
@@ -0,0 +1,184 @@
+"""
+Per-user study context for the chatbot, cached between messages.
+
+The chatbot's system prompt is built from the user's profile, streak,
+this week's sessions and resource progress. None of that changes while a
+conversation is going on, so the aggregates and the rendered prompt are
+kept as one snapshot per user and rebuilt only when something they
+depend on changes:
+    - study sessions logged or deleted   (study_session_service)
+    - resource progress written          (resources_service, via
+                                          _invalidate_progress_stats)
+    - streak changes                     (streak_service)
+    - profile updates                    (user_service)
+Each of those calls invalidate_user_context with its session, which drops
+the snapshot now and again after commit (cache_service.invalidate_after_commit).
+Snapshots are also keyed by date, so "today" and "this week" roll over at
+midnight, and expire after
+CONTEXT_CACHE_TTL_SECONDS in case an invalidation happened on another
+worker.
+"""
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, case, and_
+
+from ..database.models import Users, Streaks, StudySessions, ResourceProgress, Resources, ResourceStatus
+from .cache_service import TTLCache, invalidate_after_commit
+
+CONTEXT_CACHE_TTL_SECONDS = 300
+_context_cache = TTLCache(ttl_seconds=CONTEXT_CACHE_TTL_SECONDS)
+
+
+@dataclass(frozen=True)
+class ContextSnapshot:
+    context: dict
+    system_prompt: str
+
+
+def invalidate_user_context(user_id: str, session: Optional[AsyncSession] = None) -> None:
+    invalidate_after_commit(session, _context_cache, (user_id,))
+
+
+def context_cache_stats() -> dict:
+    return _context_cache.stats()
+
+
+async def load_user_context(session: AsyncSession, user_id: str) -> dict:
+    """Query the Database for the user's actual study data (aggregated in SQL)"""
+    today = date.today()
+    week_ago = today - timedelta(days=7)
+
+    # 1. User and streak in one round trip
+    user_result = await session.execute(
+        select(Users, Streaks)
+        .outerjoin(Streaks, Streaks.user_id == Users.user_id)
+        .where(Users.user_id == user_id)
+    )
+    row = user_result.first()
+    user, streak = (row.Users, row.Streaks) if row else (None, None)
+
+    # 2. This week's and today's study time, without loading the sessions
+    is_today = StudySessions.session_date == today
+    sessions_result = await session.execute(
+        select(
+            func.coalesce(func.sum(StudySessions.duration_seconds), 0),
+            func.count(StudySessions.id),
+            func.coalesce(func.sum(case((is_today, StudySessions.duration_seconds), else_=0)), 0),
+            func.count(case((is_today, StudySessions.id))),
+        )
+        .where(
+            and_(
+                StudySessions.user_id == user_id,
+                StudySessions.session_date >= week_ago
+            )
+        )
+    )
+    weekly_seconds, session_count, today_seconds, today_count = sessions_result.one()
+
+    # 3. In-progress resources (titles only)
+    progress_result = await session.execute(
+        select(Resources.title)
+        .join(ResourceProgress, ResourceProgress.resource_id == Resources.id)
+        .where(
+            and_(
+                ResourceProgress.user_id == user_id,
+                ResourceProgress.status == ResourceStatus.IN_PROGRESS
+            )
+        )
+        .limit(5)
+    )
+    in_progress_titles = progress_result.scalars().all()
+
+    # 4. Completed resources this week
+    completed_result = await session.execute(
+        select(func.count(ResourceProgress.id))
+        .where(
+            and_(
+                ResourceProgress.user_id == user_id,
+                ResourceProgress.status == ResourceStatus.COMPLETED,
+                ResourceProgress.completed_at >= week_ago
+            )
+        )
+    )
+    completed_count = completed_result.scalar() or 0
+
+    return {
+        "username": user.username if user else "there",
+        "first_name": user.first_name if user else "there",
+
+        # Streak info
+        "current_streak": streak.current_streak if streak else 0,
+        "longest_streak": streak.longest_streak if streak else 0,
+
+        # Weekly activity
+        "weekly_study_minutes": weekly_seconds // 60,
+        "weekly_sessions": session_count,
+        "completed_this_week": completed_count,
+
+        # Today specific
+        "today_minutes": today_seconds // 60,
+        "studied_today": today_count > 0,
+
+        # Resources
+        "in_progress_count": len(in_progress_titles),
+        "in_progress_titles": list(in_progress_titles[:3]),
+
+        # Total stats
+        "total_study_hours": (user.total_study_time // 3600) if user else 0,
+    }
+
+
+def build_system_prompt(context: dict) -> str:
+    """Create personalized system prompt based on user context"""
+    prompt = f"""You are a helpful and encouraging study assistant for {context['first_name']}.
+
+CURRENT USER STATUS:
+• Name: {context['first_name']}
+• Current streak: {context['current_streak']} days (longest: {context['longest_streak']})
+• This week: {context['weekly_study_minutes']} minutes across {context['weekly_sessions']} sessions
+• Completed {context['completed_this_week']} resources this week
+• Today: {context['today_minutes']} minutes studied
+• Studied today: {'Yes ✓' if context['studied_today'] else 'Not yet'}
+• Total study time: {context['total_study_hours']} hours
+"""
+
+    if context['in_progress_count'] > 0:
+        prompt += f"\n• Currently working on {context['in_progress_count']} resources:"
+        for title in context['in_progress_titles']:
+            prompt += f"\n  - {title}"
+
+    prompt += """
+
+Your role:
+- Give PERSONALIZED advice based on their ACTUAL data above
+- Be encouraging and motivating
+- Use their name naturally
+- Reference their specific progress, streak, and resources
+- Keep responses concise (2-3 sentences usually)
+- Use emojis sparingly: 🔥 for streaks, 📚 for study, 🎯 for goals, ✨ for achievements
+- If they're doing well, celebrate it! If they need motivation, encourage them!
+
+Examples of good responses:
+- "Great week, Alice! You've logged 340 minutes - that's serious dedication! 🔥"
+- "Your 12-day streak is impressive! Just 3 more days to beat your record of 15!"
+- "I see you're working on Calculus Notes. How's that going?"
+
+Avoid generic responses. Always use their actual data!
+"""
+    return prompt
+
+
+async def get_context_snapshot(session: AsyncSession, user_id: str) -> ContextSnapshot:
+    """The user's context and system prompt, from the cache when nothing changed"""
+    key = (user_id, date.today())
+    snapshot = _context_cache.get(key)
+    if snapshot is None:
+        context = await load_user_context(session, user_id)
+        snapshot = ContextSnapshot(context=context, system_prompt=build_system_prompt(context))
+        _context_cache.set(key, snapshot)
+    return snapshot
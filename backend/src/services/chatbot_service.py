@@ -1,15 +1,15 @@
 # backend/src/services/chatbot_service.py
 
-from openai import AsyncOpenAI
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func
-from sqlalchemy.future import select
-from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
+from ..database.database import async_session_local
 from ..database.models import Users
-from ..database.models import Users, Streaks, StudySessions, ResourceProgress, Resources, ResourceStatus
 from .chatbot_conversation_service import ConversationService
-import os
+from .chatbot_context_service import get_context_snapshot, build_system_prompt
+from .llm_gateway import llm_gateway, CallMetrics
+
+CHAT_MODEL = "llama-3.3-70b-versatile"
+CHAT_MAX_TOKENS = 300
 
 class ChatbotService:
     def __init__(self, db: AsyncSession, user: Users):
@@ -17,137 +17,67 @@ class ChatbotService:
         self.user_id = user.user_id if user else None
         self.user = user
 
-        # Initialize Groq client (uses OpenAI-compatible API)
-        self.client = AsyncOpenAI(
-            api_key=os.getenv("GROQ_API_KEY"),
-            base_url="https://api.groq.com/openai/v1"
-        )
+        # Groq calls go through the shared gateway (pooled client, limits, retries)
+        self.llm = llm_gateway
 
         # Initialize conversation service
         if self.user_id:
             self.conversation = ConversationService(db, self.user_id)
 
     async def build_user_context(self) -> dict:
-        """Query the Database to get user's actual study data"""
-        print(f"📊 Building context for user: {self.user_id}")
-        
-        # 1. Get user basic info 
-        user_result = await self.db.execute(
-            select(Users).where(Users.user_id == self.user_id)
-        )
-        user = user_result.scalar_one_or_none()  # ✨ FIXED
-
-        # 2. Get streak data - ✨ FIX: Same here
-        streak_result = await self.db.execute(
-            select(Streaks).where(Streaks.user_id == self.user_id)
-        )
-        streak = streak_result.scalar_one_or_none()  # ✨ FIXED
-
-        # 3. Get this week's study sessions
-        today = datetime.now().date()
-        week_ago = today - timedelta(days=7)
-
-        sessions_result = await self.db.execute(
-            select(StudySessions)
-            .where(StudySessions.user_id == self.user_id)
-            .where(StudySessions.session_date >= week_ago)
-        )
-        weekly_sessions = sessions_result.scalars().all()
-
-        # Calculate weekly stats
-        total_minutes = sum(s.duration_seconds for s in weekly_sessions) // 60
-        session_count = len(weekly_sessions)
-        
-        # 4. Get today's study time
-        today_sessions = [s for s in weekly_sessions if s.session_date == today]
-        today_minutes = sum(s.duration_seconds for s in today_sessions) // 60
-        
-        # 5. Get in-progress resources
-        progress_result = await self.db.execute(
-            select(ResourceProgress, Resources)
-            .join(Resources)
-            .where(ResourceProgress.user_id == self.user_id)
-            .where(ResourceProgress.status == ResourceStatus.IN_PROGRESS)
-            .limit(5)
-        )
-        in_progress = progress_result.all()
-        
-        # 6. Get completed resources this week
-        completed_result = await self.db.execute(
-            select(func.count(ResourceProgress.id))
-            .where(ResourceProgress.user_id == self.user_id)
-            .where(ResourceProgress.status == ResourceStatus.COMPLETED)
-            .where(ResourceProgress.completed_at >= week_ago)
-        )
-        completed_count = completed_result.scalar() or 0
-        # Build context dictionary
-        context = {
-            "username": user.username if user else "there",  
-            "first_name": user.first_name if user else "there",  
-            
-            # Streak info
-            "current_streak": streak.current_streak if streak else 0,
-            "longest_streak": streak.longest_streak if streak else 0,
-            
-            # Weekly activity
-            "weekly_study_minutes": total_minutes,
-            "weekly_sessions": session_count,
-            "completed_this_week": completed_count,
-            
-            # Today specific
-            "today_minutes": today_minutes,
-            "studied_today": len(today_sessions) > 0,
-            
-            # Resources
-            "in_progress_count": len(in_progress),
-            "in_progress_titles": [item.Resources.title for item in in_progress[:3]],
-            
-            # Total stats - 
-            "total_study_hours": (user.total_study_time // 3600) if user else 0,
-        }
-        
-        print(f" Context built: {context['first_name']} - {context['current_streak']} day streak")
-        return context
+        """The user's actual study data (cached per user, see chatbot_context_service)"""
+        snapshot = await get_context_snapshot(self.db, self.user_id)
+        return snapshot.context
     
     def _build_system_prompt(self, context: dict) -> str:  # 
         """Create personalized system prompt based on user context"""
-        prompt = f"""You are a helpful and encouraging study assistant for {context['first_name']}.
-
-CURRENT USER STATUS:
-• Name: {context['first_name']}
-• Current streak: {context['current_streak']} days (longest: {context['longest_streak']})
-• This week: {context['weekly_study_minutes']} minutes across {context['weekly_sessions']} sessions
-• Completed {context['completed_this_week']} resources this week
-• Today: {context['today_minutes']} minutes studied
-• Studied today: {'Yes ✓' if context['studied_today'] else 'Not yet'}
-• Total study time: {context['total_study_hours']} hours
-"""
+        return build_system_prompt(context)
+    
+    async def _prepare_conversation(
+            self,
+            user_message: str,
+            session_id: Optional[str] = None
+            ) -> tuple[list, str]:
+        """Save the user's message and build the messages to send (system + history + message)"""
+        #get or create session_id
+        if not session_id:
+            session_id = await self.conversation.get_or_create_session_id()
+
+        # Save user message to DB
+        await self.conversation.save_message(
+            role="user",
+            content=user_message,
+            session_id=session_id
+        )
+        
+        # Context + system prompt, rebuilt only when the user's data changed
+        snapshot = await get_context_snapshot(self.db, self.user_id)
 
-        if context['in_progress_count'] > 0:
-            prompt += f"\n• Currently working on {context['in_progress_count']} resources:"
-            for title in context['in_progress_titles']:
-                prompt += f"\n  - {title}"
+        #Load recent conversation history
+        history = await self.conversation.get_recent_history(
+            limit=10, #last 5 exchanges 10 message
+            session_id=session_id
+        )
+        
+        # build messages for AI (system + history + current message)
+        messages = [{"role": "system", "content": snapshot.system_prompt}]
 
-        prompt += """
+        # add conversation history (excluding the current message we just saved)
+        for msg in history[:-1]:
+            messages.append({
+                "role": msg["role"],
+                "content": msg["content"]
+            })
 
-Your role:
-- Give PERSONALIZED advice based on their ACTUAL data above
-- Be encouraging and motivating
-- Use their name naturally
-- Reference their specific progress, streak, and resources
-- Keep responses concise (2-3 sentences usually)
-- Use emojis sparingly: 🔥 for streaks, 📚 for study, 🎯 for goals, ✨ for achievements
-- If they're doing well, celebrate it! If they need motivation, encourage them!
+        # add current user message
+        messages.append({
+            "role": "user",
+            "content": user_message
+        })
 
-Examples of good responses:
-- "Great week, Alice! You've logged 340 minutes - that's serious dedication! 🔥"
-- "Your 12-day streak is impressive! Just 3 more days to beat your record of 15!"
-- "I see you're working on Calculus Notes. How's that going?"
+        print(f"💬 Sending to Groq with {len(messages)} messages in context")
+        return messages, session_id
 
-Avoid generic responses. Always use their actual data!
-"""
-        return prompt
-    
     async def get_personalized_response(
             self, 
             user_message: str,
@@ -157,65 +87,24 @@ Avoid generic responses. Always use their actual data!
         Get AI response with user context and converstaion history
         """
         try:
-            #get or create session_id
-            if not session_id:
-                session_id = await self.conversation.get_or_create_session_id()
-
-            # Save user message to DB
-            await self.conversation.save_message(
-                role="user",
-                content=user_message,
-                session_id=session_id
-            )
-            
-            # Build context from DB
-            context = await self.build_user_context()
-
-            #Load recent conversation history
-            history = await self.conversation.get_recent_history(
-                limit=10, #last 5 exchanges 10 message
-                session_id=session_id
-            )
-            
-            # Create personalized system prompt
-            system_prompt = self._build_system_prompt(context)
-            
-            # build messages for AI (system + history + current message)
-            messages = [{"role": "system", "content": system_prompt}]
-
-            # add conversation history (excluding the current message we just saved)
-            for msg in history[:-1]:
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-
-            # add current user message
-            messages.append({
-                "role": "user",
-                "content": user_message
-            })
-
-            print(f"💬 Sending to Groq with {len(messages)} messages in context")
+            messages, session_id = await self._prepare_conversation(user_message, session_id)
 
             # Call Groq API with full context
-            response = await self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
+            assistant_message, metrics = await self.llm.chat(
+                model=CHAT_MODEL,
                 messages=messages,
                 temperature=0.7,
-                max_tokens=300
+                max_tokens=CHAT_MAX_TOKENS,
+                user_id=self.user_id
             )
 
-            assistant_message = response.choices[0].message.content
-            tokens_used = response.usage.total_tokens if hasattr(response, 'usage') else None
-
             # Save assistant response to DB
             await self.conversation.save_message(
                 role="assistant",
                 content=assistant_message,
                 session_id=session_id,
-                tokens_used=tokens_used,
-                modle_used="llama-3.3-70b-versatile"
+                tokens_used=metrics.total_tokens,
+                modle_used=CHAT_MODEL
             )
 
             #commit all changes to database
@@ -231,6 +120,58 @@ Avoid generic responses. Always use their actual data!
             await self.db.rollback()
             raise Exception(f"Failed to get response from AI: {str(e)}")
 
+    async def stream_personalized_response(
+            self,
+            user_message: str,
+            session_id: Optional[str] = None
+            ) -> tuple[AsyncIterator[str], str]:
+        """
+        Streaming version of get_personalized_response: returns the reply
+        as an async iterator of text deltas, plus the session id.
+
+        The user's message is committed up front. The assistant's reply is
+        saved only once the model finishes; closing the iterator early
+        (client went away) closes the upstream stream, which stops the
+        generation, and nothing is saved for it.
+        """
+        try:
+            messages, session_id = await self._prepare_conversation(user_message, session_id)
+            await self.db.commit()
+        except Exception as e:
+            print(f"❌ Error preparing streamed response: {e}")
+            await self.db.rollback()
+            raise Exception(f"Failed to get response from AI: {str(e)}")
+
+        return self._stream_reply(messages, session_id), session_id
+
+    async def _stream_reply(self, messages: list, session_id: str) -> AsyncIterator[str]:
+        metrics = CallMetrics(provider="groq", model=CHAT_MODEL, user_id=self.user_id)
+        parts = []
+        async for text in self.llm.chat_stream(
+            model=CHAT_MODEL,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=CHAT_MAX_TOKENS,
+            user_id=self.user_id,
+            metrics=metrics
+        ):
+            parts.append(text)
+            yield text
+
+        # Only reached when the stream completed. The request's session may
+        # already be closed by now: use our own
+        async with async_session_local() as db:
+            await ConversationService(db, self.user_id).save_message(
+                role="assistant",
+                content="".join(parts),
+                session_id=session_id,
+                tokens_used=metrics.total_tokens,
+                modle_used=CHAT_MODEL
+            )
+            await db.commit()
+
+        print(f"streamed response saved (session: {session_id[:8]}...)")
+
     # Keep the simple version for testing
     async def get_simple_response(self, user_message: str) -> str:
         """
@@ -239,8 +180,8 @@ Avoid generic responses. Always use their actual data!
         """
         try:
             # Call Groq API
-            response = await self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
+            response, _ = await self.llm.chat(
+                model=CHAT_MODEL,
                 messages=[
                     {
                         "role": "system",
@@ -252,10 +193,11 @@ Avoid generic responses. Always use their actual data!
                     }
                 ],
                 temperature=0.7,
-                max_tokens=200
+                max_tokens=200,
+                user_id=self.user_id
             )
             
-            return response.choices[0].message.content
+            return response
             
         except Exception as e:
             print(f"❌ Groq API Error: {e}")
@@ -6,20 +6,45 @@ permission checks first, then CRUD, then reactions/comments, then stats.
 """
 
 import json
-from datetime import datetime
 from typing import Optional, List, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, and_, func, tuple_, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from ..database.models import (
     Posts, PostLikes, PostSaves, PostComments,
-    Users, Groups, Resources, PostType,
+    Users, Groups, Resources, PostType, ContributorStats,
 )
 from .group_service import is_user_in_group
 from .group_service import is_user_in_group, get_group_members
 from ..schemas.notifications import CreateNotificationRequest
 from .notification_service import create_notification
+from . import search_service
+from .cache_service import TTLCache, invalidate_after_commit
+from .keyset import encode_cursor, decode_cursor
+from . import timeline_service
+
+# Feed totals are only a UI hint ("~1.2k posts"), so they come from a short
+# TTL cache instead of a COUNT(*) over the whole feed on every page.
+FEED_COUNT_TTL_SECONDS = 60
+_feed_count_cache = TTLCache(ttl_seconds=FEED_COUNT_TTL_SECONDS)
+
+# Rendered comment threads, keyed by (post_id, ...) so add_comment /
+# delete_comment drop every cached page of a post at once
+COMMENT_THREAD_TTL_SECONDS = 30
+_comment_thread_cache = TTLCache(ttl_seconds=COMMENT_THREAD_TTL_SECONDS)
+# Levels of replies loaded under a top-level comment; deeper ones are
+# fetched on demand through get_comment_replies
+COMMENT_REPLY_DEPTH = 3
+
+# Sidebar widgets render on every feed view but change slowly. Each widget
+# caches one board of SIDEBAR_MAX_ITEMS rows (routes slice it to `limit`),
+# dropped by the write paths that can change it; the TTL only bounds
+# staleness of joined fields such as usernames and page counts.
+SIDEBAR_TTL_SECONDS = 300
+SIDEBAR_MAX_ITEMS = 20
+_sidebar_cache = TTLCache(ttl_seconds=SIDEBAR_TTL_SECONDS)
 # ============================================================================
 # PERMISSION CHECKS
 # ============================================================================
@@ -145,6 +170,12 @@ async def create_post(
     )
     session.add(post)
     await session.flush()  # get autogenerated id
+    invalidate_after_commit(session, _feed_count_cache, ())
+    if post_type == PostType.RESOURCE:
+        invalidate_after_commit(session, _sidebar_cache, ("recent_uploads",))
+    await _bump_contributor(session, user_id, posts=1)
+
+    await timeline_service.fan_out_post(session, post.id, user_id, group_id)
 
     # Notify group members, same pattern as create_resource
     if group_id is not None:
@@ -178,33 +209,71 @@ async def create_post(
 # READ
 # ============================================================================
 
+def _feed_filters(
+    post_type: Optional[PostType],
+    group_id: Optional[int],
+    search: Optional[str],
+) -> list:
+    filters = [Posts.is_deleted == False]
+    if post_type:
+        filters.append(Posts.post_type == post_type)
+    if group_id:
+        filters.append(Posts.group_id == group_id)
+    if search:
+        filters.append(search_service.matches(Posts, search))
+    return filters
+
+
 async def get_posts(
     session: AsyncSession,
     post_type: Optional[PostType] = None,
     group_id: Optional[int] = None,
     search: Optional[str] = None,
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 20,
-) -> Tuple[List[Posts], int]:
-    query = select(Posts).where(Posts.is_deleted == False)
-
-    if post_type:
-        query = query.where(Posts.post_type == post_type)
-    if group_id:
-        query = query.where(Posts.group_id == group_id)
-    if search:
-        pattern = f"%{search}%"
-        query = query.where(or_(Posts.title.ilike(pattern), Posts.text.ilike(pattern)))
+) -> Tuple[List[Posts], Optional[str]]:
+    """
+    Keyset-paginated feed, newest first. Returns (posts, next_cursor);
+    next_cursor is None on the last page. Each page is an index range scan
+    on (created_at, id) -- cost doesn't grow with depth the way OFFSET does.
+    """
+    query = select(Posts).where(and_(*_feed_filters(post_type, group_id, search)))
 
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await session.execute(count_query)
-    total = total_result.scalar_one()
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(Posts.created_at, Posts.id) < tuple_(cursor_created_at, cursor_id)
+        )
 
-    query = query.order_by(Posts.created_at.desc()).offset(skip).limit(limit)
+    # One extra row tells us whether there is a next page, without a COUNT
+    query = query.order_by(Posts.created_at.desc(), Posts.id.desc()).limit(limit + 1)
     result = await session.execute(query)
-    posts = result.scalars().all()
+    posts = list(result.scalars().all())
 
-    return list(posts), total
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(posts[-1].created_at, posts[-1].id)
+
+    return posts, next_cursor
+
+
+async def get_posts_total(
+    session: AsyncSession,
+    post_type: Optional[PostType] = None,
+    group_id: Optional[int] = None,
+    search: Optional[str] = None,
+) -> int:
+    """Cached (up to FEED_COUNT_TTL_SECONDS stale) count of a filtered feed."""
+    key = ("feed_count", group_id, post_type, search)
+    total = _feed_count_cache.get(key)
+    if total is None:
+        result = await session.execute(
+            select(func.count(Posts.id)).where(and_(*_feed_filters(post_type, group_id, search)))
+        )
+        total = result.scalar_one()
+        _feed_count_cache.set(key, total)
+    return total
 
 
 async def get_post_reaction_state(
@@ -218,6 +287,55 @@ async def get_post_reaction_state(
     return {"liked_by_me": liked, "saved_by_me": saved}
 
 
+async def hydrate_posts(
+    session: AsyncSession,
+    user_id: str,
+    posts: List[Posts],
+) -> dict:
+    """
+    Load everything a page of post DTOs needs in a fixed number of queries
+    (one IN-list query per related table, whatever the page size):
+        {"authors": {user_id: Users}, "groups": {group_id: Groups},
+         "resources": {resource_id: Resources},
+         "liked": {post_id, ...}, "saved": {post_id, ...}}
+    """
+    post_ids = [p.id for p in posts]
+    author_ids = {p.user_id for p in posts}
+    group_ids = {p.group_id for p in posts if p.group_id}
+    resource_ids = {p.resource_id for p in posts if p.resource_id}
+
+    hydrated = {"authors": {}, "groups": {}, "resources": {}, "liked": set(), "saved": set()}
+    if not posts:
+        return hydrated
+
+    result = await session.execute(select(Users).where(Users.user_id.in_(author_ids)))
+    hydrated["authors"] = {u.user_id: u for u in result.scalars().all()}
+
+    if group_ids:
+        result = await session.execute(select(Groups).where(Groups.id.in_(group_ids)))
+        hydrated["groups"] = {g.id: g for g in result.scalars().all()}
+
+    if resource_ids:
+        result = await session.execute(select(Resources).where(Resources.id.in_(resource_ids)))
+        hydrated["resources"] = {r.id: r for r in result.scalars().all()}
+
+    result = await session.execute(
+        select(PostLikes.post_id).where(
+            and_(PostLikes.user_id == user_id, PostLikes.post_id.in_(post_ids))
+        )
+    )
+    hydrated["liked"] = set(result.scalars().all())
+
+    result = await session.execute(
+        select(PostSaves.post_id).where(
+            and_(PostSaves.user_id == user_id, PostSaves.post_id.in_(post_ids))
+        )
+    )
+    hydrated["saved"] = set(result.scalars().all())
+
+    return hydrated
+
+
 # ============================================================================
 # UPDATE
 # ============================================================================
@@ -255,97 +373,324 @@ async def delete_post(
 
     post.is_deleted = True
     await session.flush()
+    invalidate_after_commit(session, _feed_count_cache, ())
+    if post.post_type == PostType.RESOURCE:
+        invalidate_after_commit(session, _sidebar_cache, ("recent_uploads",))
+    await _bump_contributor(session, post.user_id, posts=-1)
     return True
 
 
 # ============================================================================
 # REACTIONS: like / save / share
 # ============================================================================
+# Every reaction is a couple of single-row statements instead of
+# load-mutate-flush on the Posts row: the toggle row is removed with
+# DELETE ... RETURNING or added with INSERT ... ON CONFLICT DO NOTHING
+# RETURNING, and the denormalized counter moves with an atomic
+# `SET x = x + 1 ... RETURNING x`. Concurrent likers never lose updates and
+# only hold the post's row lock for the duration of one UPDATE.
+
+async def _bump_counter(
+    session: AsyncSession,
+    post_id: int,
+    column,
+    delta: int,
+) -> Optional[int]:
+    """Atomically add `delta` to a Posts counter; None if the post is gone."""
+    result = await session.execute(
+        update(Posts)
+        .where(and_(Posts.id == post_id, Posts.is_deleted == False))
+        .values({column: func.greatest(column + delta, 0)})
+        .returning(column)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none()
 
-async def toggle_like(
+
+async def _read_counter(session: AsyncSession, post_id: int, column) -> Optional[int]:
+    result = await session.execute(
+        select(column).where(and_(Posts.id == post_id, Posts.is_deleted == False))
+    )
+    return result.scalar_one_or_none()
+
+
+async def _toggle_reaction(
     session: AsyncSession,
+    model,
+    counter,
     user_id: str,
     post_id: int,
 ) -> Tuple[bool, int]:
-    """Returns (is_now_liked, new_like_count)."""
-    post = await get_post_by_id(session, post_id)
-    if not post:
-        raise ValueError("Post not found")
-
-    existing = await _get_like(session, user_id, post_id)
+    removed = await session.execute(
+        delete(model)
+        .where(and_(model.user_id == user_id, model.post_id == post_id))
+        .returning(model.post_id)
+    )
+    if removed.first() is not None:
+        active, delta = False, -1
+    else:
+        inserted = await session.execute(
+            pg_insert(model)
+            .values(user_id=user_id, post_id=post_id)
+            .on_conflict_do_nothing()
+            .returning(model.post_id)
+        )
+        # Nothing inserted = a concurrent request of ours won the race
+        active, delta = True, (1 if inserted.first() is not None else 0)
 
-    if existing:
-        await session.delete(existing)
-        post.like_count = max(0, post.like_count - 1)
-        active = False
+    if delta:
+        count = await _bump_counter(session, post_id, counter, delta)
     else:
-        session.add(PostLikes(user_id=user_id, post_id=post_id))
-        post.like_count += 1
-        active = True
+        count = await _read_counter(session, post_id, counter)
 
-    await session.flush()
-    return active, post.like_count
+    if count is None:
+        raise ValueError("Post not found")
+    return active, count
 
 
-async def toggle_save(
+async def toggle_like(
     session: AsyncSession,
     user_id: str,
     post_id: int,
 ) -> Tuple[bool, int]:
-    """Returns (is_now_saved, new_save_count)."""
-    post = await get_post_by_id(session, post_id)
-    if not post:
-        raise ValueError("Post not found")
-
-    existing = await _get_save(session, user_id, post_id)
+    """Returns (is_now_liked, new_like_count)."""
+    return await _toggle_reaction(session, PostLikes, Posts.like_count, user_id, post_id)
 
-    if existing:
-        await session.delete(existing)
-        post.save_count = max(0, post.save_count - 1)
-        active = False
-    else:
-        session.add(PostSaves(user_id=user_id, post_id=post_id))
-        post.save_count += 1
-        active = True
 
-    await session.flush()
-    return active, post.save_count
+async def toggle_save(
+    session: AsyncSession,
+    user_id: str,
+    post_id: int,
+) -> Tuple[bool, int]:
+    """Returns (is_now_saved, new_save_count)."""
+    return await _toggle_reaction(session, PostSaves, Posts.save_count, user_id, post_id)
 
 
 async def increment_share_count(
     session: AsyncSession,
     post_id: int,
 ) -> int:
-    post = await get_post_by_id(session, post_id)
-    if not post:
+    share_count = await _bump_counter(session, post_id, Posts.share_count, 1)
+    if share_count is None:
         raise ValueError("Post not found")
-
-    post.share_count += 1
-    await session.flush()
-    return post.share_count
+    return share_count
 
 
 # ============================================================================
 # COMMENTS
 # ============================================================================
 
-async def get_post_comments(
+def _render_comment(comment: PostComments, authors: dict) -> dict:
+    author = authors[comment.user_id]
+    return {
+        "id": comment.id,
+        "post_id": comment.post_id,
+        "parent_comment_id": comment.parent_comment_id,
+        "text": comment.text,
+        "author": {
+            "user_id": author.user_id,
+            "username": author.username,
+            "first_name": author.first_name,
+            "last_name": author.last_name,
+        },
+        "is_edited": comment.is_edited,
+        "created_at": comment.created_at,
+        "updated_at": comment.updated_at,
+        "replies": [],
+        "reply_count": 0,
+        "replies_cursor": None,
+    }
+
+
+async def _comment_authors(session: AsyncSession, comments: List[PostComments]) -> dict:
+    user_ids = {c.user_id for c in comments}
+    if not user_ids:
+        return {}
+    result = await session.execute(select(Users).where(Users.user_id.in_(user_ids)))
+    return {u.user_id: u for u in result.scalars().all()}
+
+
+async def _reply_levels(
+    session: AsyncSession,
+    parent_ids: List[int],
+    depth: int,
+    per_comment: int,
+) -> Tuple[List[PostComments], dict]:
+    """
+    The first `per_comment` replies of each comment, `depth` levels down
+    from `parent_ids`, one query per level (plus one to count the replies
+    of the deepest level). Returns (replies level by level, oldest first
+    within each, {comment id: its total number of live replies}).
+    """
+    replies: List[PostComments] = []
+    counts: dict = {}
+    level = list(parent_ids)
+    for remaining in range(depth, -1, -1):
+        if not level:
+            break
+        if remaining == 0 or per_comment <= 0:
+            # Deepest loaded level: only how many replies wait behind it
+            result = await session.execute(
+                select(PostComments.parent_comment_id, func.count())
+                .where(and_(PostComments.parent_comment_id.in_(level), PostComments.is_deleted == False))
+                .group_by(PostComments.parent_comment_id)
+            )
+            counts.update(dict(result.all()))
+            break
+
+        ranked = (
+            select(
+                PostComments.id,
+                func.row_number().over(
+                    partition_by=PostComments.parent_comment_id,
+                    order_by=(PostComments.created_at.asc(), PostComments.id.asc()),
+                ).label("position"),
+                func.count().over(partition_by=PostComments.parent_comment_id).label("total"),
+            )
+            .where(and_(PostComments.parent_comment_id.in_(level), PostComments.is_deleted == False))
+            .subquery()
+        )
+        result = await session.execute(
+            select(PostComments, ranked.c.total)
+            .join(ranked, ranked.c.id == PostComments.id)
+            .where(ranked.c.position <= per_comment)
+            .order_by(PostComments.created_at.asc(), PostComments.id.asc())
+        )
+        rows = result.all()
+        for reply, total in rows:
+            counts[reply.parent_comment_id] = total
+        replies.extend(reply for reply, _ in rows)
+        level = [reply.id for reply, _ in rows]
+    return replies, counts
+
+
+def _attach_replies(rendered: dict, replies: List[PostComments], counts: dict) -> None:
+    """
+    Hang each rendered reply under its parent (`replies` oldest first per
+    parent) and set reply_count. A comment showing fewer replies than it
+    has gets `replies_cursor` after the last one shown; with none shown,
+    its replies start from the beginning (no cursor).
+    """
+    for reply in replies:
+        rendered[reply.parent_comment_id]["replies"].append(rendered[reply.id])
+    for comment_id, comment in rendered.items():
+        comment["reply_count"] = counts.get(comment_id, 0)
+        if comment["replies"] and comment["reply_count"] > len(comment["replies"]):
+            last = comment["replies"][-1]
+            comment["replies_cursor"] = encode_cursor(last["created_at"], last["id"])
+
+
+def _comment_keyset(cursor: Optional[str]):
+    """Comments read oldest first, so the cursor points just past (created_at, id) ASC."""
+    if not cursor:
+        return None
+    return tuple_(PostComments.created_at, PostComments.id) > tuple_(*decode_cursor(cursor))
+
+
+async def get_comment_thread(
     session: AsyncSession,
     post_id: int,
-) -> List[PostComments]:
-    """Returns ALL comments (top-level + replies) for a post, oldest first.
-    Caller is responsible for nesting replies under their parent."""
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    replies_per_comment: int = 3,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of top-level comments with their first `replies_per_comment`
+    replies, and as many of those replies' replies, COMMENT_REPLY_DEPTH
+    levels down, with authors: a bounded number of queries and rows however
+    big or deep the thread is. Returns (rendered comments, next_cursor).
+    Comments with more replies than shown carry reply_count (and
+    replies_cursor) for get_comment_replies. Raises ValueError on a
+    malformed cursor.
+    """
+    key = (post_id, "thread", cursor, limit, replies_per_comment)
+    cached = _comment_thread_cache.get(key)
+    if cached is not None:
+        return cached
+
+    query = select(PostComments).where(
+        and_(
+            PostComments.post_id == post_id,
+            PostComments.parent_comment_id == None,
+            PostComments.is_deleted == False,
+        )
+    )
+    keyset = _comment_keyset(cursor)
+    if keyset is not None:
+        query = query.where(keyset)
     result = await session.execute(
-        select(PostComments)
-        .where(
-            and_(
-                PostComments.post_id == post_id,
-                PostComments.is_deleted == False,
-            )
+        query.order_by(PostComments.created_at.asc(), PostComments.id.asc()).limit(limit + 1)
+    )
+    top_level = list(result.scalars().all())
+
+    next_cursor = None
+    if len(top_level) > limit:
+        top_level = top_level[:limit]
+        next_cursor = encode_cursor(top_level[-1].created_at, top_level[-1].id)
+
+    replies, counts = await _reply_levels(
+        session, [c.id for c in top_level], COMMENT_REPLY_DEPTH, replies_per_comment
+    )
+
+    everything = top_level + replies
+    authors = await _comment_authors(session, everything)
+    rendered = {c.id: _render_comment(c, authors) for c in everything}
+    _attach_replies(rendered, replies, counts)
+
+    page = ([rendered[c.id] for c in top_level], next_cursor)
+    _comment_thread_cache.set(key, page)
+    return page
+
+
+async def get_comment_replies(
+    session: AsyncSession,
+    post_id: int,
+    parent_comment_id: int,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    replies_per_comment: int = 3,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    The "load more replies" page for one comment, oldest first. Each reply
+    comes with its own first replies, nested like get_comment_thread.
+    """
+    key = (post_id, "replies", parent_comment_id, cursor, limit, replies_per_comment)
+    cached = _comment_thread_cache.get(key)
+    if cached is not None:
+        return cached
+
+    query = select(PostComments).where(
+        and_(
+            PostComments.parent_comment_id == parent_comment_id,
+            PostComments.is_deleted == False,
         )
-        .order_by(PostComments.created_at.asc())
     )
-    return list(result.scalars().all())
+    keyset = _comment_keyset(cursor)
+    if keyset is not None:
+        query = query.where(keyset)
+    result = await session.execute(
+        query.order_by(PostComments.created_at.asc(), PostComments.id.asc()).limit(limit + 1)
+    )
+    page_replies = list(result.scalars().all())
+
+    next_cursor = None
+    if len(page_replies) > limit:
+        page_replies = page_replies[:limit]
+        next_cursor = encode_cursor(page_replies[-1].created_at, page_replies[-1].id)
+
+    # The page itself is the first level below the parent
+    nested, counts = await _reply_levels(
+        session, [r.id for r in page_replies], COMMENT_REPLY_DEPTH - 1, replies_per_comment
+    )
+
+    everything = page_replies + nested
+    authors = await _comment_authors(session, everything)
+    rendered = {c.id: _render_comment(c, authors) for c in everything}
+    _attach_replies(rendered, nested, counts)
+
+    page = ([rendered[r.id] for r in page_replies], next_cursor)
+    _comment_thread_cache.set(key, page)
+    return page
 
 
 async def add_comment(
@@ -374,9 +719,10 @@ async def add_comment(
         text=text,
     )
     session.add(comment)
-    post.comment_count += 1
-
     await session.flush()
+    await _bump_counter(session, post_id, Posts.comment_count, 1)
+    invalidate_after_commit(session, _comment_thread_cache, (post_id,))
+    await _bump_contributor(session, user_id, comments=1)
     return comment
 
 
@@ -392,12 +738,10 @@ async def delete_comment(
         return False
 
     comment.is_deleted = True
-
-    post = await get_post_by_id(session, comment.post_id)
-    if post:
-        post.comment_count = max(0, post.comment_count - 1)
-
     await session.flush()
+    await _bump_counter(session, comment.post_id, Posts.comment_count, -1)
+    invalidate_after_commit(session, _comment_thread_cache, (comment.post_id,))
+    await _bump_contributor(session, comment.user_id, comments=-1)
     return True
 
 
@@ -405,22 +749,83 @@ async def delete_comment(
 # SIDEBAR / STATS
 # ============================================================================
 
+async def _bump_contributor(
+    session: AsyncSession,
+    user_id: str,
+    posts: int = 0,
+    comments: int = 0,
+) -> None:
+    """Upsert one user's ContributorStats row and drop the cached board if it could move."""
+    delta = posts + comments
+    result = await session.execute(
+        pg_insert(ContributorStats)
+        .values(
+            user_id=user_id,
+            post_count=max(posts, 0),
+            comment_count=max(comments, 0),
+            contributions=max(delta, 0),
+        )
+        .on_conflict_do_update(
+            index_elements=[ContributorStats.user_id],
+            set_={
+                "post_count": func.greatest(ContributorStats.post_count + posts, 0),
+                "comment_count": func.greatest(ContributorStats.comment_count + comments, 0),
+                "contributions": func.greatest(ContributorStats.contributions + delta, 0),
+            },
+        )
+        .returning(ContributorStats.contributions)
+    )
+    contributions = result.scalar_one()
+
+    # Only a change that touches the cached board invalidates it: the user is
+    # already on it, or now ranks at least as high as its last entry. With no
+    # board cached, a read racing this transaction could still cache one.
+    board = _sidebar_cache.get(("top_contributors",))
+    if (
+        board is None
+        or any(entry["user_id"] == user_id for entry in board)
+        or len(board) < SIDEBAR_MAX_ITEMS
+        or contributions >= board[-1]["contributions"]
+    ):
+        invalidate_after_commit(session, _sidebar_cache, ("top_contributors",))
+
+
 async def get_recent_uploads(
     session: AsyncSession,
     limit: int = 5,
-) -> List[Posts]:
-    result = await session.execute(
-        select(Posts)
-        .where(
-            and_(
-                Posts.post_type == PostType.RESOURCE,
-                Posts.is_deleted == False,
+) -> List[dict]:
+    """
+    Newest resource posts as {"post_id", "title", "meta"}, meta built from
+    the attached resource ("8 pages · PDF"). One query on a cache miss.
+    """
+    board = _sidebar_cache.get(("recent_uploads",))
+    if board is None:
+        result = await session.execute(
+            select(Posts.id, Posts.title, Resources.total_pages, Resources.resource_type)
+            .outerjoin(Resources, Resources.id == Posts.resource_id)
+            .where(
+                and_(
+                    Posts.post_type == PostType.RESOURCE,
+                    Posts.is_deleted == False,
+                )
             )
+            .order_by(Posts.created_at.desc(), Posts.id.desc())
+            .limit(SIDEBAR_MAX_ITEMS)
         )
-        .order_by(Posts.created_at.desc())
-        .limit(limit)
-    )
-    return list(result.scalars().all())
+        board = []
+        for post_id, title, total_pages, resource_type in result.all():
+            parts = []
+            if total_pages:
+                parts.append(f"{total_pages} pages")
+            if resource_type:
+                parts.append(resource_type.value.upper())
+            board.append({
+                "post_id": post_id,
+                "title": title,
+                "meta": " · ".join(parts) if parts else "Resource",
+            })
+        _sidebar_cache.set(("recent_uploads",), board)
+    return board[:limit]
 
 
 async def get_top_contributors(
@@ -428,28 +833,22 @@ async def get_top_contributors(
     limit: int = 3,
 ) -> List[dict]:
     """
-    Contributions = posts + comments per user, combined.
-    Returns a list of {"user_id": ..., "contributions": ...} sorted desc.
+    Contributions = posts + comments per user, from ContributorStats.
+    Returns [{"user_id", "username", "contributions", "rank"}] sorted desc;
+    one query on a cache miss.
     """
-    post_counts_result = await session.execute(
-        select(Posts.user_id, func.count())
-        .where(Posts.is_deleted == False)
-        .group_by(Posts.user_id)
-    )
-    post_counts = dict(post_counts_result.all())
-
-    comment_counts_result = await session.execute(
-        select(PostComments.user_id, func.count())
-        .where(PostComments.is_deleted == False)
-        .group_by(PostComments.user_id)
-    )
-    comment_counts = dict(comment_counts_result.all())
-
-    totals: dict[str, int] = {}
-    for uid, count in post_counts.items():
-        totals[uid] = totals.get(uid, 0) + count
-    for uid, count in comment_counts.items():
-        totals[uid] = totals.get(uid, 0) + count
-
-    ranked = sorted(totals.items(), key=lambda x: x[1], reverse=True)[:limit]
-    return [{"user_id": uid, "contributions": count} for uid, count in ranked]
\ No newline at end of file
+    board = _sidebar_cache.get(("top_contributors",))
+    if board is None:
+        result = await session.execute(
+            select(ContributorStats.user_id, Users.username, ContributorStats.contributions)
+            .join(Users, Users.user_id == ContributorStats.user_id)
+            .where(ContributorStats.contributions > 0)
+            .order_by(ContributorStats.contributions.desc(), ContributorStats.user_id)
+            .limit(SIDEBAR_MAX_ITEMS)
+        )
+        board = [
+            {"user_id": uid, "username": username, "contributions": count, "rank": rank}
+            for rank, (uid, username, count) in enumerate(result.all(), start=1)
+        ]
+        _sidebar_cache.set(("top_contributors",), board)
+    return board[:limit]
@@ -0,0 +1,351 @@
+"""
+Live co-editing for documents (operational transform).
+
+Instead of every client PUT-ing the whole HTML, editors exchange small
+operations over a WebSocket. The server keeps the authoritative content
+of every open document in memory, transforms each incoming operation
+against whatever the client hadn't seen yet, applies it, and broadcasts
+it to everyone else in the room.
+
+Operations use the ot.js text format, over Python string indices
+(code points):
+    positive int -> retain n chars
+    negative int -> delete n chars
+    str          -> insert the string
+e.g. [5, "abc", -2, 10] keeps 5 chars, inserts "abc", drops 2, keeps 10.
+
+Persistence is batched: the document row is written at most once every
+PERSIST_INTERVAL_SECONDS while it has unsaved edits, and a DocumentVersion
+(via document_version_store) is recorded every VERSION_EVERY_REVISIONS
+revisions and when the last editor leaves.
+
+Like the chat ConnectionManager, room state lives in this process, so the
+channel assumes one API worker (or sticky routing per document).
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from fastapi import WebSocket
+from sqlalchemy import select, update, and_
+
+from ..database.database import async_session_local
+from ..database.models import Document, DocumentCollaborator
+from . import document_version_store as version_store
+from .messages_service import safe_websocket_send
+
+logger = logging.getLogger(__name__)
+
+PERSIST_INTERVAL_SECONDS = 5
+VERSION_EVERY_REVISIONS = 200
+
+# How many past operations we keep for transforming late clients. A client
+# further behind than this gets a full resync instead.
+MAX_HISTORY = 500
+
+
+class OperationError(ValueError):
+    """Raised for malformed operations or ones that don't fit the document."""
+
+
+# ============================================================================
+# OT PRIMITIVES
+# ============================================================================
+
+def _push(ops: list, component) -> None:
+    """Append a component, merging it into the previous one when same type."""
+    if ops:
+        last = ops[-1]
+        if isinstance(component, str) and isinstance(last, str):
+            ops[-1] = last + component
+            return
+        if isinstance(component, int) and isinstance(last, int) and (component > 0) == (last > 0):
+            ops[-1] = last + component
+            return
+    ops.append(component)
+
+
+def validate(ops) -> List:
+    if not isinstance(ops, list):
+        raise OperationError("Operation must be a list")
+    normalized: list = []
+    for component in ops:
+        if isinstance(component, bool) or not isinstance(component, (int, str)):
+            raise OperationError(f"Invalid component: {component!r}")
+        if component == 0 or component == "":
+            continue
+        _push(normalized, component)
+    return normalized
+
+
+def base_length(ops: List) -> int:
+    return sum(abs(c) for c in ops if isinstance(c, int))
+
+
+def apply(content: str, ops: List) -> str:
+    if base_length(ops) != len(content):
+        raise OperationError("Operation length does not match document length")
+
+    parts = []
+    index = 0
+    for component in ops:
+        if isinstance(component, str):
+            parts.append(component)
+        elif component > 0:
+            parts.append(content[index:index + component])
+            index += component
+        else:
+            index -= component
+    return "".join(parts)
+
+
+def transform(a: List, b: List):
+    """
+    Given concurrent operations a and b on the same document, return
+    (a', b') such that apply(apply(doc, a), b') == apply(apply(doc, b), a').
+    When both insert at the same spot, a's insert goes first.
+    """
+    if base_length(a) != base_length(b):
+        raise OperationError("Concurrent operations have different base lengths")
+
+    a_prime: list = []
+    b_prime: list = []
+    ia, ib = iter(a), iter(b)
+    op1, op2 = next(ia, None), next(ib, None)
+
+    while op1 is not None or op2 is not None:
+        if isinstance(op1, str):
+            _push(a_prime, op1)
+            _push(b_prime, len(op1))
+            op1 = next(ia, None)
+            continue
+        if isinstance(op2, str):
+            _push(a_prime, len(op2))
+            _push(b_prime, op2)
+            op2 = next(ib, None)
+            continue
+        if op1 is None or op2 is None:
+            raise OperationError("Operations could not be transformed")
+
+        length = min(abs(op1), abs(op2))
+        if op1 > 0 and op2 > 0:
+            _push(a_prime, length)
+            _push(b_prime, length)
+        elif op1 < 0 and op2 > 0:
+            _push(a_prime, -length)
+        elif op1 > 0 and op2 < 0:
+            _push(b_prime, -length)
+        # both deleting the same span: nothing left to do on either side
+
+        op1 = op1 - length if op1 > 0 else op1 + length
+        op2 = op2 - length if op2 > 0 else op2 + length
+        if op1 == 0:
+            op1 = next(ia, None)
+        if op2 == 0:
+            op2 = next(ib, None)
+
+    return a_prime, b_prime
+
+
+# ============================================================================
+# PERMISSIONS
+# ============================================================================
+
+async def get_collab_access(session, document_id: int, user_id: str) -> Optional[str]:
+    """Returns 'edit', 'view' or None, from ownership / DocumentCollaborator.can_edit."""
+    result = await session.execute(
+        select(Document.owner_id).where(
+            and_(Document.id == document_id, Document.is_deleted == False)
+        )
+    )
+    owner_id = result.scalar_one_or_none()
+    if owner_id is None:
+        return None
+    if owner_id == user_id:
+        return "edit"
+
+    result = await session.execute(
+        select(DocumentCollaborator.can_edit).where(
+            and_(
+                DocumentCollaborator.document_id == document_id,
+                DocumentCollaborator.user_id == user_id,
+            )
+        )
+    )
+    can_edit = result.scalar_one_or_none()
+    if can_edit is None:
+        return None
+    return "edit" if can_edit else "view"
+
+
+# ============================================================================
+# ROOMS
+# ============================================================================
+
+class CollabRoom:
+    """In-memory authoritative state of one open document."""
+
+    def __init__(self, document_id: int, content: str, revision: int):
+        self.document_id = document_id
+        self.content = content
+        self.revision = revision
+        # history[i] is the op that moved revision history_start + i -> +1
+        self.history: List[List] = []
+        self.history_start = revision
+        self.connections: Dict[WebSocket, str] = {}
+
+        self.persisted_revision = revision
+        self.versioned_revision = revision
+        self.last_editor_id: Optional[str] = None
+        self.flush_task: Optional[asyncio.Task] = None
+        # Serializes persist() so concurrent flushes can't number versions twice
+        self.persist_lock = asyncio.Lock()
+
+    def submit(self, client_revision: int, ops: List) -> List:
+        """Transform `ops` (made against client_revision) to the head and apply it."""
+        if client_revision < self.history_start or client_revision > self.revision:
+            raise OperationError("Revision is outside the server history window")
+
+        for concurrent in self.history[client_revision - self.history_start:]:
+            ops, _ = transform(ops, concurrent)
+
+        self.content = apply(self.content, ops)
+        self.history.append(ops)
+        self.revision += 1
+
+        if len(self.history) > MAX_HISTORY:
+            drop = len(self.history) - MAX_HISTORY
+            del self.history[:drop]
+            self.history_start += drop
+        return ops
+
+
+class DocumentCollabManager:
+    def __init__(self):
+        self.rooms: Dict[int, CollabRoom] = {}
+        self._open_lock = asyncio.Lock()
+
+    async def join(self, websocket: WebSocket, document_id: int, user_id: str) -> CollabRoom:
+        async with self._open_lock:
+            room = self.rooms.get(document_id)
+            if room is None:
+                async with async_session_local() as session:
+                    document = await session.get(Document, document_id)
+                    room = CollabRoom(document_id, document.content or "", revision=0)
+                room.flush_task = asyncio.create_task(self._flush_loop(room))
+                self.rooms[document_id] = room
+            # Under the lock, so a concurrent leave() sees us before closing the room
+            room.connections[websocket] = user_id
+
+        await self.broadcast(room, {"action": "presence", "event": "joined", "user_id": user_id}, exclude=websocket)
+        return room
+
+    async def leave(self, websocket: WebSocket, room: CollabRoom) -> None:
+        user_id = room.connections.pop(websocket, None)
+        if user_id:
+            await self.broadcast(room, {"action": "presence", "event": "left", "user_id": user_id})
+
+        if room.connections:
+            return
+
+        # Last editor gone: persist, snapshot a version, free the memory.
+        # Hold the open lock so a re-join can't load the pre-flush content.
+        async with self._open_lock:
+            # Someone may have joined while we were broadcasting
+            if room.connections:
+                return
+            if self.rooms.get(room.document_id) is room:
+                del self.rooms[room.document_id]
+            if room.flush_task:
+                room.flush_task.cancel()
+            await self.persist(room, record_version=True)
+
+    async def broadcast(self, room: CollabRoom, payload: dict, exclude: Optional[WebSocket] = None) -> None:
+        for connection in list(room.connections):
+            if connection is not exclude:
+                await safe_websocket_send(connection, payload)
+
+    async def handle_operation(self, websocket: WebSocket, room: CollabRoom, user_id: str, payload: dict) -> None:
+        try:
+            ops = validate(payload.get("ops"))
+            applied = room.submit(int(payload.get("revision", -1)), ops)
+        except (OperationError, TypeError, ValueError) as e:
+            # Client is out of sync; send it the authoritative state
+            await safe_websocket_send(websocket, {
+                "action": "resync",
+                "error": str(e),
+                "revision": room.revision,
+                "content": room.content,
+            })
+            return
+
+        room.last_editor_id = user_id
+        await safe_websocket_send(websocket, {"action": "ack", "revision": room.revision})
+        await self.broadcast(room, {
+            "action": "operation",
+            "revision": room.revision,
+            "ops": applied,
+            "user_id": user_id,
+        }, exclude=websocket)
+
+        if room.revision - room.versioned_revision >= VERSION_EVERY_REVISIONS:
+            await self.persist(room, record_version=True, min_revisions=VERSION_EVERY_REVISIONS)
+
+    async def _flush_loop(self, room: CollabRoom) -> None:
+        while True:
+            await asyncio.sleep(PERSIST_INTERVAL_SECONDS)
+            try:
+                await self.persist(room)
+            except Exception as e:
+                logger.warning("Persisting document %s failed: %s", room.document_id, e)
+
+    async def persist(self, room: CollabRoom, record_version: bool = False, min_revisions: int = 1) -> None:
+        """
+        Write the compacted in-memory content back, if anything changed.
+        With record_version, also snapshot a version if at least
+        min_revisions revisions happened since the last one.
+        """
+        async with room.persist_lock:
+            await self._persist_locked(room, record_version, min_revisions)
+
+    async def _persist_locked(self, room: CollabRoom, record_version: bool, min_revisions: int) -> None:
+        # Decided under the lock: a flush that just finished may have covered us
+        revision, content = room.revision, room.content
+        needs_write = revision != room.persisted_revision
+        needs_version = (
+            record_version
+            and revision - room.versioned_revision >= min_revisions
+            and room.last_editor_id
+        )
+        if not needs_write and not needs_version:
+            return
+
+        async with async_session_local() as session:
+            if needs_version:
+                def _snapshot(sync_session):
+                    document = sync_session.get(Document, room.document_id)
+                    document.content = content
+                    version_store.append_version(
+                        sync_session, document,
+                        created_by=room.last_editor_id,
+                        change_summary="Live editing session",
+                    )
+                    sync_session.flush()
+                    version_store.prune_versions(sync_session, room.document_id)
+
+                await session.run_sync(_snapshot)
+            else:
+                await session.execute(
+                    update(Document)
+                    .where(Document.id == room.document_id)
+                    .values(content=content)
+                )
+            await session.commit()
+
+        room.persisted_revision = revision
+        if needs_version:
+            room.versioned_revision = revision
+
+
+collab_manager = DocumentCollabManager()
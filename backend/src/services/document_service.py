@@ -9,8 +9,8 @@ from sqlalchemy.orm import Session
 from ..database.models import Document, DocumentVersion, DocumentCollaborator, Comment
 from ..database.models import Users
 from ..services.user_service import get_user_by_email
-
-MAX_VERSIONS_KEPT = 50
+from ..services import document_version_store as version_store
+from ..services import search_service
 
 # Roles that may edit document content / metadata.
 EDIT_ROLES = ("owner", "editor")
@@ -101,14 +101,13 @@ def list_documents(db: Session, user: Users, trashed: bool = False, starred: boo
 
 
 def search_documents(db: Session, user: Users, q: str) -> list[Document]:
-    like = f"%{q}%"
     return (
         db.query(Document)
         .outerjoin(DocumentCollaborator, DocumentCollaborator.document_id == Document.id)
         .filter(
             or_(Document.owner_id == user.id, DocumentCollaborator.user_id == user.id),
             Document.trashed.is_(False),
-            or_(Document.title.ilike(like), Document.content.ilike(like)),
+            search_service.matches(Document, q),
         )
         .order_by(Document.updated_at.desc())
         .distinct()
@@ -133,25 +132,16 @@ def update_document(db: Session, document: Document, user: Users, **fields) -> D
 
 def save_version(db: Session, document: Document, user: Users) -> DocumentVersion:
     """Snapshot the current content -- called by the Save button and by autosave."""
-    version = DocumentVersion(
-        document_id=document.id,
-        content=document.content,
+    version = version_store.append_version(
+        db, document,
         title=document.title,
         word_count=document.word_count,
         edited_by_id=user.id,
     )
-    db.add(version)
-    db.commit()
+    db.flush()
 
     # Keep version history bounded.
-    all_versions = (
-        db.query(DocumentVersion)
-        .filter(DocumentVersion.document_id == document.id)
-        .order_by(DocumentVersion.created_at.desc())
-        .all()
-    )
-    for stale in all_versions[MAX_VERSIONS_KEPT:]:
-        db.delete(stale)
+    version_store.prune_versions(db, document.id)
     db.commit()
     db.refresh(version)
     return version
@@ -175,13 +165,16 @@ def restore_version(db: Session, document: Document, version_id: int, user: User
     if version is None:
         raise HTTPException(status_code=404, detail="Version not found")
 
+    content = version_store.materialize(db, version)
+    title, word_count = version.title, version.word_count
+
     # Snapshot current state before overwriting, so restoring is itself reversible.
     save_version(db, document, user)
 
-    document.content = version.content
-    document.title = version.title
-    document.word_count = version.word_count
-    document.char_count = _char_count(version.content)
+    document.content = content
+    document.title = title
+    document.word_count = word_count
+    document.char_count = _char_count(content)
     document.last_edited_by_id = user.id
     db.commit()
     db.refresh(document)
@@ -0,0 +1,162 @@
+"""
+Delta-compressed storage for document version history.
+
+Only the newest version (and every SNAPSHOT_INTERVAL-th version) is kept
+as full text in DocumentVersion.content. Every other version stores a
+zlib-compressed *reverse* diff in DocumentVersion.delta that rebuilds it
+from the version saved right after it (RCS-style).
+
+Why reverse diffs:
+- Save never has to replay history: the previous head is stored in full,
+  so we diff against it, shrink it to a delta, and insert the new head.
+- Pruning the oldest versions can never break the chain, because every
+  delta points *forward* in time. Trimming history is one DELETE.
+- Restore walks back from the nearest newer snapshot, so at most
+  SNAPSHOT_INTERVAL - 1 diffs are applied.
+"""
+
+import json
+import re
+import zlib
+from difflib import SequenceMatcher
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..database.models import Document, DocumentVersion
+
+MAX_VERSIONS_KEPT = 50
+
+# Every Nth version stays a full snapshot so restores replay a bounded chain.
+SNAPSHOT_INTERVAL = 10
+
+# Diff block-by-block (paragraphs, list items, headings, line breaks) instead
+# of by character: editor HTML is usually one long line, and SequenceMatcher
+# degrades badly on long runs of small repeating tokens.
+_TOKEN_RE = re.compile(
+    r".*?(?:</(?:p|div|li|h[1-6]|ul|ol|tr|table|blockquote|pre)>|<br\s*/?>|\n)|.+",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+# ── Diff codec ───────────────────────────────────────────────────────────────
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text or "")
+
+
+def encode_delta(base: str, target: str) -> bytes:
+    """
+    Encode `target` as edits against `base`.
+
+    The op list is JSON: `[start, end]` copies base[start:end], a plain
+    string is inserted verbatim. Deletions are implicit (never copied).
+    """
+    base_tokens = _tokenize(base)
+    target_tokens = _tokenize(target)
+
+    # Char offset where each base token starts (plus the end sentinel).
+    offsets = [0]
+    for token in base_tokens:
+        offsets.append(offsets[-1] + len(token))
+
+    ops: list = []
+    matcher = SequenceMatcher(None, base_tokens, target_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([offsets[i1], offsets[i2]])
+        elif tag in ("replace", "insert"):
+            ops.append("".join(target_tokens[j1:j2]))
+
+    return zlib.compress(json.dumps(ops, separators=(",", ":")).encode("utf-8"))
+
+
+def apply_delta(base: str, delta: bytes) -> str:
+    ops = json.loads(zlib.decompress(delta).decode("utf-8"))
+    return "".join(base[op[0]:op[1]] if isinstance(op, list) else op for op in ops)
+
+
+# ── Store ────────────────────────────────────────────────────────────────────
+
+def _get_head(db: Session, document_id: int) -> DocumentVersion | None:
+    return (
+        db.query(DocumentVersion)
+        .filter(DocumentVersion.document_id == document_id)
+        .order_by(DocumentVersion.id.desc())
+        .first()
+    )
+
+
+def append_version(db: Session, document: Document, **fields) -> DocumentVersion:
+    """
+    Store the document's current content as the new head version.
+
+    The previous head is rewritten as a reverse delta unless it falls on a
+    snapshot boundary. Does not commit -- the caller owns the transaction.
+    """
+    head = _get_head(db, document.id)
+    version_number = (head.version_number + 1) if head else 1
+
+    if head is not None and head.version_number % SNAPSHOT_INTERVAL != 0:
+        head.delta = encode_delta(document.content, head.content)
+        head.content = None
+        head.is_snapshot = False
+
+    version = DocumentVersion(
+        document_id=document.id,
+        version_number=version_number,
+        content=document.content,
+        is_snapshot=True,
+        **fields,
+    )
+    db.add(version)
+    document.latest_version_number = version_number
+    return version
+
+
+def prune_versions(db: Session, document_id: int, keep: int = MAX_VERSIONS_KEPT) -> int:
+    """Drop everything older than the newest `keep` versions in one statement."""
+    cutoff = (
+        db.query(DocumentVersion.id)
+        .filter(DocumentVersion.document_id == document_id)
+        .order_by(DocumentVersion.id.desc())
+        .offset(keep)
+        .limit(1)
+        .scalar_subquery()
+    )
+    return (
+        db.query(DocumentVersion)
+        .filter(DocumentVersion.document_id == document_id, DocumentVersion.id <= cutoff)
+        .delete(synchronize_session=False)
+    )
+
+
+def materialize(db: Session, version: DocumentVersion) -> str:
+    """Rebuild the full content of `version` by replaying reverse deltas."""
+    if version.is_snapshot:
+        return version.content
+
+    snapshot_id = (
+        db.query(func.min(DocumentVersion.id))
+        .filter(
+            DocumentVersion.document_id == version.document_id,
+            DocumentVersion.id > version.id,
+            DocumentVersion.is_snapshot.is_(True),
+        )
+        .scalar_subquery()
+    )
+    chain = (
+        db.query(DocumentVersion)
+        .filter(
+            DocumentVersion.document_id == version.document_id,
+            DocumentVersion.id >= version.id,
+            DocumentVersion.id <= snapshot_id,
+        )
+        .order_by(DocumentVersion.id.desc())
+        .all()
+    )
+
+    content = chain[0].content
+    for step in chain[1:]:
+        content = apply_delta(content, step.delta)
+    return content
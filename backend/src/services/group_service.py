@@ -1,8 +1,9 @@
 """Handles all group-realted  databse operations and business logic"""
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, and_, or_, func, update, tuple_
 from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from ..database.models import(
     Groups, Groupings, GroupInvitations, Users,
     GroupRole, GroupType, GroupVisibility, InvitationStatus
@@ -12,6 +13,56 @@ from datetime import datetime, timedelta
 import secrets
 import string
 
+from .cache_service import TTLCache, invalidate_after_commit
+from .keyset import encode_cursor, decode_cursor
+
+# ============================================================================
+# AUTHORIZATION CACHE
+# ============================================================================
+# Membership/role lookups back almost every permission check, often several
+# times per request for the same (user, group). Two layers:
+#   - per-request memo in session.info (one get_db session = one request)
+#   - a short-TTL process cache shared across requests
+# Every write to groupings invalidates both, once immediately and once more
+# after the transaction commits, so a concurrent request can't re-cache the
+# pre-commit row for the whole TTL.
+
+MEMBERSHIP_CACHE_TTL_SECONDS = 30
+_membership_cache = TTLCache(ttl_seconds=MEMBERSHIP_CACHE_TTL_SECONDS)
+_request_memo_hits = 0
+_MISSING = object()
+
+def _request_memo(session) -> dict:
+    return session.info.setdefault("group_authz_memo", {})
+
+async def _cached_lookup(session, key: tuple, load):
+    """Memo -> process cache -> `load()`; None is a cacheable answer"""
+    global _request_memo_hits
+
+    memo = _request_memo(session)
+    if key in memo:
+        _request_memo_hits += 1
+        return memo[key]
+
+    value = _membership_cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = await load()
+        _membership_cache.set(key, value)
+    memo[key] = value
+    return value
+
+def _invalidate_authz(session, key: tuple) -> None:
+    _request_memo(session).pop(key, None)
+    invalidate_after_commit(session, _membership_cache, key)
+
+def get_authz_cache_stats() -> dict:
+    """Hit-rate metrics for the membership cache"""
+    return {
+        **_membership_cache.stats(),
+        "ttl_seconds": MEMBERSHIP_CACHE_TTL_SECONDS,
+        "request_memo_hits": _request_memo_hits,
+    }
+
 # ============================================================================
 # GROUP CRUD OPERATIONS
 # ============================================================================
@@ -43,6 +94,7 @@ async def create_group(
         visibility=visibility,
         invite_code=invite_code,
         max_members=max_members,
+        member_count=1,  # the creator
         is_active=True
     )
 
@@ -59,6 +111,7 @@ async def create_group(
 
     session.add(creator_membership)
     await session.flush()
+    _invalidate_authz(session, ("role", creator_id, new_group.id))
 
     return new_group
 
@@ -79,88 +132,69 @@ async def get_group_by_id(
     result = await session.execute(query)
     return result.scalars().first()
 
-async def get_user_groups(
+async def list_groups(
     session: AsyncSession,
     user_id: str,
-    skip: int = 0,
-    limit: int = 20,
+    only_joined: bool = False,
     search: Optional[str] = None,
     group_type: Optional[GroupType] = None,
-    visibility: Optional[GroupVisibility] = None
-) -> Tuple[List[Groups], int]:
-    """Get all groups a user is a member of with filtering"""
-
-    #Base query - join with groupings to get user's groups
-    query = (
-        select(Groups)
-        .join(Groupings, Groupings.group_id == Groups.id)
-        .where(
-            and_(
-                Groupings.user_id == user_id,
-                Groups.is_active == True,
-                Groupings.invitation_status == InvitationStatus.ACCEPTED
-            )
-        )
+    visibility: Optional[GroupVisibility] = None,
+    cursor: Optional[str] = None,
+    limit: int = 20
+) -> Tuple[List[Tuple[Groups, Optional[GroupRole]]], Optional[str]]:
+    """
+    One query for a page of groups plus the caller's role in each.
+
+    - only_joined=True: the user's groups, most recently joined first
+    - only_joined=False: public groups (discovery), newest first
+
+    member_count comes from the denormalized Groups column, and the caller's
+    Groupings row is outer-joined in, so there are no per-group lookups.
+    Returns ([(group, user_role)], next_cursor); raises ValueError on a bad cursor.
+    """
+
+    my_membership = and_(
+        Groupings.group_id == Groups.id,
+        Groupings.user_id == user_id,
+        Groupings.invitation_status == InvitationStatus.ACCEPTED
     )
+    # Both sort columns are immutable, so a cursor stays valid while
+    # groups are edited between pages
+    if only_joined:
+        sort_column = Groupings.joined_at
+        query = select(Groups, Groupings.role, sort_column).join(Groupings, my_membership)
+        if visibility:
+            query = query.where(Groups.visibility == visibility)
+    else:
+        sort_column = Groups.created_at
+        query = select(Groups, Groupings.role, sort_column).outerjoin(Groupings, my_membership)
+        query = query.where(Groups.visibility == GroupVisibility.PUBLIC)
 
-    # Apply filters
-    if search:
-        query = query.where(Groups.group_name.ilike(f"%{search}%"))
-    
-    if group_type:
-        query = query.where(Groups.group_type == group_type)
-    
-    if visibility:
-        query = query.where(Groups.visibility == visibility)
-    
-    # Count total
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await session.execute(count_query)
-    total = total_result.scalar()
-    
-    # Apply pagination and ordering
-    query = query.order_by(Groups.updated_at.desc()).offset(skip).limit(limit)
-    
-    result = await session.execute(query)
-    groups = result.scalars().all()
-    
-    return list(groups), total
+    query = query.where(Groups.is_active == True)
 
-async def get_public_groups(
-    session: AsyncSession,
-    skip: int = 0,
-    limit: int = 20,
-    search: Optional[str] = None,
-    group_type: Optional[GroupType] = None
-) -> Tuple[List[Groups], int]:
-    """Get all public groups (for discovery)"""
-    
-    query = select(Groups).where(
-        and_(
-            Groups.visibility == GroupVisibility.PUBLIC,
-            Groups.is_active == True
-        )
-    )
-    
     # Apply filters
     if search:
         query = query.where(Groups.group_name.ilike(f"%{search}%"))
-    
+
     if group_type:
         query = query.where(Groups.group_type == group_type)
-    
-    # Count total
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await session.execute(count_query)
-    total = total_result.scalar()
-    
-    # Apply pagination and ordering
-    query = query.order_by(Groups.created_at.desc()).offset(skip).limit(limit)
-    
+
+    # Keyset pagination; one extra row tells us whether there's a next page
+    if cursor:
+        query = query.where(tuple_(sort_column, Groups.id) < tuple_(*decode_cursor(cursor)))
+
+    query = query.order_by(sort_column.desc(), Groups.id.desc()).limit(limit + 1)
+
     result = await session.execute(query)
-    groups = result.scalars().all()
-    
-    return list(groups), total
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_group, _, last_sort_value = rows[-1]
+        next_cursor = encode_cursor(last_sort_value, last_group.id)
+
+    return [(group, role) for group, role, _ in rows], next_cursor
 
 async def update_group(
     session: AsyncSession,
@@ -201,6 +235,7 @@ async def update_group(
         group.max_members = max_members
     
     await session.flush()
+    _invalidate_authz(session, ("group_type", group_id))
     return group
 
 async def delete_group(
@@ -215,6 +250,7 @@ async def delete_group(
     
     group.is_active = False
     await session.flush()
+    _invalidate_authz(session, ("group_type", group_id))
     return True
 
 # ============================================================================
@@ -226,18 +262,21 @@ async def get_user_role_in_group(
     user_id: str,
     group_id: int
 ) -> Optional[GroupRole]:
-    """Get a user's role in a group"""
+    """Get a user's role in a group (cached, see AUTHORIZATION CACHE)"""
     
-    result = await session.execute(
-        select(Groupings.role).where(
-            and_(
-                Groupings.user_id == user_id,
-                Groupings.group_id == group_id,
-                Groupings.invitation_status == InvitationStatus.ACCEPTED
+    async def load():
+        result = await session.execute(
+            select(Groupings.role).where(
+                and_(
+                    Groupings.user_id == user_id,
+                    Groupings.group_id == group_id,
+                    Groupings.invitation_status == InvitationStatus.ACCEPTED
+                )
             )
         )
-    )
-    return result.scalars().first()
+        return result.scalars().first()
+    
+    return await _cached_lookup(session, ("role", user_id, group_id), load)
 
 async def is_user_in_group(
     session: AsyncSession,
@@ -246,16 +285,7 @@ async def is_user_in_group(
 ) -> bool:
     """Check if user is a member of a group"""
     
-    result = await session.execute(
-        select(Groupings).where(
-            and_(
-                Groupings.user_id == user_id,
-                Groupings.group_id == group_id,
-                Groupings.invitation_status == InvitationStatus.ACCEPTED
-            )
-        )
-    )
-    return result.scalars().first() is not None
+    return await get_user_role_in_group(session, user_id, group_id) is not None
 
 async def get_group_members(
     session: AsyncSession,
@@ -284,17 +314,98 @@ async def get_group_member_count(
     session: AsyncSession,
     group_id: int
 ) -> int:
-    """Get the number of members in a group"""
+    """Get the number of members in a group (denormalized Groups.member_count)"""
     
     result = await session.execute(
-        select(func.count(Groupings.user_id)).where(
+        select(Groups.member_count).where(Groups.id == group_id)
+    )
+    return result.scalar() or 0
+
+async def _adjust_member_count(
+    session: AsyncSession,
+    group_id: int,
+    delta: int
+) -> None:
+    """Atomically move Groups.member_count; called by every join/leave path"""
+    
+    await session.execute(
+        update(Groups)
+        .where(Groups.id == group_id)
+        .values(
+            member_count=func.greatest(Groups.member_count + delta, 0),
+            updated_at=Groups.updated_at  # membership churn isn't a group edit
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+async def _claim_seat(
+    session: AsyncSession,
+    group_id: int
+) -> bool:
+    """
+    Take one seat in a group, or return False if it's full.
+
+    A single conditional UPDATE: the row lock it takes serializes concurrent
+    joiners of the same group, and Postgres re-checks the capacity condition
+    against the locked row, so max_members can't be overshot.
+    """
+    
+    result = await session.execute(
+        update(Groups)
+        .where(
             and_(
-                Groupings.group_id == group_id,
-                Groupings.invitation_status == InvitationStatus.ACCEPTED
+                Groups.id == group_id,
+                Groups.is_active == True,
+                or_(Groups.max_members == None, Groups.member_count < Groups.max_members)
             )
         )
+        .values(
+            member_count=Groups.member_count + 1,
+            updated_at=Groups.updated_at  # membership churn isn't a group edit
+        )
+        .returning(Groups.id)
+        .execution_options(synchronize_session=False)
     )
-    return result.scalar() or 0
+    return result.first() is not None
+
+async def _insert_membership(
+    session: AsyncSession,
+    group_id: int,
+    user_id: str,
+    **fields
+) -> Optional[Groupings]:
+    """
+    Seat + membership row, atomically with respect to other joiners.
+    Returns None if the group is full or the user is already a member
+    (the (user_id, group_id) primary key makes duplicates a no-op).
+    """
+    
+    if not await _claim_seat(session, group_id):
+        return None
+    
+    result = await session.execute(
+        pg_insert(Groupings)
+        .values(
+            user_id=user_id,
+            group_id=group_id,
+            role=GroupRole.MEMBER,
+            invitation_status=InvitationStatus.ACCEPTED,
+            **fields
+        )
+        .on_conflict_do_nothing(index_elements=[Groupings.user_id, Groupings.group_id])
+        .returning(Groupings)
+    )
+    membership = result.scalars().first()
+    
+    if membership is None:
+        # Lost a race with our own concurrent join: give the seat back
+        await _adjust_member_count(session, group_id, -1)
+        return None
+    
+    from .timeline_service import backfill_group_posts
+    await backfill_group_posts(session, user_id, group_id)
+    _invalidate_authz(session, ("role", user_id, group_id))
+    return membership
 
 async def join_group(
     session: AsyncSession,
@@ -309,33 +420,13 @@ async def join_group(
     if not group:
         return None
     
-    # Check if already a member
-    if await is_user_in_group(session, user_id, group_id):
-        return None
-    
     # Check visibility and invite code
     if group.visibility == GroupVisibility.PRIVATE:
         if not invite_code or invite_code != group.invite_code:
             return None
     
-    # Check max members
-    if group.max_members:
-        current_count = await get_group_member_count(session, group_id)
-        if current_count >= group.max_members:
-            return None
-    
-    # Create membership
-    membership = Groupings(
-        user_id=user_id,
-        group_id=group_id,
-        role=GroupRole.MEMBER,
-        invitation_status=InvitationStatus.ACCEPTED
-    )
-    
-    session.add(membership)
-    await session.flush()
-    
-    return membership
+    # Capacity and duplicate checks happen atomically inside the insert
+    return await _insert_membership(session, group_id, user_id)
 
 async def leave_group(
     session: AsyncSession,
@@ -371,10 +462,25 @@ async def leave_group(
         if leader_count.scalar() <= 1:
             return False  # Can't leave if you're the only leader
     
+    was_member = membership.invitation_status == InvitationStatus.ACCEPTED
     await session.delete(membership)
     await session.flush()
+    if was_member:
+        await _adjust_member_count(session, group_id, -1)
+    await _drop_group_timeline(session, user_id, group_id)
+    _invalidate_authz(session, ("role", user_id, group_id))
     return True
 
+async def _drop_group_timeline(
+    session: AsyncSession,
+    user_id: str,
+    group_id: int
+) -> None:
+    """Former members stop seeing the group's posts on their home timeline"""
+    
+    from .timeline_service import remove_group_posts
+    await remove_group_posts(session, user_id, group_id)
+
 async def update_member_role(
     session: AsyncSession,
     group_id: int,
@@ -399,6 +505,7 @@ async def update_member_role(
     
     membership.role = new_role
     await session.flush()
+    _invalidate_authz(session, ("role", user_id, group_id))
     return membership
 
 async def remove_member(
@@ -421,8 +528,13 @@ async def remove_member(
     if not membership:
         return False
     
+    was_member = membership.invitation_status == InvitationStatus.ACCEPTED
     await session.delete(membership)
     await session.flush()
+    if was_member:
+        await _adjust_member_count(session, group_id, -1)
+    await _drop_group_timeline(session, user_id, group_id)
+    _invalidate_authz(session, ("role", user_id, group_id))
     return True
 
 # ============================================================================
@@ -528,25 +640,16 @@ async def respond_to_invitation(
     membership = None
     
     if accept:
-        # Check max members
-        group = await get_group_by_id(session, invitation.group_id)
-        if group and group.max_members:
-            current_count = await get_group_member_count(session, invitation.group_id)
-            if current_count >= group.max_members:
-                invitation.status = InvitationStatus.DECLINED
-                await session.flush()
-                return None
-        
-        # Create membership
-        membership = Groupings(
-            user_id=user_id,
-            group_id=invitation.group_id,
-            role=GroupRole.MEMBER,
-            invitation_status=InvitationStatus.ACCEPTED,
+        membership = await _insert_membership(
+            session,
+            invitation.group_id,
+            user_id,
             invited_by=invitation.invited_by,
             invited_at=invitation.created_at
         )
-        session.add(membership)
+        if membership is None:
+            # Group is full (or the user already joined another way)
+            invitation.status = InvitationStatus.DECLINED
     
     await session.flush()
     return membership
@@ -572,8 +675,15 @@ async def can_manage_resources(
 ) -> bool:
     """Check if user can manage resources in a group"""
     
-    group = await get_group_by_id(session, group_id)
-    if not group:
+    async def load_group_type():
+        result = await session.execute(
+            select(Groups.group_type).where(
+                and_(Groups.id == group_id, Groups.is_active == True))
+        )
+        return result.scalars().first()
+    
+    group_type = await _cached_lookup(session, ("group_type", group_id), load_group_type)
+    if not group_type:
         return False
     
     role = await get_user_role_in_group(session, user_id, group_id)
@@ -581,7 +691,7 @@ async def can_manage_resources(
         return False
     
     # In community groups, all members can manage resources
-    if group.group_type == GroupType.COMMUNITY:
+    if group_type == GroupType.COMMUNITY:
         return True
     
     # In leader-controlled groups, only leaders and admins can
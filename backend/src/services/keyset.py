@@ -0,0 +1,26 @@
+"""
+Opaque keyset-pagination cursors, shared by every paged listing.
+
+A cursor is base64("<iso timestamp>|<id>"): the sort key of the last row
+on a page. Listings compare tuple_(sort_column, id) against the decoded
+pair, so the sort column must never change after a row is written
+(created_at, joined_at, ...), or rows would skip or repeat between pages.
+"""
+
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    raw = f"{sort_value.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError on a malformed cursor"""
+    try:
+        sort_value, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,466 @@
+"""
+One way out to the LLM providers, shared by the chatbot and the summarizer.
+
+Every model call goes through llm_gateway, which:
+    - reuses one client per provider for the whole process (one HTTP
+      connection pool, not one per request)
+    - caps concurrent calls: LLM_MAX_CONCURRENCY overall and
+      LLM_MAX_CONCURRENCY_PER_USER for any one user
+    - paces calls with token buckets sized to the provider's rate limits
+      (requests and tokens per minute), so bursts queue here instead of
+      coming back as 429s
+    - retries rate limits, timeouts and 5xx with exponential backoff and
+      full jitter (honouring Retry-After when the provider sends one);
+      every attempt, retries included, takes its own rate-limit budget
+    - measures every call: tokens, latency and attempts go into a
+      CallMetrics the caller stores (ChatConversations.tokens_used) and
+      into per-model counters, see stats()
+
+Limits are per process, like the other in-memory managers.
+
+Providers:
+    groq    OpenAI-compatible chat (CHATBOT_LLM_BASE_URL); GROQ_RPM / GROQ_TPM
+    gemini  google-genai; GEMINI_RPM / GEMINI_TPM
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+import openai
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_CONCURRENCY_PER_USER = int(os.getenv("LLM_MAX_CONCURRENCY_PER_USER", "2"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+LLM_BACKOFF_BASE_SECONDS = 0.5
+LLM_BACKOFF_MAX_SECONDS = 20.0
+LLM_TIMEOUT_SECONDS = 60.0
+
+# Any OpenAI-compatible endpoint; point it at /api/fake-llm/v1 (FAKE_LLM_SERVER) to run offline
+CHATBOT_LLM_BASE_URL = os.getenv("CHATBOT_LLM_BASE_URL", "https://api.groq.com/openai/v1")
+
+# Free-tier defaults (llama-3.3-70b-versatile on Groq, Gemini Flash)
+PROVIDER_LIMITS = {
+    "groq": {
+        "rpm": int(os.getenv("GROQ_RPM", "30")),
+        "tpm": int(os.getenv("GROQ_TPM", "12000")),
+    },
+    "gemini": {
+        "rpm": int(os.getenv("GEMINI_RPM", "10")),
+        "tpm": int(os.getenv("GEMINI_TPM", "250000")),
+    },
+}
+
+# Rough token estimate for prompts, until the provider reports real usage
+CHARS_PER_TOKEN = 4
+# Latency samples kept per model for the percentiles in stats()
+LATENCY_WINDOW = 500
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
+
+
+# ============================================================================
+# RATE LIMITING
+# ============================================================================
+
+class TokenBucket:
+    """`capacity` units refilled evenly over a minute; acquire() waits for them (FIFO)."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        # A request bigger than the whole bucket still goes through once it's full
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (or refund, if negative) the difference between estimated and actual usage."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+@dataclass
+class CallMetrics:
+    provider: str
+    model: str
+    user_id: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    # Time spent waiting for a slot / rate limit (all attempts), then the rest
+    queued_ms: float = 0.0
+    latency_ms: float = 0.0
+    attempts: int = 0
+    ok: bool = False
+    # Stream closed by the consumer before it finished (not an error)
+    cancelled: bool = False
+
+
+@dataclass
+class _ModelStats:
+    calls: int = 0
+    errors: int = 0
+    cancelled: int = 0
+    retries: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latencies_ms: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def as_dict(self) -> dict:
+        latencies = sorted(self.latencies_ms)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency_ms_p50": percentile(0.5),
+            "latency_ms_p95": percentile(0.95),
+        }
+
+
+# ============================================================================
+# GATEWAY
+# ============================================================================
+
+class LLMGateway:
+    def __init__(self):
+        self._openai: Optional[openai.AsyncOpenAI] = None
+        self._genai = None
+        self._global = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        # user_id -> [semaphore, callers holding or waiting]
+        self._per_user: Dict[str, list] = {}
+        self._buckets = {
+            provider: (TokenBucket(limits["rpm"]), TokenBucket(limits["tpm"]))
+            for provider, limits in PROVIDER_LIMITS.items()
+        }
+        self._stats: Dict[Tuple[str, str], _ModelStats] = {}
+        self._in_flight = 0
+
+    # ---- clients -----------------------------------------------------------
+
+    def openai_client(self) -> openai.AsyncOpenAI:
+        if self._openai is None:
+            self._openai = openai.AsyncOpenAI(
+                api_key=os.getenv("GROQ_API_KEY"),
+                base_url=CHATBOT_LLM_BASE_URL,
+                timeout=LLM_TIMEOUT_SECONDS,
+                # Retries happen in _with_retries, each through the rate limiter
+                max_retries=0,
+                http_client=openai.DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONCURRENCY,
+                        max_keepalive_connections=LLM_MAX_CONCURRENCY,
+                    )
+                ),
+            )
+        return self._openai
+
+    def genai_client(self):
+        if self._genai is None:
+            from google import genai
+            self._genai = genai.Client(api_key=os.getenv("GOOGLE_GEMINI_API_KEY"))
+        return self._genai
+
+    async def shutdown(self) -> None:
+        if self._openai is not None:
+            await self._openai.close()
+            self._openai = None
+
+    # ---- governor ----------------------------------------------------------
+
+    @asynccontextmanager
+    async def _user_slot(self, user_id: Optional[str]):
+        if user_id is None:
+            yield
+            return
+        entry = self._per_user.get(user_id)
+        if entry is None:
+            entry = self._per_user[user_id] = [asyncio.Semaphore(LLM_MAX_CONCURRENCY_PER_USER), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._per_user[user_id]
+
+    @asynccontextmanager
+    async def _slot(self, user_id: Optional[str]):
+        """Per-user slot, then a global slot: in that order, so one user's queue
+        never holds global slots while it waits. Rate-limit budget is taken per
+        attempt, inside the slot (see _with_retries)."""
+        async with self._user_slot(user_id):
+            async with self._global:
+                self._in_flight += 1
+                try:
+                    yield
+                finally:
+                    self._in_flight -= 1
+
+    def _charge_actual(self, provider: str, estimated_tokens: int, metrics: CallMetrics) -> None:
+        if metrics.total_tokens is not None:
+            self._buckets[provider][1].adjust(metrics.total_tokens - estimated_tokens)
+
+    # ---- retries -----------------------------------------------------------
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+            return True
+        status = getattr(error, "status_code", None) or getattr(error, "code", None)
+        return isinstance(status, int) and status in _RETRYABLE_STATUS
+
+    @staticmethod
+    def _retry_delay(attempt: int, error: Exception) -> float:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        retry_after = headers.get("retry-after") if headers is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), LLM_BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+        # Full jitter: spreads out callers that failed together
+        return random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    async def _acquire_budget(self, provider: str, estimated_tokens: int) -> None:
+        requests, tokens = self._buckets[provider]
+        await requests.acquire()
+        await tokens.acquire(estimated_tokens)
+
+    async def _with_retries(self, metrics: CallMetrics, estimated_tokens: int, attempt_call):
+        """Runs `attempt_call` until it succeeds or isn't worth retrying. Each
+        attempt is a request as far as the provider's limits go, so each one
+        waits for its own RPM/TPM budget (counted in metrics.queued_ms)."""
+        while True:
+            waiting_since = time.monotonic()
+            await self._acquire_budget(metrics.provider, estimated_tokens)
+            metrics.queued_ms += (time.monotonic() - waiting_since) * 1000
+            metrics.attempts += 1
+            try:
+                return await attempt_call()
+            except Exception as e:
+                if metrics.attempts >= LLM_MAX_ATTEMPTS or not self._is_retryable(e):
+                    raise
+                delay = self._retry_delay(metrics.attempts - 1, e)
+                logger.info(
+                    "LLM call to %s failed (%s), retry %d in %.1fs",
+                    metrics.model, type(e).__name__, metrics.attempts, delay
+                )
+                await asyncio.sleep(delay)
+
+    # ---- bookkeeping -------------------------------------------------------
+
+    def _record(self, metrics: CallMetrics) -> None:
+        stats = self._stats.setdefault((metrics.provider, metrics.model), _ModelStats())
+        stats.calls += 1
+        stats.retries += max(0, metrics.attempts - 1)
+        if metrics.cancelled:
+            stats.cancelled += 1
+        elif not metrics.ok:
+            stats.errors += 1
+        stats.prompt_tokens += metrics.prompt_tokens or 0
+        stats.completion_tokens += metrics.completion_tokens or 0
+        stats.latencies_ms.append(metrics.latency_ms)
+        logger.info(
+            "LLM %s/%s user=%s ok=%s tokens=%s queued=%.0fms latency=%.0fms attempts=%d",
+            metrics.provider, metrics.model, metrics.user_id, metrics.ok,
+            metrics.total_tokens, metrics.queued_ms, metrics.latency_ms, metrics.attempts
+        )
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "users_waiting_or_active": len(self._per_user),
+            "models": {
+                f"{provider}/{model}": stats.as_dict()
+                for (provider, model), stats in self._stats.items()
+            },
+        }
+
+    @staticmethod
+    def _estimate_tokens(text_chars: int, max_tokens: int) -> int:
+        return text_chars // CHARS_PER_TOKEN + max_tokens
+
+    # ---- calls -------------------------------------------------------------
+
+    async def chat(
+        self,
+        *,
+        model: str,
+        messages: list,
+        max_tokens: int,
+        temperature: float = 0.7,
+        user_id: Optional[str] = None,
+    ) -> Tuple[str, CallMetrics]:
+        """Chat completion through the OpenAI-compatible provider. Raises LLMError."""
+        metrics = CallMetrics(provider="groq", model=model, user_id=user_id)
+        estimated = self._estimate_tokens(sum(len(m["content"]) for m in messages), max_tokens)
+
+        queued_at = time.monotonic()
+        try:
+            async with self._slot(user_id):
+                metrics.queued_ms = (time.monotonic() - queued_at) * 1000
+                response = await self._with_retries(
+                    metrics,
+                    estimated,
+                    lambda: self.openai_client().chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                    ),
+                )
+                metrics.latency_ms = (time.monotonic() - queued_at) * 1000 - metrics.queued_ms
+            if response.usage:
+                metrics.prompt_tokens = response.usage.prompt_tokens
+                metrics.completion_tokens = response.usage.completion_tokens
+                metrics.total_tokens = response.usage.total_tokens
+            metrics.ok = True
+            return response.choices[0].message.content, metrics
+        except Exception as e:
+            raise LLMError(str(e)) from e
+        finally:
+            self._charge_actual("groq", estimated, metrics)
+            self._record(metrics)
+
+    async def chat_stream(
+        self,
+        *,
+        model: str,
+        messages: list,
+        max_tokens: int,
+        temperature: float = 0.7,
+        user_id: Optional[str] = None,
+        metrics: Optional[CallMetrics] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Streamed chat completion, yielding text deltas. Pass `metrics` to
+        read usage once the iterator is exhausted. Only opening the stream
+        is retried; the slot is held until the stream ends or is closed.
+        """
+        if metrics is None:
+            metrics = CallMetrics(provider="groq", model=model, user_id=user_id)
+        estimated = self._estimate_tokens(sum(len(m["content"]) for m in messages), max_tokens)
+
+        queued_at = time.monotonic()
+        try:
+            async with self._slot(user_id):
+                metrics.queued_ms = (time.monotonic() - queued_at) * 1000
+                try:
+                    stream = await self._with_retries(
+                        metrics,
+                        estimated,
+                        lambda: self.openai_client().chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            stream=True,
+                            stream_options={"include_usage": True},
+                        ),
+                    )
+                except Exception as e:
+                    raise LLMError(str(e)) from e
+                try:
+                    async for chunk in stream:
+                        if chunk.usage:
+                            metrics.prompt_tokens = chunk.usage.prompt_tokens
+                            metrics.completion_tokens = chunk.usage.completion_tokens
+                            metrics.total_tokens = chunk.usage.total_tokens
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                    metrics.ok = True
+                except (GeneratorExit, asyncio.CancelledError):
+                    metrics.cancelled = True
+                    raise
+                finally:
+                    # Also runs when the consumer stops early: drops the upstream connection
+                    await stream.close()
+                    metrics.latency_ms = (time.monotonic() - queued_at) * 1000 - metrics.queued_ms
+        finally:
+            self._charge_actual("groq", estimated, metrics)
+            self._record(metrics)
+
+    async def generate(
+        self,
+        *,
+        model: str,
+        prompt: str,
+        user_id: Optional[str] = None,
+        expected_output_tokens: int = 1024,
+    ) -> Tuple[str, CallMetrics]:
+        """Gemini text generation. Raises LLMError."""
+        metrics = CallMetrics(provider="gemini", model=model, user_id=user_id)
+        estimated = self._estimate_tokens(len(prompt), expected_output_tokens)
+
+        queued_at = time.monotonic()
+        try:
+            async with self._slot(user_id):
+                metrics.queued_ms = (time.monotonic() - queued_at) * 1000
+                response = await self._with_retries(
+                    metrics,
+                    estimated,
+                    lambda: self.genai_client().aio.models.generate_content(model=model, contents=prompt),
+                )
+                metrics.latency_ms = (time.monotonic() - queued_at) * 1000 - metrics.queued_ms
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                metrics.prompt_tokens = usage.prompt_token_count
+                metrics.completion_tokens = usage.candidates_token_count
+                metrics.total_tokens = usage.total_token_count
+            if not response.text:
+                raise LLMError("The model returned an empty response")
+            metrics.ok = True
+            return response.text, metrics
+        except LLMError:
+            raise
+        except Exception as e:
+            raise LLMError(str(e)) from e
+        finally:
+            self._charge_actual("gemini", estimated, metrics)
+            self._record(metrics)
+
+
+llm_gateway = LLMGateway()
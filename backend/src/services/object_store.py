@@ -0,0 +1,550 @@
+"""
+Object storage for uploaded files.
+
+Routes talk to an ObjectStore instead of calling the Cloudinary SDK
+directly. The SDK is synchronous, so every call runs on a dedicated
+thread pool (UPLOAD_WORKERS threads): a 50 MB transfer ties up one
+upload thread, never the event loop or FastAPI's default threadpool.
+
+Size limits are enforced while bytes move, not after:
+    - UploadSizeLimitMiddleware (src/middleware.py) stops reading the
+      request body once it passes the limit
+    - SizeLimitedReader raises UploadTooLarge as soon as the transfer to
+      storage reads past max_bytes
+
+Direct uploads: create_upload_ticket() returns a signed, short-lived URL
+and form fields so the browser sends the file straight to storage; the
+API only verifies the stored object afterwards (stat()) and never sees
+the bytes. Tickets and the token the client hands back on completion are
+HMAC-signed with UPLOAD_SIGNING_SECRET (see sign_token/verify_token).
+
+Backends, picked with OBJECT_STORE:
+    cloudinary (default)  CloudinaryObjectStore
+    local                 LocalObjectStore, files under LOCAL_STORAGE_DIR
+                          served from LOCAL_STORAGE_BASE_URL; direct
+                          uploads go to LOCAL_UPLOAD_BASE_URL, a mock of
+                          the storage service (routes/storage.py). Stand-in
+                          for development and tests
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import shutil
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import AsyncIterator, BinaryIO, Optional
+
+import httpx
+
+import cloudinary
+import cloudinary.api
+import cloudinary.exceptions
+import cloudinary.uploader
+import cloudinary.utils
+
+OBJECT_STORE = os.getenv("OBJECT_STORE", "cloudinary")
+UPLOAD_MAX_SIZE_MB = int(os.getenv("UPLOAD_MAX_SIZE_MB", "50"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "./storage")
+LOCAL_STORAGE_BASE_URL = os.getenv("LOCAL_STORAGE_BASE_URL", "http://localhost:8000/storage")
+LOCAL_UPLOAD_BASE_URL = os.getenv("LOCAL_UPLOAD_BASE_URL", "http://localhost:8000/api/storage-uploads")
+
+# How long a direct-upload ticket stays usable
+UPLOAD_TICKET_TTL_SECONDS = int(os.getenv("UPLOAD_TICKET_TTL_SECONDS", "900"))
+# Random per process if unset: tickets then only survive until restart
+UPLOAD_SIGNING_SECRET = (
+    os.getenv("UPLOAD_SIGNING_SECRET")
+    or os.getenv("CLOUDINARY_API_SECRET")
+    or secrets.token_hex(32)
+)
+
+# Cloudinary's chunked upload API kicks in above this size
+CLOUDINARY_CHUNK_SIZE = 20 * 1024 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="object-store")
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking storage call on the upload thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_upload_executor, partial(fn, *args, **kwargs))
+
+
+class InvalidUploadToken(Exception):
+    pass
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File too large. Maximum size: {max_bytes // (1024 * 1024)}MB")
+        self.max_bytes = max_bytes
+
+
+class SizeLimitedReader:
+    """
+    File wrapper that fails the transfer once it reads past max_bytes.
+    Closing it leaves the underlying file open (the caller owns it).
+    """
+
+    def __init__(self, raw: BinaryIO, max_bytes: int, name: Optional[str] = None):
+        self.raw = raw
+        self.max_bytes = max_bytes
+        self.name = name
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.max_bytes + 1 - self.raw.tell()
+        data = self.raw.read(max(size, 0))
+        if self.raw.tell() > self.max_bytes:
+            raise UploadTooLarge(self.max_bytes)
+        return data
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self.raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.raw.tell()
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@dataclass
+class StoredObject:
+    key: str
+    url: str
+    size: int
+    content_type: str
+    format: Optional[str] = None
+    content_hash: Optional[str] = None  # sha256 hex, when the store can compute it
+    storage: dict = field(default_factory=dict)  # backend details delete() needs later
+
+
+def _hash_sync(fileobj, max_bytes: int) -> str:
+    position = fileobj.tell()
+    reader = SizeLimitedReader(fileobj, max_bytes)
+    digest = hashlib.sha256()
+    try:
+        while chunk := reader.read(COPY_CHUNK_SIZE):
+            digest.update(chunk)
+    finally:
+        fileobj.seek(position)
+    return digest.hexdigest()
+
+
+async def hash_file(fileobj: BinaryIO, max_bytes: int) -> str:
+    """sha256 of a file, streamed in chunks on the upload thread pool (UploadTooLarge past max_bytes)"""
+    return await run_blocking(_hash_sync, fileobj, max_bytes)
+
+
+@dataclass
+class UploadTicket:
+    """Where and how the client sends a file directly to storage"""
+    key: str
+    upload_url: str
+    method: str
+    fields: dict = field(default_factory=dict)    # multipart form fields to send with the file
+    headers: dict = field(default_factory=dict)
+    storage: dict = field(default_factory=dict)   # backend details stat() needs later
+
+
+class ObjectStore(ABC):
+    @abstractmethod
+    async def put(
+        self,
+        fileobj: BinaryIO,
+        filename: str,
+        content_type: str,
+        folder: str = "study-resources",
+        max_bytes: Optional[int] = None,
+    ) -> StoredObject:
+        """Store a readable file, failing with UploadTooLarge past max_bytes."""
+
+    @abstractmethod
+    async def delete(self, key: str, storage: Optional[dict] = None) -> bool:
+        """Remove an object (`storage` as from its ticket or StoredObject.storage); True if it existed."""
+
+    @abstractmethod
+    def key_for_url(self, url: str) -> Optional[str]:
+        """The key behind a URL this store handed out, or None if it isn't ours."""
+
+    def storage_for_url(self, url: str) -> dict:
+        """Backend details for deleting the object behind a URL (see delete())."""
+        return {}
+
+    @abstractmethod
+    def create_upload_ticket(
+        self,
+        filename: str,
+        content_type: str,
+        max_bytes: int,
+        folder: str = "study-resources",
+    ) -> UploadTicket:
+        """Signed, short-lived permission for the client to upload one object."""
+
+    @abstractmethod
+    async def stat(self, key: str, storage: dict) -> Optional[StoredObject]:
+        """What actually landed under a ticket's key (verified size/type), or None."""
+
+
+# ============================================================================
+# CLOUDINARY
+# ============================================================================
+
+def detect_cloudinary_resource_type(content_type: str) -> str:
+    """
+    Cloudinary resource type for a MIME type: "image", "video" or "raw"
+    (PDFs, documents, anything else)
+    """
+    if content_type.startswith('image/'):
+        return "image"
+    elif content_type.startswith('pdf/'):
+        return "image"
+    elif content_type.startswith('video/'):
+        return "video"
+    return "raw"
+
+
+def _cloudinary_resource_type(content_type: str) -> str:
+    # PDFs are stored raw so Cloudinary serves the original bytes
+    return "raw" if content_type == "application/pdf" else detect_cloudinary_resource_type(content_type)
+
+
+def _unique_public_id(folder: str, filename: str, resource_type: str) -> str:
+    name = _safe_name(filename)
+    if resource_type != "raw":
+        # Cloudinary appends the format itself for images and videos
+        name = name.rsplit('.', 1)[0]
+    return f"{folder}/{uuid.uuid4().hex}_{name}"
+
+
+def _parse_cloudinary_url(url: str) -> Optional[tuple]:
+    """(resource_type, public_id as in the URL) for a Cloudinary delivery URL, else None"""
+    # https://res.cloudinary.com/{cloud_name}/{resource_type}/upload/[v{version}/]{public_id}[.{format}]
+    if "cloudinary.com/" not in url:
+        return None
+    parts = url.split("?", 1)[0].split("cloudinary.com/", 1)[1].split("/")
+    if len(parts) < 4 or parts[2] != "upload":
+        return None
+    resource_type, path = parts[1], parts[3:]
+    if path[0].startswith("v") and path[0][1:].isdigit():
+        path = path[1:]
+    return (resource_type, "/".join(path)) if path else None
+
+
+class CloudinaryObjectStore(ObjectStore):
+
+    def _upload_sync(self, fileobj, filename: str, content_type: str, folder: str, size: int) -> dict:
+        resource_type = _cloudinary_resource_type(content_type)
+        # A fresh public_id per put: two files with the same name never
+        # overwrite each other (same scheme as create_upload_ticket)
+        options = dict(
+            public_id=_unique_public_id(folder, filename, resource_type),
+            resource_type=resource_type,
+            overwrite=False,
+            access_mode="public",
+            type="upload",
+        )
+        if resource_type != "raw":
+            options["content_disposition"] = "inline"
+
+        if size > CLOUDINARY_CHUNK_SIZE:
+            # Sent in CLOUDINARY_CHUNK_SIZE pieces instead of one request body
+            return cloudinary.uploader.upload_large(
+                fileobj, filename=filename, chunk_size=CLOUDINARY_CHUNK_SIZE, **options
+            )
+        return cloudinary.uploader.upload(fileobj, **options)
+
+    async def put(self, fileobj, filename, content_type, folder="study-resources", max_bytes=None):
+        size = _remaining_size(fileobj)
+        if max_bytes is not None:
+            if size > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            fileobj = SizeLimitedReader(fileobj, max_bytes, name=filename)
+
+        result = await run_blocking(self._upload_sync, fileobj, filename, content_type, folder, size)
+        return StoredObject(
+            key=result["public_id"],
+            url=result["secure_url"],
+            size=result.get("bytes", size),
+            content_type=content_type,
+            format=result.get("format"),
+            storage={"resource_type": result.get("resource_type") or _cloudinary_resource_type(content_type)},
+        )
+
+    async def delete(self, key: str, storage: Optional[dict] = None) -> bool:
+        # destroy() assumes an image unless told the resource type
+        options = {"resource_type": storage["resource_type"]} if storage and "resource_type" in storage else {}
+        result = await run_blocking(cloudinary.uploader.destroy, key, **options)
+        return result.get('result') == 'ok'
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        parsed = _parse_cloudinary_url(url)
+        if parsed is None:
+            return None
+        resource_type, public_id = parsed
+        if resource_type == "raw":
+            # Raw public_ids keep their extension (see _unique_public_id)
+            return public_id
+        return public_id.rsplit('.', 1)[0]
+
+    def storage_for_url(self, url: str) -> dict:
+        parsed = _parse_cloudinary_url(url)
+        return {"resource_type": parsed[0]} if parsed else {}
+
+    def create_upload_ticket(self, filename, content_type, max_bytes, folder="study-resources"):
+        config = cloudinary.config()
+        resource_type = _cloudinary_resource_type(content_type)
+        params = {
+            "public_id": _unique_public_id(folder, filename, resource_type),
+            "timestamp": int(time.time()),
+        }
+        # Cloudinary rejects the signature an hour after `timestamp`
+        signature = cloudinary.utils.api_sign_request(params, config.api_secret)
+
+        return UploadTicket(
+            key=params["public_id"],
+            upload_url=f"https://api.cloudinary.com/v1_1/{config.cloud_name}/{resource_type}/upload",
+            method="POST",
+            fields={**params, "api_key": config.api_key, "signature": signature},
+            storage={"resource_type": resource_type},
+        )
+
+    async def stat(self, key, storage):
+        resource_type = storage.get("resource_type", "raw")
+        try:
+            result = await run_blocking(cloudinary.api.resource, key, resource_type=resource_type)
+        except cloudinary.exceptions.NotFound:
+            return None
+
+        if resource_type == "raw":
+            # Raw files aren't inspected by Cloudinary: sniff their first bytes
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.get(
+                    result["secure_url"], headers={"Range": f"bytes=0-{SNIFF_BYTES - 1}"}
+                )
+            content_type = sniff_content_type(response.content[:SNIFF_BYTES]) or "application/octet-stream"
+        else:
+            # Cloudinary only accepts real images/videos on those endpoints
+            content_type = f"{resource_type}/{result.get('format')}"
+
+        return StoredObject(
+            key=key,
+            url=result["secure_url"],
+            size=result.get("bytes", 0),
+            content_type=content_type,
+            format=result.get("format"),
+            storage={"resource_type": resource_type},
+        )
+
+
+# ============================================================================
+# LOCAL FILESYSTEM
+# ============================================================================
+
+class LocalObjectStore(ObjectStore):
+    def __init__(self, root: str = LOCAL_STORAGE_DIR, base_url: str = LOCAL_STORAGE_BASE_URL):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    def _write_sync(self, fileobj, path: str) -> int:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        written = 0
+        try:
+            with open(path, "wb") as out:
+                while chunk := fileobj.read(COPY_CHUNK_SIZE):
+                    out.write(chunk)
+                    written += len(chunk)
+        except BaseException:
+            # Each object has its own directory: drop it with the partial file
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            raise
+        return written
+
+    async def put(self, fileobj, filename, content_type, folder="study-resources", max_bytes=None):
+        if max_bytes is not None:
+            fileobj = SizeLimitedReader(fileobj, max_bytes, name=filename)
+
+        key = f"{folder}/{uuid.uuid4().hex}/{_safe_name(filename)}"
+        size = await run_blocking(self._write_sync, fileobj, self._path(key))
+        return StoredObject(
+            key=key,
+            url=f"{self.base_url}/{key}",
+            size=size,
+            content_type=content_type,
+            format=filename.rsplit('.', 1)[-1].lower() if '.' in filename else None,
+        )
+
+    async def delete(self, key: str, storage: Optional[dict] = None) -> bool:
+        path = self._path(key)
+
+        def _remove() -> bool:
+            if not os.path.exists(path):
+                return False
+            os.remove(path)
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            return True
+
+        return await run_blocking(_remove)
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        prefix = self.base_url + "/"
+        return url[len(prefix):] if url.startswith(prefix) else None
+
+    def create_upload_ticket(self, filename, content_type, max_bytes, folder="study-resources"):
+        key = f"{folder}/{uuid.uuid4().hex}/{_safe_name(filename)}"
+        token = sign_token({"key": key, "max_bytes": max_bytes, "content_type": content_type})
+        return UploadTicket(
+            key=key,
+            upload_url=f"{LOCAL_UPLOAD_BASE_URL}/{key}",
+            method="PUT",
+            headers={"Content-Type": content_type, "X-Upload-Token": token},
+        )
+
+    async def receive(self, key: str, chunks: AsyncIterator[bytes], max_bytes: int) -> int:
+        """
+        Write a streamed request body under `key` (the mock storage
+        endpoint), aborting with UploadTooLarge once it passes max_bytes.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        out = await run_blocking(open, path, "wb")
+        written = 0
+        try:
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                await run_blocking(out.write, chunk)
+        except BaseException:
+            out.close()
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            raise
+        await run_blocking(out.close)
+        return written
+
+    async def stat(self, key, storage):
+        path = self._path(key)
+
+        def _stat():
+            if not os.path.isfile(path):
+                return None
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                head = f.read(SNIFF_BYTES)
+                digest.update(head)
+                while chunk := f.read(COPY_CHUNK_SIZE):
+                    digest.update(chunk)
+            return os.path.getsize(path), head, digest.hexdigest()
+
+        found = await run_blocking(_stat)
+        if found is None:
+            return None
+        size, head, content_hash = found
+        return StoredObject(
+            key=key,
+            url=f"{self.base_url}/{key}",
+            size=size,
+            content_type=sniff_content_type(head) or "application/octet-stream",
+            format=key.rsplit('.', 1)[-1].lower() if '.' in key.rsplit('/', 1)[-1] else None,
+            content_hash=content_hash,
+        )
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _remaining_size(fileobj) -> int:
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell() - position
+    fileobj.seek(position)
+    return size
+
+
+SNIFF_BYTES = 16
+
+# Magic numbers for the types the app treats specially
+_SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"\x1aE\xdf\xa3", "video/webm"),
+)
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """MIME type from a file's first bytes, or None if unrecognised"""
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        return "video/mp4"
+    return None
+
+
+def sign_token(payload: dict, ttl_seconds: int = UPLOAD_TICKET_TTL_SECONDS) -> str:
+    """Compact HMAC-signed token: base64(json).hexdigest, with an `exp` claim"""
+    body = base64.urlsafe_b64encode(
+        json.dumps({**payload, "exp": int(time.time()) + ttl_seconds}).encode()
+    ).decode()
+    signature = hmac.new(UPLOAD_SIGNING_SECRET.encode(), body.encode(), hashlib.sha256).hexdigest()
+    return f"{body}.{signature}"
+
+
+def verify_token(token: str, leeway_seconds: int = 0) -> dict:
+    """Payload of a token from sign_token; raises InvalidUploadToken if forged or expired"""
+    try:
+        body, signature = token.rsplit(".", 1)
+    except ValueError:
+        raise InvalidUploadToken("Malformed upload token")
+    expected = hmac.new(UPLOAD_SIGNING_SECRET.encode(), body.encode(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(signature, expected):
+        raise InvalidUploadToken("Invalid upload token")
+
+    payload = json.loads(base64.urlsafe_b64decode(body.encode()))
+    if payload["exp"] + leeway_seconds < time.time():
+        raise InvalidUploadToken("Upload token expired")
+    return payload
+
+
+def _safe_name(filename: str) -> str:
+    name = os.path.basename(filename or "") or "file"
+    return "".join(c if c.isalnum() or c in "._-" else "_" for c in name)
+
+
+_store: Optional[ObjectStore] = None
+
+
+def get_object_store() -> ObjectStore:
+    global _store
+    if _store is None:
+        _store = LocalObjectStore() if OBJECT_STORE == "local" else CloudinaryObjectStore()
+    return _store
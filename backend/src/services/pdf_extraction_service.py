@@ -0,0 +1,300 @@
+"""
+PDF text extraction: off the event loop, bounded, and done once per file.
+
+pdfplumber is CPU-bound and can take seconds (or all of the host's memory)
+on a large PDF, so it runs in a process pool (pdf_worker):
+    - EXTRACTION_WORKERS processes, spawned, each capped at
+      EXTRACTION_MEMORY_LIMIT_MB of address space
+    - EXTRACTION_TIMEOUT_SECONDS per job: SIGALRM inside the worker, plus
+      a hard stop in the parent that tears the pool down if a worker
+      stops responding
+    - at most EXTRACTION_WORKERS jobs submitted at a time (a semaphore),
+      so nothing waits inside the pool and both timeouts count extraction
+      time only, never time spent queued behind other PDFs
+
+Results are stored in ResourceExtractions keyed by (resource, sha256 of
+the PDF), so summarizing the same resource twice reads the row instead of
+downloading and parsing again. The hash comes from the resource's blob
+when it has one (no download needed to hit the cache), and an extraction
+made for one resource is reused for any other resource with the same
+bytes. Concurrent requests for the same content share one extraction.
+
+Uploads of PDFs schedule an extraction in the background, which also
+fills in Resources.total_pages.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..database.database import async_session_local
+from ..database.models import Resources, ResourceExtractions, StoredBlobs
+from .object_store import UPLOAD_MAX_SIZE_MB
+from .pdf_worker import ExtractionError, ExtractionTimeout, extract_pages, init_worker
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "60"))
+EXTRACTION_MEMORY_LIMIT_MB = int(os.getenv("EXTRACTION_MEMORY_LIMIT_MB", "1024"))
+EXTRACTION_MAX_PAGES = int(os.getenv("EXTRACTION_MAX_PAGES", "500"))
+PDF_DOWNLOAD_TIMEOUT_SECONDS = 30.0
+
+# Extra time the parent waits past the worker's own alarm before giving up on it
+HARD_TIMEOUT_GRACE_SECONDS = 5
+
+_pool: Optional[ProcessPoolExecutor] = None
+# One slot per worker process: a job holding a slot has a worker to itself
+_worker_slots = asyncio.Semaphore(EXTRACTION_WORKERS)
+_http_client: Optional[httpx.AsyncClient] = None
+# content hash -> running extraction, so concurrent callers share one job
+_in_flight: Dict[str, asyncio.Task] = {}
+# Keeps background extraction tasks referenced until they finish
+_background_tasks: set = set()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=EXTRACTION_WORKERS,
+            # spawn: forking a process with a running event loop and DB pool is unsafe
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(EXTRACTION_MEMORY_LIMIT_MB,),
+        )
+    return _pool
+
+
+def _discard_pool(pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Kill a pool's workers (a job overran its hard timeout or one crashed);
+    the next job starts a new pool. Given the pool a failed job ran on,
+    this is a no-op if that pool was already replaced, so the other jobs
+    that failed along with it don't tear down its successor.
+    """
+    global _pool
+    if pool is None:
+        pool = _pool
+    elif pool is not _pool:
+        return
+    _pool = None
+    if pool is None:
+        return
+    for process in list(getattr(pool, "_processes", {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=PDF_DOWNLOAD_TIMEOUT_SECONDS, follow_redirects=True)
+    return _http_client
+
+
+async def shutdown() -> None:
+    global _http_client
+    _discard_pool()
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# ============================================================================
+# DOWNLOAD + EXTRACT
+# ============================================================================
+
+async def download_pdf(url: str, max_size_mb: int = UPLOAD_MAX_SIZE_MB) -> bytes:
+    """Fetch a PDF through the shared client, refusing anything over max_size_mb."""
+    max_bytes = max_size_mb * 1024 * 1024
+    chunks = []
+    received = 0
+    try:
+        async with _get_http_client().stream("GET", url) as response:
+            if response.status_code != 200:
+                raise ExtractionError("Failed to download PDF")
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                if received > max_bytes:
+                    raise ExtractionError(f"PDF is larger than {max_size_mb}MB")
+                chunks.append(chunk)
+    except httpx.HTTPError as e:
+        raise ExtractionError(f"Failed to download PDF: {e}")
+    return b"".join(chunks)
+
+
+async def extract_pdf_bytes(
+    pdf_bytes: bytes,
+    max_pages: int = EXTRACTION_MAX_PAGES,
+) -> Tuple[int, List[str]]:
+    """
+    (page count, per-page text) from the worker pool.
+    Raises ExtractionTimeout / ExtractionError.
+    """
+    async with _worker_slots:
+        try:
+            return await _run_on_worker(pdf_bytes, max_pages)
+        except _CollateralFailure:
+            # Our worker was killed because another job overran or crashed:
+            # not this file's fault, so it gets one go on the fresh pool
+            try:
+                return await _run_on_worker(pdf_bytes, max_pages)
+            except _CollateralFailure:
+                raise ExtractionError("PDF extraction workers were restarted; try again")
+
+
+class _CollateralFailure(Exception):
+    """The job's pool was torn down over a different job."""
+
+
+async def _run_on_worker(pdf_bytes: bytes, max_pages: int) -> Tuple[int, List[str]]:
+    """One attempt; the caller holds a worker slot, so the job starts right away."""
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(
+                pool, extract_pages, pdf_bytes, max_pages, EXTRACTION_TIMEOUT_SECONDS
+            ),
+            timeout=EXTRACTION_TIMEOUT_SECONDS + HARD_TIMEOUT_GRACE_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        _discard_pool(pool)
+        raise ExtractionTimeout("PDF extraction timed out")
+    except BrokenProcessPool:
+        if pool is not _pool:
+            raise _CollateralFailure()
+        _discard_pool(pool)
+        raise ExtractionError("PDF extraction worker crashed (file too large or malformed)")
+
+
+def format_pages(pages: List[str], max_pages: Optional[int] = None) -> str:
+    """Page texts joined with the '--- Page n ---' markers the summarizer prompt uses"""
+    text = ""
+    for page_num, page_text in enumerate(pages[:max_pages], 1):
+        if page_text:
+            text += f"\n--- Page {page_num} ---\n{page_text}"
+    return text
+
+
+def extraction_pages(extraction: ResourceExtractions) -> List[str]:
+    return json.loads(extraction.pages)
+
+
+# ============================================================================
+# CACHED EXTRACTIONS
+# ============================================================================
+
+async def known_content_hash(session: AsyncSession, resource: Resources) -> Optional[str]:
+    """sha256 of the resource's bytes if known without downloading (from its blob)"""
+    if resource.blob_id is None:
+        return None
+    blob = await session.get(StoredBlobs, resource.blob_id)
+    return blob.content_hash if blob else None
+
+
+async def _find_extraction(
+    session: AsyncSession,
+    resource_id: int,
+    content_hash: str,
+) -> Optional[ResourceExtractions]:
+    """This resource's extraction of these bytes, else any resource's."""
+    result = await session.execute(
+        select(ResourceExtractions)
+        .where(ResourceExtractions.content_hash == content_hash)
+        .order_by((ResourceExtractions.resource_id == resource_id).desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+async def _extract_once(content_hash: str, url: str, pdf_bytes: Optional[bytes]) -> Tuple[int, List[str]]:
+    task = _in_flight.get(content_hash)
+    if task is None:
+        async def _run():
+            data = pdf_bytes if pdf_bytes is not None else await download_pdf(url)
+            return await extract_pdf_bytes(data)
+
+        task = asyncio.ensure_future(_run())
+        _in_flight[content_hash] = task
+        task.add_done_callback(lambda _: _in_flight.pop(content_hash, None))
+    # shield: one caller going away mustn't cancel the others' extraction
+    return await asyncio.shield(task)
+
+
+async def get_extraction(session: AsyncSession, resource: Resources) -> ResourceExtractions:
+    """
+    The stored extraction for a PDF resource, extracting it on first use.
+    Also backfills Resources.total_pages. Raises ExtractionError.
+    """
+    pdf_bytes = None
+    content_hash = await known_content_hash(session, resource)
+    if content_hash is None:
+        # No blob (links, pre-dedup uploads): the bytes are the only way to the hash
+        pdf_bytes = await download_pdf(resource.url)
+        content_hash = hashlib.sha256(pdf_bytes).hexdigest()
+
+    existing = await _find_extraction(session, resource.id, content_hash)
+    if existing is not None and existing.resource_id == resource.id:
+        return existing
+
+    if existing is not None:
+        # Same bytes extracted for another resource
+        page_count, pages_json = existing.page_count, existing.pages
+    else:
+        page_count, pages = await _extract_once(content_hash, resource.url, pdf_bytes)
+        pages_json = json.dumps(pages)
+
+    result = await session.execute(
+        pg_insert(ResourceExtractions)
+        .values(
+            resource_id=resource.id,
+            content_hash=content_hash,
+            page_count=page_count,
+            pages=pages_json,
+        )
+        .on_conflict_do_nothing(constraint="uq_resource_extractions_resource_hash")
+        .returning(ResourceExtractions)
+    )
+    extraction = result.scalars().first()
+    if extraction is None:
+        # A concurrent request stored it first
+        extraction = await _find_extraction(session, resource.id, content_hash)
+
+    await session.execute(
+        update(Resources)
+        .where(and_(Resources.id == resource.id, Resources.total_pages == None))
+        .values(total_pages=page_count)
+    )
+    return extraction
+
+
+async def _extract_in_background(resource_id: int) -> None:
+    try:
+        async with async_session_local() as session:
+            resource = await session.get(Resources, resource_id)
+            if resource is None or resource.is_deleted:
+                return
+            await get_extraction(session, resource)
+            await session.commit()
+    except Exception as e:
+        logger.warning("Background PDF extraction for resource %s failed: %s", resource_id, e)
+
+
+def schedule_extraction(resource_id: int) -> None:
+    """Extract a freshly uploaded PDF after the response (fills in total_pages)."""
+    task = asyncio.create_task(_extract_in_background(resource_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
@@ -0,0 +1,55 @@
+"""
+Code that runs inside the PDF extraction worker processes.
+
+Kept free of app imports (database, models, routes) so spawned workers
+start quickly and never open database connections. See
+pdf_extraction_service for the pool that drives these functions.
+"""
+
+import math
+import signal
+from io import BytesIO
+from typing import List, Tuple
+
+import pdfplumber
+
+
+class ExtractionError(Exception):
+    pass
+
+
+class ExtractionTimeout(ExtractionError):
+    pass
+
+
+def init_worker(memory_limit_mb: int) -> None:
+    """Cap the worker's address space, so one huge PDF can't exhaust the host."""
+    import resource
+
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _on_alarm(signum, frame):
+    raise ExtractionTimeout("PDF extraction timed out")
+
+
+def extract_pages(pdf_bytes: bytes, max_pages: int, timeout_seconds: float) -> Tuple[int, List[str]]:
+    """(total page count, text of the first max_pages pages)"""
+    # Soft timeout inside the worker; the parent also enforces a hard one
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.alarm(max(1, math.ceil(timeout_seconds)))
+    try:
+        with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+            page_count = len(pdf.pages)
+            pages = [page.extract_text() or "" for page in pdf.pages[:max_pages]]
+        return page_count, pages
+    except MemoryError:
+        raise ExtractionError("PDF needs more memory than extraction workers are allowed")
+    except ExtractionError:
+        raise
+    except Exception as e:
+        # pdfminer exceptions aren't always picklable: pass a plain message back
+        raise ExtractionError(f"Could not read PDF: {e}")
+    finally:
+        signal.alarm(0)
@@ -0,0 +1,309 @@
+"""
+Write-behind ingestion for page-based reading progress.
+
+The PDF viewer reports the current page on nearly every page turn. Instead
+of a resource SELECT + progress SELECT + UPDATE per event, events land in
+an in-memory buffer that keeps only the latest page per (user, resource),
+and a background task writes the whole buffer as ONE batched upsert
+(INSERT ... ON CONFLICT (user_id, resource_id) DO UPDATE) every
+PROGRESS_FLUSH_INTERVAL_SECONDS. A reader turning 60 pages a minute costs
+~12 row writes instead of 60, and 0 while idle.
+
+Durability is configurable through PROGRESS_DURABILITY:
+    buffered       (default) writes are delayed up to the flush interval;
+                   a crash loses at most that window of page turns. The
+                   buffer is also flushed on reading-session end
+                   (POST /resources/{id}/progress/flush, study session
+                   saves) and on app shutdown.
+    write_through  every event is upserted before the request returns
+                   (one statement instead of three).
+
+Reads of one resource's progress (GET /resources/{id}/progress/me and
+/progress/page) overlay pending events (see pending()), so the reader
+always sees their latest page. Listings that filter or sort by progress
+(GET /resources/library, GET /resources/my-progress) flush the user's
+pending events first. Progress stats and the chatbot's reading context
+are not overlaid: they lag by up to one flush interval. Like the chat and
+collab managers, the buffer lives in this process.
+
+A batch that fails is retried row by row, so one bad row (say, progress
+for a resource deleted meanwhile) can't hold back everyone else's. A row
+the database rejects goes back in the buffer once, and is dropped with a
+log line if it fails again. Connection-level errors drop nothing: the
+rows wait for the next flush.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import update, and_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError, DataError
+
+from ..database.database import async_session_local
+from ..database.models import Resources, ResourceProgress, ResourceStatus
+from .cache_service import TTLCache
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_BUFFERED = "buffered"
+DURABILITY_WRITE_THROUGH = "write_through"
+
+PROGRESS_DURABILITY = os.getenv("PROGRESS_DURABILITY", DURABILITY_BUFFERED)
+PROGRESS_FLUSH_INTERVAL_SECONDS = float(os.getenv("PROGRESS_FLUSH_INTERVAL_SECONDS", "5"))
+# Flush early when this many (user, resource) pairs are pending
+PROGRESS_MAX_PENDING = int(os.getenv("PROGRESS_MAX_PENDING", "5000"))
+# Writes a row may fail (rejected by the database) before it's dropped
+PROGRESS_MAX_ROW_ATTEMPTS = 2
+
+# Remembers that a user may read a resource, and the resource's page count,
+# so steady-state page turns don't re-run the permission SELECTs.
+READER_CACHE_TTL_SECONDS = 30
+
+
+@dataclass
+class PendingProgress:
+    current_page: int
+    total_pages: int
+    progress_percentage: int
+    status: ResourceStatus
+    notes: Optional[str] = None
+    # Set when the viewer reports a page count the resource doesn't have yet
+    learned_total_pages: Optional[int] = None
+    received_at: datetime = field(default_factory=datetime.utcnow)
+    failed_attempts: int = 0
+
+
+def compute_progress(current_page: int, total_pages: int) -> Tuple[int, ResourceStatus]:
+    """(percentage, status) -- same rules as update_resource_progress_by_page"""
+    percentage = int((current_page / total_pages) * 100) if total_pages > 0 else 0
+    if current_page == 0:
+        return percentage, ResourceStatus.NOT_STARTED
+    if current_page >= total_pages:
+        return 100, ResourceStatus.COMPLETED
+    return percentage, ResourceStatus.IN_PROGRESS
+
+
+class ProgressIngestor:
+    def __init__(self):
+        self._pending: Dict[Tuple[str, int], PendingProgress] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._readers = TTLCache(ttl_seconds=READER_CACHE_TTL_SECONDS)
+
+        # Metrics: events accepted vs rows actually written
+        self.events_received = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+
+    # ------------------------------------------------------------------
+    # Reader cache (permission + page count)
+    # ------------------------------------------------------------------
+
+    def known_total_pages(self, user_id: str, resource_id: int):
+        """The resource's page count if this user was recently authorized, else False."""
+        return self._readers.get((user_id, resource_id), False)
+
+    def remember_reader(self, user_id: str, resource_id: int, total_pages: Optional[int]) -> None:
+        self._readers.set((user_id, resource_id), total_pages)
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    async def record(
+        self,
+        user_id: str,
+        resource_id: int,
+        current_page: int,
+        resource_total_pages: Optional[int],
+        total_pages: Optional[int] = None,
+        notes: Optional[str] = None,
+    ) -> PendingProgress:
+        """Accept one page event; returns the state the reader should see."""
+        self.events_received += 1
+        key = (user_id, resource_id)
+        previous = self._pending.get(key)
+
+        learned = None
+        if total_pages and not resource_total_pages:
+            learned = total_pages
+            self.remember_reader(user_id, resource_id, total_pages)
+        effective_total_pages = total_pages or resource_total_pages or 1
+
+        percentage, status = compute_progress(current_page, effective_total_pages)
+        entry = PendingProgress(
+            current_page=current_page,
+            total_pages=effective_total_pages,
+            progress_percentage=percentage,
+            status=status,
+            # Keep notes / learned page count from coalesced events
+            notes=notes if notes is not None else (previous.notes if previous else None),
+            learned_total_pages=learned or (previous.learned_total_pages if previous else None),
+        )
+        self._pending[key] = entry
+
+        if PROGRESS_DURABILITY == DURABILITY_WRITE_THROUGH:
+            await self.flush(keys=[key])
+            if key in self._pending:
+                self._ensure_flush_loop()  # rejected once: the loop gives it its retry
+        elif len(self._pending) >= PROGRESS_MAX_PENDING:
+            await self.flush()
+        else:
+            self._ensure_flush_loop()
+        return entry
+
+    def pending(self, user_id: str, resource_id: int) -> Optional[PendingProgress]:
+        return self._pending.get((user_id, resource_id))
+
+    def discard(self, user_id: str, resource_id: int) -> None:
+        """Drop an unflushed event, e.g. when the user resets their progress."""
+        self._pending.pop((user_id, resource_id), None)
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    def _ensure_flush_loop(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while self._pending:
+            await asyncio.sleep(PROGRESS_FLUSH_INTERVAL_SECONDS)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("Flushing reading progress failed: %s", e)
+
+    async def flush(self, user_id: Optional[str] = None, keys=None) -> int:
+        """
+        Write pending events (all, one user's, or specific keys) in one
+        upsert, falling back to one row at a time if the batch fails.
+        Returns the number of rows written; raises if the database is
+        unreachable (the events stay pending).
+        """
+        async with self._flush_lock:
+            if keys is None:
+                keys = [k for k in self._pending if user_id is None or k[0] == user_id]
+            batch = {k: self._pending.pop(k) for k in keys if k in self._pending}
+            if not batch:
+                return 0
+
+            try:
+                await self._commit(batch)
+                written = list(batch)
+            except Exception as e:
+                if len(batch) > 1:
+                    logger.warning("Batched progress flush failed, writing %d rows one by one: %s", len(batch), e)
+                written = await self._commit_each(batch)
+
+        self.rows_written += len(written)
+        self.flushes += 1
+
+        from .resources_service import _invalidate_progress_stats
+        for flushed_user_id in {user_id for user_id, _ in written}:
+            _invalidate_progress_stats(flushed_user_id)
+        return len(written)
+
+    async def _commit(self, batch: Dict[Tuple[str, int], PendingProgress]) -> None:
+        async with async_session_local() as session:
+            await self._write_batch(session, batch)
+            await session.commit()
+
+    async def _commit_each(self, batch: Dict[Tuple[str, int], PendingProgress]) -> list:
+        """Write rows in separate transactions so a bad one can't sink the rest."""
+        written = []
+        entries = list(batch.items())
+        for index, (key, entry) in enumerate(entries):
+            try:
+                await self._commit({key: entry})
+                written.append(key)
+            except (IntegrityError, DataError) as e:
+                entry.failed_attempts += 1
+                if entry.failed_attempts >= PROGRESS_MAX_ROW_ATTEMPTS:
+                    self.rows_dropped += 1
+                    logger.error(
+                        "Dropping reading progress for user %s, resource %s after %d failed writes: %s",
+                        key[0], key[1], entry.failed_attempts, e,
+                    )
+                else:
+                    # Put it back unless a newer event arrived meanwhile
+                    self._pending.setdefault(key, entry)
+            except Exception:
+                # Not this row's fault (connection, timeout): keep it and
+                # everything after it for the next flush
+                for pending_key, pending_entry in entries[index:]:
+                    self._pending.setdefault(pending_key, pending_entry)
+                raise
+        return written
+
+    async def _write_batch(self, session, batch: Dict[Tuple[str, int], PendingProgress]) -> None:
+        now = datetime.utcnow()
+        rows = [
+            {
+                "user_id": user_id,
+                "resource_id": resource_id,
+                "current_page": entry.current_page,
+                "total_pages": entry.total_pages,
+                "progress_percentage": entry.progress_percentage,
+                "status": entry.status,
+                "notes": entry.notes,
+                "started_at": now if entry.status != ResourceStatus.NOT_STARTED else None,
+                "completed_at": now if entry.status == ResourceStatus.COMPLETED else None,
+                "last_updated": entry.received_at,
+            }
+            for (user_id, resource_id), entry in batch.items()
+        ]
+
+        stmt = pg_insert(ResourceProgress).values(rows)
+        excluded = stmt.excluded
+        await session.execute(
+            stmt.on_conflict_do_update(
+                # uq_resource_progress_user_resource
+                index_elements=[ResourceProgress.user_id, ResourceProgress.resource_id],
+                set_={
+                    "current_page": excluded.current_page,
+                    "total_pages": excluded.total_pages,
+                    "progress_percentage": excluded.progress_percentage,
+                    "status": excluded.status,
+                    "notes": func.coalesce(excluded.notes, ResourceProgress.notes),
+                    # First start / first completion win
+                    "started_at": func.coalesce(ResourceProgress.started_at, excluded.started_at),
+                    "completed_at": func.coalesce(ResourceProgress.completed_at, excluded.completed_at),
+                    "last_updated": excluded.last_updated,
+                },
+            )
+        )
+
+        # Persist page counts learned from the viewer, the first time only
+        learned = {
+            resource_id: entry.learned_total_pages
+            for (_, resource_id), entry in batch.items()
+            if entry.learned_total_pages
+        }
+        for resource_id, total_pages in learned.items():
+            await session.execute(
+                update(Resources)
+                .where(and_(Resources.id == resource_id, Resources.total_pages == None))
+                .values(total_pages=total_pages)
+            )
+
+    def stats(self) -> dict:
+        return {
+            "durability": PROGRESS_DURABILITY,
+            "flush_interval_seconds": PROGRESS_FLUSH_INTERVAL_SECONDS,
+            "pending": len(self._pending),
+            "events_received": self.events_received,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "flushes": self.flushes,
+        }
+
+
+progress_ingestor = ProgressIngestor()
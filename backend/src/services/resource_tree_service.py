@@ -0,0 +1,184 @@
+"""
+Folder trees for resources (the Resources.parent_folder_id adjacency list).
+
+Everything works on a whole subtree at once through a recursive CTE rooted
+at a folder, instead of clients walking folders one level at a time:
+    - get_tree: every live node under a root in one SELECT; sizes and
+      counts are rolled up bottom-up from that single result
+    - cascade_update: share / move / trash a folder together with all of
+      its descendants in one UPDATE ... WHERE id IN (subtree)
+    - validate_new_parent: reject reparenting that would create a cycle
+
+MAX_TREE_DEPTH bounds the recursion, so a cycle that already exists in the
+data can't make a query loop forever.
+"""
+
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, case, literal
+
+from ..database.models import Resources, ResourceType
+
+MAX_TREE_DEPTH = 32
+
+
+def _subtree(anchor_filter, include_deleted: bool = False):
+    """Recursive CTE of (id, depth) for the anchor rows and all their descendants."""
+    live = [] if include_deleted else [Resources.is_deleted == False]
+
+    anchor = select(
+        Resources.id.label("id"),
+        literal(0).label("depth"),
+    ).where(and_(anchor_filter, *live))
+    tree = anchor.cte("subtree", recursive=True)
+
+    children = (
+        select(Resources.id, tree.c.depth + 1)
+        .join(tree, Resources.parent_folder_id == tree.c.id)
+        .where(and_(tree.c.depth < MAX_TREE_DEPTH, *live))
+    )
+    return tree.union_all(children)
+
+
+def subtree_ids(root_id: int, include_deleted: bool = False):
+    """SELECT of the ids in root_id's subtree (root included), for IN (...) clauses."""
+    return select(_subtree(Resources.id == root_id, include_deleted).c.id)
+
+
+def _empty_node(resource: Optional[Resources], depth: int) -> dict:
+    node = {
+        "id": None,
+        "title": None,
+        "resource_type": ResourceType.FOLDER,
+        "parent_folder_id": None,
+        "group_id": None,
+        "file_size": None,
+        "depth": depth,
+        "children": [],
+        # Rolled up over the whole subtree, this node excluded
+        "total_size": 0,
+        "file_count": 0,
+        "folder_count": 0,
+    }
+    if resource is not None:
+        node.update(
+            id=resource.id,
+            title=resource.title,
+            resource_type=resource.resource_type,
+            parent_folder_id=resource.parent_folder_id,
+            group_id=resource.group_id,
+            file_size=resource.file_size,
+        )
+    return node
+
+
+async def get_tree(
+    session: AsyncSession,
+    user_id: str,
+    root_id: Optional[int] = None,
+    group_id: Optional[int] = None,
+) -> dict:
+    """
+    Nested tree of live resources in one query.
+
+    - root_id given: that folder and everything under it
+    - otherwise: a virtual root (id None) over the top level of the user's
+      personal library, or of `group_id`'s library when given
+
+    Permission checks are the caller's job (see routes/resources.py).
+    """
+    if root_id is not None:
+        anchor_filter = Resources.id == root_id
+    elif group_id is not None:
+        anchor_filter = and_(Resources.group_id == group_id, Resources.parent_folder_id == None)
+    else:
+        anchor_filter = and_(
+            Resources.uploaded_by == user_id,
+            Resources.group_id == None,
+            Resources.parent_folder_id == None,
+        )
+
+    tree = _subtree(anchor_filter)
+    result = await session.execute(
+        select(Resources, tree.c.depth)
+        .join(tree, tree.c.id == Resources.id)
+        .order_by(
+            tree.c.depth,
+            (Resources.resource_type == ResourceType.FOLDER).desc(),  # folders first
+            Resources.title,
+        )
+    )
+    rows = result.all()
+
+    virtual_root = _empty_node(None, depth=-1)
+    nodes = {resource.id: _empty_node(resource, depth) for resource, depth in rows}
+
+    for resource, depth in rows:
+        parent = nodes.get(resource.parent_folder_id) if depth > 0 else None
+        (parent or virtual_root)["children"].append(nodes[resource.id])
+
+    # Bottom-up roll-up: deepest nodes first, each adds itself + its totals to its parent
+    for resource, depth in sorted(rows, key=lambda row: row[1], reverse=True):
+        node = nodes[resource.id]
+        parent = nodes.get(resource.parent_folder_id) if depth > 0 else virtual_root
+        parent = parent or virtual_root
+        parent["total_size"] += node["total_size"] + (node["file_size"] or 0)
+        parent["file_count"] += node["file_count"]
+        parent["folder_count"] += node["folder_count"]
+        if node["resource_type"] == ResourceType.FOLDER:
+            parent["folder_count"] += 1
+        else:
+            parent["file_count"] += 1
+
+    if root_id is not None:
+        return nodes.get(root_id)
+    return virtual_root
+
+
+async def cascade_update(
+    session: AsyncSession,
+    root_id: int,
+    detach_root: bool = False,
+    **values,
+) -> int:
+    """
+    Apply `values` to root_id and every live descendant in one UPDATE.
+    detach_root also moves the root to the top level (parent_folder_id = NULL),
+    for when it leaves its parent's library. Returns the number of rows updated.
+    """
+    if detach_root:
+        values["parent_folder_id"] = case(
+            (Resources.id == root_id, None),
+            else_=Resources.parent_folder_id,
+        )
+
+    result = await session.execute(
+        update(Resources)
+        .where(Resources.id.in_(subtree_ids(root_id)))
+        .values(**values)
+        .execution_options(synchronize_session="fetch")
+    )
+    return result.rowcount
+
+
+async def validate_new_parent(
+    session: AsyncSession,
+    resource: Resources,
+    parent_folder_id: int,
+) -> None:
+    """Raises ValueError unless parent_folder_id is a live folder in the same library, outside resource's subtree."""
+    parent = await session.get(Resources, parent_folder_id)
+    if parent is None or parent.is_deleted or parent.resource_type != ResourceType.FOLDER:
+        raise ValueError("Parent folder not found")
+    if parent.group_id != resource.group_id or (
+        resource.group_id is None and parent.uploaded_by != resource.uploaded_by
+    ):
+        raise ValueError("Parent folder belongs to a different library")
+
+    own_subtree = _subtree(Resources.id == resource.id)
+    result = await session.execute(
+        select(own_subtree.c.id).where(own_subtree.c.id == parent_folder_id).limit(1)
+    )
+    if result.first() is not None:
+        raise ValueError("Cannot move a folder into itself or one of its subfolders")
@@ -3,13 +3,24 @@ Permission checks. if the user is allowed to play with the resources
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, and_, or_, func, tuple_
 from ..database.models import Resources, Groupings, InvitationStatus, ResourceType, ResourceProgress, ResourceStatus, Notifications
 from .group_service import is_user_in_group, can_manage_resources, get_group_members
-from typing import Optional, List, Tuple
-from datetime import datetime
+from typing import Optional, List, Tuple, Iterable
+from datetime import datetime, timedelta
 from ..schemas.notifications import CreateNotificationRequest
 from .notification_service import create_notification
+from . import resource_tree_service
+from .cache_service import TTLCache, invalidate_after_commit
+from .keyset import encode_cursor, decode_cursor
+from .chatbot_context_service import invalidate_user_context
+
+# Dashboard stats are cached per user and dropped by the writes that can
+# change them (see _invalidate_resource_stats / _invalidate_progress_stats).
+# Joining or leaving a group also changes what a user can see; that case
+# is only covered by the TTL.
+STATS_CACHE_TTL_SECONDS = 120
+_stats_cache = TTLCache(ttl_seconds=STATS_CACHE_TTL_SECONDS)
 
 # ============================================================================
 # PERMISSION CHECKS - The Foundation
@@ -101,7 +112,8 @@ async def create_resource(
         group_id: Optional[int] = None,
         description: Optional[str] = None,
         parent_folder_id: Optional[int] = None,
-        file_size: Optional[int] = None
+        file_size: Optional[int] = None,
+        blob_id: Optional[int] = None
 ) -> Resources:
     # Create a new resource (personal or group)
     resource = Resources(
@@ -113,6 +125,7 @@ async def create_resource(
         description=description,
         parent_folder_id=parent_folder_id,
         file_size=file_size,
+        blob_id=blob_id,
         is_deleted=False  # Explicit: not deleted
     )
     if (group_id != None):
@@ -134,6 +147,7 @@ async def create_resource(
     session.add(resource)
    
     await session.flush() # Flush to get the autogenerated ID 
+    await _invalidate_resource_stats(session, user_id, [group_id])
     return resource
 
 # ============================================================================
@@ -240,6 +254,11 @@ async def update_resource(
 
     if not resource:
         return None
+
+    # Reparenting: the target must be a folder in the same library and not
+    # inside this resource's own subtree (raises ValueError)
+    if parent_folder_id is not None and parent_folder_id != resource.parent_folder_id:
+        await resource_tree_service.validate_new_parent(session, resource, parent_folder_id)
     
     # Update fields if provided
     if title is not None:
@@ -276,9 +295,10 @@ async def delete_resource(
     if not resource:
         return False
     
-    #soft delete
-    resource.is_deleted = True
+    #soft delete - a folder takes its whole subtree to the trash, one UPDATE
+    await resource_tree_service.cascade_update(session, resource_id, is_deleted=True)
     await session.flush()
+    await _invalidate_resource_stats(session, resource.uploaded_by, [resource.group_id])
     return True
 
 '''Part 3: Sharing and Advanced Features
@@ -307,8 +327,12 @@ async def share_resource_to_group(
     if resource.group_id is not None:
         return None
     
-    resource.group_id = group_id
+    # Folders are shared with everything inside them
+    await resource_tree_service.cascade_update(
+        session, resource_id, detach_root=True, group_id=group_id
+    )
     await session.flush()
+    await _invalidate_resource_stats(session, resource.uploaded_by, [group_id])
     return resource
 
 async def make_resource_personal(
@@ -321,9 +345,13 @@ async def make_resource_personal(
     if not resource:
         return None
      
-    #make it personal
-    resource.group_id = None
+    #make it personal (with the folder's contents, if it is one)
+    old_group_id = resource.group_id
+    await resource_tree_service.cascade_update(
+        session, resource_id, detach_root=True, group_id=None
+    )
     await session.flush()
+    await _invalidate_resource_stats(session, resource.uploaded_by, [old_group_id])
     return resource
 
 async def move_resource_to_group(
@@ -337,9 +365,15 @@ async def move_resource_to_group(
     if not resource:
         return None
     
-    # move to target group
-    resource.group_id = target_group_id
+    # move to target group (with the folder's contents, if it is one)
+    old_group_id = resource.group_id
+    await resource_tree_service.cascade_update(
+        session, resource_id, detach_root=True, group_id=target_group_id
+    )
     await session.flush()
+    await _invalidate_resource_stats(
+        session, resource.uploaded_by, [old_group_id, target_group_id]
+    )
     return resource
 
 # ============================================================================
@@ -400,6 +434,79 @@ async def get_all_user_resources(
     
     return list(resources), total
 
+async def list_resources_with_progress(
+        session: AsyncSession,
+        user_id: str,
+        group_id: Optional[int] = None,
+        status: Optional[ResourceStatus] = None,
+        resource_type: Optional[ResourceType] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+) -> Tuple[List[Tuple[Resources, Optional[ResourceProgress]]], Optional[str]]:
+    '''Library cards: a page of resources with the caller's progress, one query
+    - group_id given: that group's resources (caller checks membership)
+    - otherwise: everything the user can see (personal + their groups)
+    - status NOT_STARTED also matches resources with no progress row yet
+    Returns ([(resource, progress or None)], next_cursor).'''
+
+    await _flush_pending_progress(user_id)
+
+    query = (
+        select(Resources, ResourceProgress)
+        .outerjoin(
+            ResourceProgress,
+            and_(
+                ResourceProgress.resource_id == Resources.id,
+                ResourceProgress.user_id == user_id
+            )
+        )
+        .where(Resources.is_deleted == False)
+    )
+
+    if group_id is not None:
+        query = query.where(Resources.group_id == group_id)
+    else:
+        user_group_ids = select(Groupings.group_id).where(
+            and_(
+                Groupings.user_id == user_id,
+                Groupings.invitation_status == InvitationStatus.ACCEPTED
+            )
+        )
+        query = query.where(
+            or_(
+                and_(Resources.uploaded_by == user_id, Resources.group_id == None),
+                Resources.group_id.in_(user_group_ids)
+            )
+        )
+
+    if resource_type:
+        query = query.where(Resources.resource_type == resource_type)
+
+    if status == ResourceStatus.NOT_STARTED:
+        query = query.where(
+            or_(ResourceProgress.id == None, ResourceProgress.status == status)
+        )
+    elif status:
+        query = query.where(ResourceProgress.status == status)
+
+    if cursor:
+        query = query.where(
+            tuple_(Resources.created_at, Resources.id) < tuple_(*decode_cursor(cursor))
+        )
+
+    # One extra row tells us whether there is a next page, without a COUNT
+    query = query.order_by(Resources.created_at.desc(), Resources.id.desc()).limit(limit + 1)
+    result = await session.execute(query)
+    rows = [(resource, progress) for resource, progress in result.all()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return rows, next_cursor
+
 async def get_recent_resources(
         session: AsyncSession,
         user_id: str,
@@ -419,6 +526,32 @@ async def get_recent_resources(
 # STATISTICS - Useful for Dashboards
 # ============================================================================
 
+async def _invalidate_resource_stats(
+    session: AsyncSession,
+    user_id: str,
+    group_ids: Iterable[Optional[int]]
+) -> None:
+    """Drop cached resource stats for the uploader and every member of the touched groups"""
+    invalidate_after_commit(session, _stats_cache, ("resource_stats", user_id))
+
+    group_ids = {g for g in group_ids if g is not None}
+    if not group_ids:
+        return
+    result = await session.execute(
+        select(Groupings.user_id).where(
+            and_(
+                Groupings.group_id.in_(group_ids),
+                Groupings.invitation_status == InvitationStatus.ACCEPTED
+            )
+        )
+    )
+    for member_id in result.scalars().all():
+        invalidate_after_commit(session, _stats_cache, ("resource_stats", member_id))
+
+def _invalidate_progress_stats(user_id: str, session: Optional[AsyncSession] = None) -> None:
+    invalidate_after_commit(session, _stats_cache, ("progress_stats", user_id))
+    invalidate_user_context(user_id, session)
+
 async def get_user_resource_stats(
     session: AsyncSession,
     user_id: str
@@ -444,39 +577,63 @@ async def get_user_resource_stats(
             },
             "added_this_week": 5
         }
+
+    One aggregate query (COUNT ... FILTER per bucket), cached per user.
     """
     
-    from datetime import datetime, timedelta
-    
-    # Get all user's resources
-    all_resources, total = await get_all_user_resources(
-        session, user_id, skip=0, limit=10000  # Get all
-    )
-    
-    # Count personal vs group
-    personal_count = sum(1 for r in all_resources if r.group_id is None)
-    group_count = sum(1 for r in all_resources if r.group_id is not None)
+    cached = _stats_cache.get(("resource_stats", user_id))
+    if cached is not None:
+        return cached
     
-    # Count by type
-    by_type = {}
-    for resource in all_resources:
-        type_name = resource.resource_type.value
-        by_type[type_name] = by_type.get(type_name, 0) + 1
-    
-    # Count recent (last 7 days)
     week_ago = datetime.utcnow() - timedelta(days=7)
-    added_this_week = sum(
-        1 for r in all_resources 
-        if r.created_at >= week_ago
+    user_group_ids = select(Groupings.group_id).where(
+        and_(
+            Groupings.user_id == user_id,
+            Groupings.invitation_status == InvitationStatus.ACCEPTED
+        )
     )
     
-    return {
-        "personal_count": personal_count,
-        "group_count": group_count,
-        "total_count": total,
-        "by_type": by_type,
-        "added_this_week": added_this_week
+    type_counts = [
+        func.count().filter(Resources.resource_type == resource_type).label(resource_type.value)
+        for resource_type in ResourceType
+    ]
+    result = await session.execute(
+        select(
+            func.count().label("total_count"),
+            func.count().filter(Resources.group_id == None).label("personal_count"),
+            func.count().filter(Resources.group_id != None).label("group_count"),
+            func.count().filter(Resources.created_at >= week_ago).label("added_this_week"),
+            *type_counts
+        ).where(
+            and_(
+                or_(
+                    # Personal resources (user's own)
+                    and_(
+                        Resources.uploaded_by == user_id,
+                        Resources.group_id == None
+                    ),
+                    # Group resources (from user's groups)
+                    Resources.group_id.in_(user_group_ids)
+                ),
+                Resources.is_deleted == False
+            )
+        )
+    )
+    row = result.mappings().one()
+    
+    stats = {
+        "personal_count": row["personal_count"],
+        "group_count": row["group_count"],
+        "total_count": row["total_count"],
+        "by_type": {
+            resource_type.value: row[resource_type.value]
+            for resource_type in ResourceType
+            if row[resource_type.value]
+        },
+        "added_this_week": row["added_this_week"]
     }
+    _stats_cache.set(("resource_stats", user_id), stats)
+    return stats
 
 """
 Resource Service Layer - Part 4: Progress Tracking (Pillar 2)
@@ -567,6 +724,7 @@ async def update_resource_progress_by_page(
             progress.completed_at = now
     
     await session.flush()
+    _invalidate_progress_stats(user_id, session)
     return progress
 
 
@@ -602,6 +760,12 @@ async def get_resource_progress(
     )
     return result.scalars().first()
 
+async def _flush_pending_progress(user_id: str) -> None:
+    '''Write the user's buffered page turns before a listing that filters and
+    sorts by progress in SQL, which a per-row overlay can't fix up'''
+    from .progress_ingest_service import progress_ingestor
+    await progress_ingestor.flush(user_id=user_id)
+
 async def get_all_user_progress(
         session: AsyncSession,
         user_id:str,
@@ -612,6 +776,8 @@ async def get_all_user_progress(
     - Dashboard: "5 resources in progress"
     - Achievements: "23 resources completed!"
     - Resume page: "Continue studying these"'''
+    await _flush_pending_progress(user_id)
+
     query = select(ResourceProgress).where(
         ResourceProgress.user_id == user_id
     )
@@ -631,6 +797,8 @@ async def delete_resource_progress(
     resource_id: int
 ) -> bool:
     #delste/reset user's progress on a resource
+    from .progress_ingest_service import progress_ingestor
+    progress_ingestor.discard(user_id, resource_id)
 
     result= await session.execute(
         select(ResourceProgress).where(
@@ -647,6 +815,7 @@ async def delete_resource_progress(
     
     await session.delete(progress)
     await session.flush()
+    _invalidate_progress_stats(user_id, session)
 
     return True
 
@@ -725,31 +894,33 @@ async def get_user_progress_stats(
         "🎯 53% completion rate"
     """
     
-    all_progress = await get_all_user_progress(session, user_id)
-    
-    # Count by status
-    by_status = {
-        "not_started": 0,
-        "in_progress": 0,
-        "completed": 0,
-        "paused": 0
-    }
+    cached = _stats_cache.get(("progress_stats", user_id))
+    if cached is not None:
+        return cached
     
-    for progress in all_progress:
-        status_name = progress.status.value
-        by_status[status_name] = by_status.get(status_name, 0) + 1
+    # One pass over the user's progress rows, one COUNT ... FILTER per status
+    result = await session.execute(
+        select(
+            func.count().label("total_tracked"),
+            *[
+                func.count().filter(ResourceProgress.status == status).label(status.value)
+                for status in ResourceStatus
+            ]
+        ).where(ResourceProgress.user_id == user_id)
+    )
+    row = result.mappings().one()
     
-    total = len(all_progress)
-    completed = by_status["completed"]
+    total = row["total_tracked"]
+    completed = row["completed"]
     completion_rate = (completed / total * 100) if total > 0 else 0
     
-    return {
-        "not_started": by_status["not_started"],
-        "in_progress": by_status["in_progress"],
-        "completed": by_status["completed"],
-        "paused": by_status["paused"],
+    stats = {
+        "not_started": row["not_started"],
+        "in_progress": row["in_progress"],
+        "completed": row["completed"],
+        "paused": row["paused"],
         "total_tracked": total,
         "completion_rate": round(completion_rate, 1)
     }
-
-
+    _stats_cache.set(("progress_stats", user_id), stats)
+    return stats
@@ -0,0 +1,185 @@
+"""
+Global search across documents, community posts, resources and groups.
+
+Backed by the `search_vector` generated columns + GIN indexes declared in
+models.py, so matching is an index lookup instead of ILIKE '%q%' scans.
+Visibility rules are applied inside each branch of the query (same rules
+as the per-entity permission checks), never filtered in Python afterwards.
+"""
+
+import html
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, or_, func, literal, union_all, exists
+
+from ..database.models import (
+    Document, DocumentCollaborator, Posts, Resources, Groups, Groupings,
+    GroupVisibility, InvitationStatus,
+)
+
+ENTITY_TYPES = ("document", "post", "resource", "group")
+
+# ts_headline marks matches with control characters, not <mark>: the
+# snippet text is user content (post bodies, document HTML), so it is
+# escaped first and only then are the markers turned into <mark> tags
+# (see _render_snippet)
+_START_SEL = "\x02"
+_STOP_SEL = "\x03"
+HEADLINE_OPTIONS = (
+    f'StartSel="{_START_SEL}", StopSel="{_STOP_SEL}", '
+    "MaxWords=25, MinWords=10, MaxFragments=2"
+)
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def to_tsquery(search: str):
+    """websearch syntax: plain words, "quoted phrases", -exclusions, OR"""
+    return func.websearch_to_tsquery("english", search)
+
+
+def matches(model, search: str):
+    """WHERE clause for `model.search_vector @@ query` — usable in any listing query."""
+    return model.search_vector.op("@@")(to_tsquery(search))
+
+
+def _plain_text(body):
+    """Tags stripped (document bodies are HTML) and stray marker characters removed, in SQL"""
+    without_tags = func.regexp_replace(body, "<[^>]*>", " ", "g")
+    return func.translate(without_tags, _START_SEL + _STOP_SEL, "")
+
+
+def _render_snippet(snippet: Optional[str]) -> Optional[str]:
+    """
+    HTML-safe snippet: everything from the source text is escaped, and
+    the only markup left is the <mark> around each match.
+    """
+    if snippet is None:
+        return None
+    # unescape first so entities from document HTML (&nbsp;, &amp;) read as text
+    escaped = html.escape(html.unescape(snippet))
+    return escaped.replace(_START_SEL, "<mark>").replace(_STOP_SEL, "</mark>")
+
+
+def _user_group_ids(user_id: str):
+    return (
+        select(Groupings.group_id)
+        .where(
+            and_(
+                Groupings.user_id == user_id,
+                Groupings.invitation_status == InvitationStatus.ACCEPTED,
+            )
+        )
+    )
+
+
+def _branch(entity_type: str, model, title_col, body_col, tsquery, visible, created_col):
+    return select(
+        literal(entity_type).label("entity_type"),
+        model.id.label("id"),
+        title_col.label("title"),
+        func.coalesce(body_col, "").label("body"),
+        func.ts_rank_cd(model.search_vector, tsquery).label("rank"),
+        created_col.label("created_at"),
+    ).where(and_(model.search_vector.op("@@")(tsquery), visible))
+
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+
+async def search_all(
+    session: AsyncSession,
+    user_id: str,
+    search: str,
+    entity_types: Optional[List[str]] = None,
+    limit: int = 20,
+) -> List[dict]:
+    """
+    Ranked search across every entity type the user can see.
+    Returns dicts of {entity_type, id, title, snippet, rank, created_at}.
+    """
+    wanted = set(entity_types or ENTITY_TYPES)
+    tsquery = to_tsquery(search)
+    my_groups = _user_group_ids(user_id)
+
+    branches = []
+
+    if "document" in wanted:
+        is_collaborator = exists().where(
+            and_(
+                DocumentCollaborator.document_id == Document.id,
+                DocumentCollaborator.user_id == user_id,
+            )
+        )
+        branches.append(_branch(
+            "document", Document, Document.title, Document.content, tsquery,
+            and_(
+                Document.is_deleted == False,
+                or_(Document.owner_id == user_id, is_collaborator),
+            ),
+            Document.created_at,
+        ))
+
+    if "post" in wanted:
+        branches.append(_branch(
+            "post", Posts, Posts.title, Posts.text, tsquery,
+            and_(
+                Posts.is_deleted == False,
+                or_(Posts.group_id == None, Posts.group_id.in_(my_groups)),
+            ),
+            Posts.created_at,
+        ))
+
+    if "resource" in wanted:
+        branches.append(_branch(
+            "resource", Resources, Resources.title, Resources.description, tsquery,
+            and_(
+                Resources.is_deleted == False,
+                or_(
+                    and_(Resources.uploaded_by == user_id, Resources.group_id == None),
+                    Resources.group_id.in_(my_groups),
+                ),
+            ),
+            Resources.created_at,
+        ))
+
+    if "group" in wanted:
+        branches.append(_branch(
+            "group", Groups, Groups.group_name, Groups.description, tsquery,
+            and_(
+                Groups.is_active == True,
+                or_(Groups.visibility == GroupVisibility.PUBLIC, Groups.id.in_(my_groups)),
+            ),
+            Groups.created_at,
+        ))
+
+    if not branches:
+        return []
+
+    # Rank + limit first, then build snippets: ts_headline is the expensive
+    # part, so it only runs for the rows actually returned.
+    combined = union_all(*branches).subquery()
+    top = (
+        select(combined)
+        .order_by(combined.c.rank.desc(), combined.c.created_at.desc())
+        .limit(limit)
+        .subquery()
+    )
+    query = select(
+        top.c.entity_type,
+        top.c.id,
+        top.c.title,
+        func.ts_headline("english", _plain_text(top.c.body), tsquery, HEADLINE_OPTIONS).label("snippet"),
+        top.c.rank,
+        top.c.created_at,
+    ).order_by(top.c.rank.desc(), top.c.created_at.desc())
+
+    result = await session.execute(query)
+    return [
+        {**row, "snippet": _render_snippet(row["snippet"])}
+        for row in result.mappings().all()
+    ]
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, extract
 
 from ..database.models import Streaks, Users, StudySessions
+from .chatbot_context_service import invalidate_user_context
 
 
 # =============================================================================
@@ -111,6 +112,7 @@ async def get_user_streak(
         streak.streak_start_date = None
         await session.flush()
         await session.commit()
+        invalidate_user_context(user_id)  # already committed
 
     return {
         "user_id": user_id,
@@ -149,6 +151,7 @@ async def update_streak_after_session(
         streak.last_active_date = session_date
         streak.streak_start_date = session_date
         await session.flush()
+        invalidate_user_context(user_id, session)
         return streak
 
     # Same day → no change
@@ -170,6 +173,7 @@ async def update_streak_after_session(
         streak.streak_start_date = session_date
 
     await session.flush()
+    invalidate_user_context(user_id, session)
     return streak
 
 
@@ -198,6 +202,7 @@ async def check_and_update_streak(
         streak.current_streak = 0
         streak.streak_start_date = None
         await session.flush()
+        invalidate_user_context(user_id, session)
 
     return streak
 
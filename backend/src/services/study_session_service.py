@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func, desc, extract
 from sqlalchemy.orm import selectinload
 from ..database.models import StudySessions, Users, Groups, Streaks
+from .chatbot_context_service import invalidate_user_context
 from typing import Optional, List, Tuple
 from datetime import datetime, timedelta, date
 from collections import defaultdict
@@ -57,6 +58,7 @@ async def create_study_session(
     from .streak_service import update_streak_after_session
     await update_streak_after_session(session, user_id, started_at.date())
     
+    invalidate_user_context(user_id, session)
     return new_session
 
 async def get_session_by_id(
@@ -160,6 +162,7 @@ async def delete_session(
     
     await session.delete(study_session)
     await session.flush()
+    invalidate_user_context(user_id, session)
     
     return True
 
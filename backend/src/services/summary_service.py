@@ -0,0 +1,508 @@
+"""
+PDF summaries as background jobs, cached per content.
+
+    POST /resources/{id}/summaries      -> enqueue, returns a job id
+    GET  /resources/summaries/jobs/{id} -> poll status / result
+
+A fixed set of SUMMARY_WORKERS asyncio workers drains the job queue, so at
+most that many jobs run no matter how many users click "Summarize". Model
+calls go through llm_gateway (async, shared client, Gemini rate limits),
+so a slow model never blocks the event loop.
+
+Results are stored in ResourceSummaries keyed by (resource, content hash,
+SUMMARY_PROMPT_VERSION): asking again for an unchanged file is a lookup,
+and bumping the prompt version invalidates every cached summary at once.
+Concurrent requests for the same resource join the job already running.
+
+Documents longer than SUMMARY_CHUNK_TOKENS are summarized map-reduce:
+    map     split the pages into token-bounded chunks and summarize them
+            concurrently (at most SUMMARY_CHUNK_CONCURRENCY model calls at
+            once, across all jobs)
+    reduce  combine the chunk summaries SUMMARY_REDUCE_FANIN at a time,
+            level by level, until one summary is left
+Every map and reduce output is cached in SummaryChunks under a hash of its
+prompt. Chunk boundaries are chosen from the page text itself (see
+chunk_pages), so editing one part of a PDF changes only the chunks around
+the edit and the rest of the pipeline is served from the cache.
+
+The backend is chosen with SUMMARY_LLM_BACKEND:
+    gemini (default)  Google Gemini
+    fake              deterministic, offline; FAKE_LLM_LATENCY_SECONDS
+                      simulates model latency for tests and benchmarks
+
+Job state lives in this process (like the other in-memory managers) and
+expires after SUMMARY_JOB_TTL_SECONDS; summaries themselves are in the
+database.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..database.database import async_session_local
+from ..database.models import Resources, ResourceSummaries, SummaryChunks
+from .cache_service import TTLCache
+from . import pdf_extraction_service
+from .llm_gateway import llm_gateway, LLMError
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_LLM_BACKEND = os.getenv("SUMMARY_LLM_BACKEND", "gemini")
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+SUMMARY_JOB_TTL_SECONDS = 3600
+SUMMARY_MODEL = "gemini-flash-latest"
+
+# Bump whenever the prompts (or how text is fed to them) change
+SUMMARY_PROMPT_VERSION = "v2"
+
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "4000"))
+SUMMARY_CHUNK_CONCURRENCY = int(os.getenv("SUMMARY_CHUNK_CONCURRENCY", "4"))
+SUMMARY_REDUCE_FANIN = 8
+# Rough token estimate; good enough for sizing chunks without a tokenizer
+CHARS_PER_TOKEN = 4
+# On average a chunk may end every this many pages (content-defined cut points)
+CHUNK_BOUNDARY_PAGES = 4
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class SummaryError(Exception):
+    pass
+
+
+# ============================================================================
+# LLM BACKENDS
+# ============================================================================
+
+class GeminiBackend:
+    """Google Gemini through llm_gateway (shared client, rate limits, retries)."""
+    name = SUMMARY_MODEL
+
+    async def generate(self, prompt: str) -> str:
+        try:
+            text, _ = await llm_gateway.generate(model=SUMMARY_MODEL, prompt=prompt)
+        except LLMError as e:
+            raise SummaryError(str(e)) from e
+        return text
+
+
+class FakeLLMBackend:
+    """Offline stand-in: same prompt in, same summary out."""
+    name = "fake"
+
+    def __init__(self, latency_seconds: float = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0"))):
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+        return f"Fake summary {digest} of a {len(prompt)}-character prompt."
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = FakeLLMBackend() if SUMMARY_LLM_BACKEND == "fake" else GeminiBackend()
+    return _backend
+
+
+def set_backend(backend) -> None:
+    """Swap the LLM backend (tests, benchmarks)."""
+    global _backend
+    _backend = backend
+
+
+def build_prompt(title: str, text: str) -> str:
+    return f"""Please provide a concise summary of this PDF content.
+
+Summary should be:
+- 2-3 paragraphs
+- Clear and accessible
+- Include main points and key findings
+- Include important conclusions
+
+PDF Title: {title}
+
+Content:
+{text}
+
+Summary:"""
+
+
+def build_chunk_prompt(text: str) -> str:
+    # No title or page numbers: the prompt (and so its cache key) depends
+    # only on the chunk's own text
+    return f"""Summarize this section of a longer document.
+
+Keep the main points, key findings, definitions and conclusions. Be
+concise; the summary will be combined with those of the other sections.
+
+Section:
+{text}
+
+Section summary:"""
+
+
+def build_reduce_prompt(summaries: List[str], title: Optional[str] = None) -> str:
+    """Combine section summaries; with a title, this is the final summary."""
+    sections = "\n\n".join(f"--- Part {n} ---\n{summary}" for n, summary in enumerate(summaries, 1))
+    if title is None:
+        return f"""These are summaries of consecutive sections of a document.
+Merge them into one concise summary that keeps the main points, key
+findings and conclusions in order.
+
+{sections}
+
+Combined summary:"""
+    return build_prompt(title, f"(summaries of consecutive parts of the document)\n\n{sections}")
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+async def get_cached_summary(
+    session: AsyncSession,
+    resource_id: int,
+    content_hash: str,
+) -> Optional[ResourceSummaries]:
+    result = await session.execute(
+        select(ResourceSummaries).where(
+            and_(
+                ResourceSummaries.resource_id == resource_id,
+                ResourceSummaries.content_hash == content_hash,
+                ResourceSummaries.prompt_version == SUMMARY_PROMPT_VERSION,
+            )
+        )
+    )
+    return result.scalars().first()
+
+
+# ============================================================================
+# MAP-REDUCE
+# ============================================================================
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _split_text(text: str, max_chars: int) -> List[str]:
+    """Break text longer than max_chars at whitespace."""
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        if cut <= max_chars // 2:
+            cut = max_chars
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def _is_cut_point(piece: str) -> bool:
+    digest = hashlib.sha256(piece.encode()).digest()
+    return int.from_bytes(digest[:4], "big") % CHUNK_BOUNDARY_PAGES == 0
+
+
+def chunk_pages(pages: List[str], max_tokens: int = SUMMARY_CHUNK_TOKENS) -> List[str]:
+    """
+    Pack page texts into chunks of at most max_tokens.
+
+    A chunk ends when the next page wouldn't fit, or after a page whose
+    text hashes to a cut point. Cut points depend only on the page itself,
+    so inserting or editing a page moves the boundaries of its own chunk
+    and not of every chunk after it (as fixed N-page chunks would).
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    for page in pages:
+        if page and page.strip():
+            pieces.extend(_split_text(page.strip(), max_chars))
+
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        if current and size + len(piece) > max_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 2
+        # Ignore cut points in a chunk that is still small, to bound the call count
+        if size >= max_chars // 4 and _is_cut_point(piece):
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _group_for_reduce(summaries: List[str], max_tokens: int = SUMMARY_CHUNK_TOKENS) -> List[List[str]]:
+    """Consecutive groups of up to SUMMARY_REDUCE_FANIN summaries that fit in one prompt"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    groups, current, size = [], [], 0
+    for summary in summaries:
+        # Always pair at least two, so every level shrinks
+        if len(current) >= 2 and (len(current) >= SUMMARY_REDUCE_FANIN or size + len(summary) > max_chars):
+            groups.append(current)
+            current, size = [], 0
+        current.append(summary)
+        size += len(summary)
+    if current:
+        groups.append(current)
+    return groups
+
+
+_chunk_semaphore = asyncio.Semaphore(SUMMARY_CHUNK_CONCURRENCY)
+
+
+def _chunk_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{SUMMARY_PROMPT_VERSION}\0{model}\0{prompt}".encode()).hexdigest()
+
+
+async def _store_chunks(model: str, generated: dict) -> None:
+    """
+    Cache chunk summaries in their own transaction, committed right away:
+    they stay cached even if the job's transaction is rolled back (e.g.
+    because another chunk failed), so a retry only regenerates what's missing.
+    """
+    try:
+        async with async_session_local() as cache_session:
+            await cache_session.execute(
+                pg_insert(SummaryChunks)
+                .values([
+                    {"chunk_hash": key, "model": model, "summary": summary}
+                    for key, summary in generated.items()
+                ])
+                .on_conflict_do_nothing(index_elements=[SummaryChunks.chunk_hash])
+            )
+            await cache_session.commit()
+    except Exception as e:
+        # Only a cache: the summaries themselves are still returned
+        logger.warning("Caching %d chunk summaries failed: %s", len(generated), e)
+
+
+async def _generate_cached(session: AsyncSession, prompts: List[str]) -> List[str]:
+    """
+    Run prompts through the backend, concurrently and bounded by
+    _chunk_semaphore, reading and filling the SummaryChunks cache.
+    """
+    backend = get_backend()
+    keys = [_chunk_key(backend.name, prompt) for prompt in prompts]
+
+    result = await session.execute(
+        select(SummaryChunks.chunk_hash, SummaryChunks.summary)
+        .where(SummaryChunks.chunk_hash.in_(set(keys)))
+    )
+    known = dict(result.all())
+    missing = {key: prompt for key, prompt in zip(keys, prompts) if key not in known}
+
+    async def _generate(prompt: str) -> str:
+        async with _chunk_semaphore:
+            return await backend.generate(prompt)
+
+    # return_exceptions: keep (and cache) what succeeded even if one call fails
+    outputs = await asyncio.gather(*(_generate(p) for p in missing.values()), return_exceptions=True)
+    generated = {
+        key: output for key, output in zip(missing, outputs)
+        if not isinstance(output, BaseException)
+    }
+    if generated:
+        await _store_chunks(backend.name, generated)
+    for output in outputs:
+        if isinstance(output, BaseException):
+            raise output
+
+    known.update(generated)
+    return [known[key] for key in keys]
+
+
+async def summarize_pages(session: AsyncSession, title: str, pages: List[str]) -> Tuple[str, str]:
+    """(summary, model) of a document's page texts. Raises SummaryError."""
+    text = pdf_extraction_service.format_pages(pages)
+    if not text.strip():
+        raise SummaryError("Could not extract text from PDF")
+
+    if estimate_tokens(text) <= SUMMARY_CHUNK_TOKENS:
+        summaries = await _generate_cached(session, [build_prompt(title, text)])
+        return summaries[0], get_backend().name
+
+    summaries = await _generate_cached(
+        session, [build_chunk_prompt(chunk) for chunk in chunk_pages(pages)]
+    )
+    while True:
+        groups = _group_for_reduce(summaries)
+        final = len(groups) == 1
+        summaries = await _generate_cached(
+            session, [build_reduce_prompt(group, title if final else None) for group in groups]
+        )
+        if final:
+            return summaries[0], get_backend().name
+
+
+async def summarize_resource(session: AsyncSession, resource: Resources) -> ResourceSummaries:
+    """Cached summary of a PDF resource, generating it if needed. Raises SummaryError / ExtractionError."""
+    extraction = await pdf_extraction_service.get_extraction(session, resource)
+
+    cached = await get_cached_summary(session, resource.id, extraction.content_hash)
+    if cached is not None:
+        return cached
+
+    summary, model = await summarize_pages(
+        session, resource.title, pdf_extraction_service.extraction_pages(extraction)
+    )
+
+    result = await session.execute(
+        pg_insert(ResourceSummaries)
+        .values(
+            resource_id=resource.id,
+            content_hash=extraction.content_hash,
+            prompt_version=SUMMARY_PROMPT_VERSION,
+            model=model,
+            summary=summary,
+        )
+        .on_conflict_do_update(
+            constraint="uq_resource_summaries_key",
+            set_={"summary": summary, "model": model},
+        )
+        .returning(ResourceSummaries)
+    )
+    return result.scalars().one()
+
+
+# ============================================================================
+# JOBS
+# ============================================================================
+
+@dataclass
+class SummaryJob:
+    resource_id: int
+    # Everyone who asked for it (concurrent requests share one job)
+    user_ids: set
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = JOB_QUEUED
+    summary: Optional[str] = None
+    model: Optional[str] = None
+    error: Optional[str] = None
+    cached: bool = False
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class SummaryJobQueue:
+    def __init__(self, workers: int = SUMMARY_WORKERS):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: list = []
+        self._jobs = TTLCache(ttl_seconds=SUMMARY_JOB_TTL_SECONDS)
+        # resource_id -> job still queued/running for it
+        self._active: dict = {}
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._worker_tasks = [t for t in self._worker_tasks if not t.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+
+    def enqueue(self, resource_id: int, user_id: str) -> SummaryJob:
+        """Queue a summary, or join the one already pending for this resource."""
+        active = self._active.get(resource_id)
+        if active is not None and not active.is_finished:
+            active.user_ids.add(user_id)
+            return active
+
+        job = SummaryJob(resource_id=resource_id, user_ids={user_id})
+        self._jobs.set((job.id,), job)
+        self._active[resource_id] = job
+        self._ensure_workers()
+        self._queue.put_nowait(job)
+        return job
+
+    def complete_from_cache(self, resource_id: int, user_id: str, cached: ResourceSummaries) -> SummaryJob:
+        """A job that is already done (cache hit at enqueue time)."""
+        job = SummaryJob(resource_id=resource_id, user_ids={user_id})
+        self._finish(job, summary=cached.summary, model=cached.model, cached=True)
+        self._jobs.set((job.id,), job)
+        return job
+
+    def get(self, job_id: str) -> Optional[SummaryJob]:
+        return self._jobs.get((job_id,))
+
+    def _finish(self, job: SummaryJob, **fields) -> None:
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.status = JOB_FAILED if job.error else JOB_SUCCEEDED
+        job.finished_at = datetime.utcnow()
+        job.done.set()
+        if self._active.get(job.resource_id) is job:
+            del self._active[job.resource_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                job.status = JOB_RUNNING
+                await self._run(job)
+            except Exception as e:
+                logger.warning("Summary job %s failed: %s", job.id, e)
+                self._finish(job, error=str(e) or type(e).__name__)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: SummaryJob) -> None:
+        async with async_session_local() as session:
+            resource = await session.get(Resources, job.resource_id)
+            if resource is None or resource.is_deleted:
+                raise SummaryError("Resource not found")
+            record = await summarize_resource(session, resource)
+            summary, model = record.summary, record.model
+            await session.commit()
+        self._finish(job, summary=summary, model=model)
+
+    async def wait(self, job: SummaryJob, timeout: float) -> SummaryJob:
+        await asyncio.wait_for(job.done.wait(), timeout)
+        return job
+
+    async def shutdown(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        self._worker_tasks = []
+
+
+summary_jobs = SummaryJobQueue()
+
+
+async def request_summary(session: AsyncSession, resource: Resources, user_id: str) -> SummaryJob:
+    """
+    Entry point for routes: returns a finished job straight away when the
+    summary is cached for the resource's current bytes, else a queued one.
+    """
+    content_hash = await pdf_extraction_service.known_content_hash(session, resource)
+    if content_hash is not None:
+        cached = await get_cached_summary(session, resource.id, content_hash)
+        if cached is not None:
+            return summary_jobs.complete_from_cache(resource.id, user_id, cached)
+    return summary_jobs.enqueue(resource.id, user_id)
@@ -0,0 +1,229 @@
+"""
+Personalized home timeline: "posts from my groups and my friends".
+
+Write path (fan-out-on-write): create_post pushes the new post into the
+TimelineEntries of everyone who should see it with one INSERT ... SELECT:
+    - group post  -> every accepted member of the group
+    - public post -> the author's friends
+    - always      -> the author
+Groups bigger than FANOUT_MAX_GROUP_SIZE are skipped on write (one post
+would mean thousands of rows) and merged in at read time instead
+(fan-out-on-read).
+
+Membership changes keep timelines in step with Groupings: joining a group
+backfills its newest TIMELINE_BACKFILL_POSTS posts, and leaving (or being
+removed) deletes that group's entries, except the user's own posts.
+
+Read path: a keyset scan of the caller's own timeline rows, plus the same
+keyset scan over posts of their large groups, merged by (created_at, id).
+The page is then reordered by an engagement score (likes, comments,
+saves, decayed by age). Ranking happens inside a page, so cursors stay
+purely chronological and never skip or repeat a post.
+"""
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, literal, union, delete, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..database.models import (
+    Posts, TimelineEntries, Groups, Groupings, Friends, InvitationStatus,
+)
+from .group_service import get_group_member_count
+
+FANOUT_MAX_GROUP_SIZE = 1000
+TIMELINE_MAX_ENTRIES = 800
+TIMELINE_BACKFILL_POSTS = 50
+
+# Engagement weights for the ranking stage
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+SAVE_WEIGHT = 1.5
+# Hacker-News-style gravity: higher = older posts sink faster
+AGE_GRAVITY = 1.5
+
+
+# ============================================================================
+# WRITE PATH
+# ============================================================================
+
+async def fan_out_post(
+    session: AsyncSession,
+    post_id: int,
+    author_id: str,
+    group_id: Optional[int],
+) -> None:
+    """Push a freshly flushed post into its readers' timelines (single INSERT)."""
+    post_created_at = select(Posts.created_at).where(Posts.id == post_id).scalar_subquery()
+
+    def rows_for(user_id_col):
+        return select(
+            user_id_col.label("user_id"),
+            literal(post_id).label("post_id"),
+            post_created_at.label("created_at"),
+        )
+
+    # The author always sees their own post
+    recipients = [rows_for(literal(author_id))]
+
+    if group_id is not None:
+        if await get_group_member_count(session, group_id) <= FANOUT_MAX_GROUP_SIZE:
+            recipients.append(
+                rows_for(Groupings.user_id).where(
+                    and_(
+                        Groupings.group_id == group_id,
+                        Groupings.invitation_status == InvitationStatus.ACCEPTED,
+                    )
+                )
+            )
+    else:
+        recipients.append(rows_for(Friends.friend_id).where(Friends.user_id == author_id))
+
+    # UNION (not UNION ALL) drops the author's duplicate row when they're a member
+    stmt = (
+        pg_insert(TimelineEntries)
+        .from_select(["user_id", "post_id", "created_at"], union(*recipients))
+        .on_conflict_do_nothing()
+    )
+    await session.execute(stmt)
+
+
+async def trim_timeline(session: AsyncSession, user_id: str) -> None:
+    """Keep only the newest TIMELINE_MAX_ENTRIES rows for one user (single DELETE)."""
+    overflow = (
+        select(TimelineEntries.post_id)
+        .where(TimelineEntries.user_id == user_id)
+        .order_by(TimelineEntries.created_at.desc(), TimelineEntries.post_id.desc())
+        .offset(TIMELINE_MAX_ENTRIES)
+    )
+    await session.execute(
+        delete(TimelineEntries).where(
+            and_(
+                TimelineEntries.user_id == user_id,
+                TimelineEntries.post_id.in_(overflow),
+            )
+        )
+    )
+
+
+async def backfill_group_posts(session: AsyncSession, user_id: str, group_id: int) -> None:
+    """Push a group's newest posts into a new member's timeline (single INSERT)."""
+    recent = (
+        select(
+            literal(user_id).label("user_id"),
+            Posts.id.label("post_id"),
+            Posts.created_at.label("created_at"),
+        )
+        .where(and_(Posts.group_id == group_id, Posts.is_deleted == False))
+        .order_by(Posts.created_at.desc(), Posts.id.desc())
+        .limit(TIMELINE_BACKFILL_POSTS)
+    )
+    await session.execute(
+        pg_insert(TimelineEntries)
+        .from_select(["user_id", "post_id", "created_at"], recent)
+        .on_conflict_do_nothing()
+    )
+
+
+async def remove_group_posts(session: AsyncSession, user_id: str, group_id: int) -> None:
+    """Drop a group's posts from a former member's timeline (single DELETE)."""
+    group_posts = select(Posts.id).where(
+        and_(Posts.group_id == group_id, Posts.user_id != user_id)
+    )
+    await session.execute(
+        delete(TimelineEntries).where(
+            and_(
+                TimelineEntries.user_id == user_id,
+                TimelineEntries.post_id.in_(group_posts),
+            )
+        )
+    )
+
+
+# ============================================================================
+# READ PATH
+# ============================================================================
+
+def _large_group_ids(user_id: str):
+    """The caller's groups that were too big to fan out on write."""
+    return select(Groups.id).where(
+        and_(
+            Groups.id.in_(
+                select(Groupings.group_id).where(
+                    and_(
+                        Groupings.user_id == user_id,
+                        Groupings.invitation_status == InvitationStatus.ACCEPTED,
+                    )
+                )
+            ),
+            Groups.member_count > FANOUT_MAX_GROUP_SIZE,
+        )
+    )
+
+
+def engagement_score(post: Posts, now: Optional[datetime] = None) -> float:
+    now = now or datetime.utcnow()
+    age_hours = max((now - post.created_at).total_seconds() / 3600, 0)
+    engagement = (
+        LIKE_WEIGHT * post.like_count
+        + COMMENT_WEIGHT * post.comment_count
+        + SAVE_WEIGHT * post.save_count
+        + 1
+    )
+    return engagement / (age_hours + 2) ** AGE_GRAVITY
+
+
+async def get_timeline(
+    session: AsyncSession,
+    user_id: str,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    limit: int = 20,
+    ranked: bool = True,
+) -> Tuple[List[Posts], Optional[Tuple[datetime, int]]]:
+    """
+    Returns (posts, next_cursor) where next_cursor is the (created_at, id)
+    of the oldest post on this page, or None on the last page.
+    """
+    if cursor is None:
+        # Opportunistic trim: bounded timelines without a fan-out-time DELETE
+        await trim_timeline(session, user_id)
+
+    pushed = (
+        select(Posts)
+        .join(TimelineEntries, TimelineEntries.post_id == Posts.id)
+        .where(and_(TimelineEntries.user_id == user_id, Posts.is_deleted == False))
+    )
+    pulled = select(Posts).where(
+        and_(Posts.group_id.in_(_large_group_ids(user_id)), Posts.is_deleted == False)
+    )
+
+    if cursor is not None:
+        pushed = pushed.where(
+            tuple_(TimelineEntries.created_at, TimelineEntries.post_id) < tuple_(*cursor)
+        )
+        pulled = pulled.where(tuple_(Posts.created_at, Posts.id) < tuple_(*cursor))
+
+    pushed = pushed.order_by(
+        TimelineEntries.created_at.desc(), TimelineEntries.post_id.desc()
+    ).limit(limit + 1)
+    pulled = pulled.order_by(Posts.created_at.desc(), Posts.id.desc()).limit(limit + 1)
+
+    merged = {}
+    for query in (pushed, pulled):
+        result = await session.execute(query)
+        for post in result.scalars().all():
+            merged[post.id] = post
+
+    page = sorted(merged.values(), key=lambda p: (p.created_at, p.id), reverse=True)
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = (page[-1].created_at, page[-1].id)
+
+    if ranked:
+        now = datetime.utcnow()
+        page.sort(key=lambda p: engagement_score(p, now), reverse=True)
+
+    return page, next_cursor
@@ -1,12 +1,344 @@
 """
-Upload Service - Handle file uploads to Cloudinary
+Upload Service - Handle file uploads to object storage (Cloudinary or local)
 
 Location: backend/src/services/upload_service.py
 """
 
-import cloudinary.uploader
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
 from typing import Optional, BinaryIO
 from fastapi import UploadFile, File, Form, HTTPException
+from sqlalchemy import select, update, delete, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.database import async_session_local
+from ..database.models import DirectUploads
+from .object_store import (
+    CloudinaryObjectStore,
+    InvalidUploadToken,
+    StoredObject,
+    UploadTooLarge,
+    UPLOAD_MAX_SIZE_MB,
+    UPLOAD_TICKET_TTL_SECONDS,
+    detect_cloudinary_resource_type,
+    get_object_store,
+    hash_file,
+    sign_token,
+    verify_token,
+)
+
+# Time allowed between the ticket expiring and the client reporting completion
+UPLOAD_COMPLETE_LEEWAY_SECONDS = 300
+
+# Objects uploaded under tickets that were never completed are deleted once
+# the ticket can no longer be completed. Sweeps piggyback on new tickets,
+# at most once per interval per process.
+DIRECT_UPLOAD_SWEEP_INTERVAL_SECONDS = int(os.getenv("DIRECT_UPLOAD_SWEEP_INTERVAL_SECONDS", "600"))
+DIRECT_UPLOAD_SWEEP_BATCH = 100
+_last_sweep_at = 0.0
+_sweep_task: Optional[asyncio.Task] = None
+
+# ============================================================================
+# UPLOAD FUNCTIONS
+# ============================================================================
+
+async def store_upload(
+    file: UploadFile,
+    folder: str = "study-resources",
+    max_size_mb: int = UPLOAD_MAX_SIZE_MB
+) -> StoredObject:
+    """
+    Stream an uploaded file into the configured object store
+    
+    The transfer runs on the object store's thread pool, so the event loop
+    keeps serving other requests, and it is aborted as soon as it reads
+    past max_size_mb.
+    
+    Raises:
+        HTTPException: 413 if the file is too large, 500 if storage fails
+    """
+    
+    try:
+        return await get_object_store().put(
+            file.file,
+            filename=file.filename,
+            content_type=file.content_type or "application/octet-stream",
+            folder=folder,
+            max_bytes=max_size_mb * 1024 * 1024,
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"File upload failed: {str(e)}"
+        )
+
+
+async def hash_upload(
+    file: UploadFile,
+    max_size_mb: int = UPLOAD_MAX_SIZE_MB
+) -> str:
+    """
+    sha256 of an uploaded file, read in chunks off the event loop
+    
+    Raises:
+        HTTPException: 413 if the file is too large
+    """
+    
+    try:
+        return await hash_file(file.file, max_size_mb * 1024 * 1024)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+async def delete_stored_file(url: str) -> bool:
+    """Delete the object behind a resource URL, if the configured store owns it"""
+    
+    store = get_object_store()
+    key = store.key_for_url(url)
+    if key is None:
+        return False
+    
+    try:
+        return await store.delete(key, store.storage_for_url(url))
+    except Exception as e:
+        print(f"Failed to delete from storage: {str(e)}")
+        return False
+
+
+# ============================================================================
+# DIRECT (SIGNED) UPLOADS
+# ============================================================================
+
+async def create_direct_upload(
+    session: AsyncSession,
+    user_id: str,
+    filename: str,
+    content_type: str,
+    size: int,
+    max_size_mb: int = UPLOAD_MAX_SIZE_MB,
+    **resource_fields
+) -> dict:
+    """
+    Issue a short-lived ticket so the client uploads straight to storage
+    
+    resource_fields (group_id, parent_folder_id, description) ride along in
+    the signed upload_token and are applied when the upload completes. The
+    ticket is recorded in direct_uploads (flushed, not committed) so any
+    worker can complete it exactly once.
+    
+    Returns:
+        {
+            "upload_url": "...", "method": "POST" | "PUT",
+            "fields": {...},       # form fields to send with the file
+            "headers": {...},
+            "upload_token": "...", # send back to the completion endpoint
+            "expires_in": 900
+        }
+    
+    Raises:
+        HTTPException: 413 if the declared size is over the limit
+    """
+    
+    max_bytes = max_size_mb * 1024 * 1024
+    if size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size: {max_size_mb}MB"
+        )
+    
+    ticket = get_object_store().create_upload_ticket(filename, content_type, max_bytes)
+    upload_token = sign_token({
+        "user_id": user_id,
+        "key": ticket.key,
+        "filename": filename,
+        "content_type": content_type,
+        "max_bytes": max_bytes,
+        "storage": ticket.storage,
+        **resource_fields,
+    })
+    
+    session.add(DirectUploads(
+        storage_key=ticket.key,
+        user_id=user_id,
+        storage=json.dumps(ticket.storage),
+        expires_at=datetime.utcnow() + timedelta(seconds=UPLOAD_TICKET_TTL_SECONDS),
+    ))
+    await session.flush()
+    schedule_direct_upload_sweep()
+    
+    return {
+        "upload_url": ticket.upload_url,
+        "method": ticket.method,
+        "fields": ticket.fields,
+        "headers": ticket.headers,
+        "upload_token": upload_token,
+        "expires_in": UPLOAD_TICKET_TTL_SECONDS,
+    }
+
+
+def read_upload_token(upload_token: str, user_id: str) -> dict:
+    """
+    Claims of an upload_token from create_direct_upload
+    
+    Raises:
+        HTTPException: 400 if forged, expired or issued to someone else
+    """
+    
+    try:
+        claims = verify_token(upload_token, leeway_seconds=UPLOAD_COMPLETE_LEEWAY_SECONDS)
+    except InvalidUploadToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if claims["user_id"] != user_id:
+        raise HTTPException(status_code=400, detail="Invalid upload token")
+    return claims
+
+
+async def verify_direct_upload(claims: dict) -> StoredObject:
+    """
+    Check what the client actually uploaded for a ticket
+    
+    The object is deleted from storage when it fails verification.
+    
+    Raises:
+        HTTPException: 400 missing upload / wrong type, 413 too large
+    """
+    
+    store = get_object_store()
+    stored = await store.stat(claims["key"], claims["storage"])
+    if stored is None:
+        raise HTTPException(status_code=400, detail="Upload not found in storage")
+    
+    if stored.size > claims["max_bytes"]:
+        await store.delete(stored.key, claims["storage"])
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size: {claims['max_bytes'] // (1024 * 1024)}MB"
+        )
+    
+    if not uploaded_type_matches(claims["content_type"], stored.content_type):
+        await store.delete(stored.key, claims["storage"])
+        raise HTTPException(
+            status_code=400,
+            detail=f"Uploaded file is not a valid '{claims['content_type']}' file"
+        )
+    
+    return stored
+
+
+async def get_direct_upload(
+    session: AsyncSession,
+    user_id: str,
+    key: str
+) -> Optional[DirectUploads]:
+    """The user's ticket for this object, or None if unknown or already swept"""
+    
+    result = await session.execute(
+        select(DirectUploads).where(
+            and_(DirectUploads.storage_key == key, DirectUploads.user_id == user_id)
+        )
+    )
+    return result.scalars().first()
+
+
+async def mark_direct_upload_completed(
+    session: AsyncSession,
+    key: str,
+    resource_id: int
+) -> bool:
+    """
+    Record the resource created for a ticket, unless another request got
+    there first (False). A single conditional UPDATE: a concurrent
+    completion on another worker waits on the row lock and then matches
+    nothing, so it should roll back its own resource.
+    """
+    
+    result = await session.execute(
+        update(DirectUploads)
+        .where(and_(DirectUploads.storage_key == key, DirectUploads.completed_at == None))
+        .values(completed_at=datetime.utcnow(), resource_id=resource_id)
+        .returning(DirectUploads.storage_key)
+        .execution_options(synchronize_session=False)
+    )
+    return result.first() is not None
+
+
+async def sweep_abandoned_direct_uploads(
+    session: AsyncSession,
+    limit: int = DIRECT_UPLOAD_SWEEP_BATCH
+) -> int:
+    """
+    Forget tickets that can no longer be completed, deleting the storage
+    objects of those that never were. The rows are deleted (and committed)
+    before the objects, so a completion racing the sweep fails cleanly
+    instead of creating a resource for a deleted object. Returns the number
+    of objects removed.
+    """
+    
+    cutoff = datetime.utcnow() - timedelta(seconds=UPLOAD_COMPLETE_LEEWAY_SECONDS)
+    expired = select(DirectUploads.storage_key).where(DirectUploads.expires_at < cutoff).limit(limit)
+    result = await session.execute(
+        delete(DirectUploads)
+        .where(DirectUploads.storage_key.in_(expired))
+        .returning(DirectUploads.storage_key, DirectUploads.storage, DirectUploads.completed_at)
+        .execution_options(synchronize_session=False)
+    )
+    tickets = result.all()
+    await session.commit()
+    
+    store = get_object_store()
+    removed = 0
+    for key, storage, completed_at in tickets:
+        if completed_at is not None:
+            continue
+        try:
+            if await store.delete(key, json.loads(storage) if storage else None):
+                removed += 1
+        except Exception as e:
+            print(f"Failed to delete abandoned upload {key}: {str(e)}")
+    return removed
+
+
+def schedule_direct_upload_sweep() -> None:
+    """Sweep abandoned uploads in the background, if this process hasn't lately"""
+    
+    global _last_sweep_at, _sweep_task
+    now = time.monotonic()
+    if now - _last_sweep_at < DIRECT_UPLOAD_SWEEP_INTERVAL_SECONDS:
+        return
+    _last_sweep_at = now
+    _sweep_task = asyncio.create_task(_run_direct_upload_sweep())
+
+
+async def _run_direct_upload_sweep() -> None:
+    try:
+        async with async_session_local() as session:
+            await sweep_abandoned_direct_uploads(session)
+    except Exception as e:
+        print(f"Direct upload sweep failed: {str(e)}")
+
+
+def uploaded_type_matches(declared: str, stored: str) -> bool:
+    """
+    Whether the stored bytes back up the declared MIME type
+    
+    PDFs, images and videos must really be one (the app renders them);
+    other declared types are taken as-is.
+    """
+    
+    if declared == "application/pdf":
+        return stored == "application/pdf"
+    
+    major = declared.split('/')[0]
+    if major in ("image", "video"):
+        return stored.split('/')[0] == major
+    
+    return True
+
 
 # ============================================================================
 # CLOUDINARY UPLOAD FUNCTIONS
@@ -43,47 +375,21 @@ async def upload_file_to_cloudinary(
     """
     
     try:
-        # Detect resource type based on content type
-        resource_type = detect_resource_type(file.content_type)
-        
-        # Upload to Cloudinary
-
-        if file.content_type == "application/pdf":
-            result = cloudinary.uploader.upload(
-                file.file,
-                resource_type="raw",
-                use_filename=True,
-                unique_filename=False,
-                filename_override=file.filename,
-                access_mode="public",
-                type="upload",
-            )
-        else:
-            result = cloudinary.uploader.upload(
-                file.file,
-                folder=folder,
-                resource_type=resource_type,
-                use_filename=True,     # <-- keep original filename
-                unique_filename=False, # <-- keep the extension
-                filename_override=file.filename,  # <-- forces .pdf to be preserved
-                content_disposition="inline",
-                access_mode="public",
-                type="upload", 
-                # Optional: Add more options
-                # unique_filename=True,  # Generate unique filename
-                # overwrite=False,  # Don't overwrite existing files
-            )
+        content_type = file.content_type or "application/octet-stream"
+        stored = await CloudinaryObjectStore().put(
+            file.file,
+            filename=file.filename,
+            content_type=content_type,
+            folder=folder,
+        )
         
-        secure_url = result["secure_url"]
-
         return {
-            "url": secure_url,   
-            "public_id": result["public_id"],
-            "format": result.get("format"),
-            "resource_type": result.get("resource_type"),
-            "size": result.get("bytes", 0)
+            "url": stored.url,
+            "public_id": stored.key,
+            "format": stored.format,
+            "resource_type": detect_resource_type(content_type),
+            "size": stored.size
         }
-
         
     except Exception as e:
         raise HTTPException(
@@ -108,15 +414,7 @@ def detect_resource_type(content_type: str) -> str:
         "image", "video", or "raw"
     """
     
-    if content_type.startswith('image/'):
-        return "image"
-    elif content_type.startswith('pdf/'):
-        return "image"
-    elif content_type.startswith('video/'):
-        return "video"
-    else:
-        # PDFs, documents, etc.
-        return "raw"
+    return detect_cloudinary_resource_type(content_type)
 
 
 async def delete_file_from_cloudinary(public_id: str) -> bool:
@@ -136,8 +434,7 @@ async def delete_file_from_cloudinary(public_id: str) -> bool:
     """
     
     try:
-        result = cloudinary.uploader.destroy(public_id)
-        return result.get('result') == 'ok'
+        return await CloudinaryObjectStore().delete(public_id)
     except Exception as e:
         print(f"Failed to delete from Cloudinary: {str(e)}")
         return False
@@ -151,6 +448,9 @@ def validate_file_size(file: UploadFile, max_size_mb: int = 50) -> bool:
     """
     Validate file size (optional, Cloudinary has limits too)
     
+    Only usable once the whole body has been received; store_upload
+    enforces the limit while streaming instead.
+    
     Free tier Cloudinary limits:
     - Images: 10MB max
     - Videos: 100MB max
@@ -259,27 +559,24 @@ def sanitize_filename(filename: str) -> str:
 How to use in routes:
 
 from fastapi import UploadFile, File
-from ..services.upload_service import upload_file_to_cloudinary
+from ..services.upload_service import store_upload
 
 @router.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
     current_user: Users = Depends(get_current_user)
 ):
-    # Optional: Validate
-    validate_file_size(file, max_size_mb=50)
-    
-    # Upload to Cloudinary
-    upload_result = await upload_file_to_cloudinary(file)
+    # Upload to storage (size limit enforced while streaming)
+    stored = await store_upload(file, max_size_mb=50)
     
     # Create resource in database
     resource = await resource_service.create_resource(
         session=db,
         user_id=current_user.user_id,
         title=file.filename,
-        url=upload_result['url'],  # Cloudinary URL!
+        url=stored.url,  # Cloudinary (or local storage) URL
         resource_type=...,
-        file_size=upload_result['size']
+        file_size=stored.size
     )
     
     return resource
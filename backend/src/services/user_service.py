@@ -4,6 +4,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ..database.models import Users
+from .chatbot_context_service import invalidate_user_context
 from typing import Optional 
 
 async def get_user_by_id(session: AsyncSession, user_id: str) -> Optional[Users]:
@@ -126,4 +127,5 @@ async def update_user(
         user.preferences = preferences
 
     await session.flush()
+    invalidate_user_context(user_id, session)
     return user
\ No newline at end of file
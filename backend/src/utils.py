@@ -19,6 +19,36 @@ cloudinary.config(
 
 clerk_sdk = Clerk(bearer_auth=os.getenv("CLERK_SECRET_KEY"))
 
+def _auth_options() -> AuthenticateRequestOptions:
+    return AuthenticateRequestOptions(
+        authorized_parties=[
+            "http://localhost:5173", # Vite default 
+            "http://localhost:5174", # Alternative port
+            "http://localhost:3000", #React default
+            ],
+        jwt_key=os.getenv("JWT_KEY")
+    )
+
+
+class _BearerToken:
+    """Just enough of a request for Clerk: an Authorization header"""
+    def __init__(self, token: str):
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+
+def authenticate_token(token: str) -> str:
+    """
+    Verify a Clerk session token that didn't arrive in a header and return
+    its user_id. Browsers can't set headers on a WebSocket handshake, so
+    sockets pass the token in the query string instead.
+    """
+    request_state = clerk_sdk.authenticate_request(_BearerToken(token), _auth_options())
+    user_id = request_state.payload.get("sub") if request_state.is_signed_in else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Not authenticated - please sign in")
+    return user_id
+
+
 def authenticate_and_get_user_details(request: Request) -> dict:
     """
    Authenticate request using Clerk and extract user details from headers
@@ -32,17 +62,7 @@ def authenticate_and_get_user_details(request: Request) -> dict:
     """
     try:
         #verify jwt token
-        request_state = clerk_sdk.authenticate_request(
-            request,
-            AuthenticateRequestOptions(
-                authorized_parties=[
-                    "http://localhost:5173", # Vite default 
-                    "http://localhost:5174", # Alternative port
-                    "http://localhost:3000", #React default
-                    ],
-                jwt_key=os.getenv("JWT_KEY")
-            )
-        )
+        request_state = clerk_sdk.authenticate_request(request, _auth_options())
 
     #Checks if user is signed in
         if not request_state.is_signed_in:
@@ -0,0 +1,53 @@
+"""Cached reads dropped by a write stay dropped once the write commits."""
+
+import pytest
+
+from src.database.models import Users, Posts, PostType
+from src.services import community_service, resources_service
+from src.services.cache_service import TTLCache, invalidate_after_commit
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_entries_recached_mid_transaction_go_on_commit(session_factory):
+    cache = TTLCache(ttl_seconds=60)
+    cache.set(("post", 1, "page"), "old")
+
+    async with session_factory() as session:
+        invalidate_after_commit(session, cache, ("post", 1))
+        assert cache.get(("post", 1, "page")) is None
+
+        # A read racing the write caches what it saw before the commit
+        cache.set(("post", 1, "page"), "old")
+        await session.commit()
+
+    assert cache.get(("post", 1, "page")) is None
+
+
+async def test_comment_thread_and_sidebar_drop_again_on_commit(session_factory):
+    async with session_factory() as setup:
+        setup.add(Users(user_id="author", username="author", email="author@example.com"))
+        await setup.flush()
+        post = Posts(user_id="author", post_type=PostType.QUESTION, title="Question")
+        setup.add(post)
+        await setup.commit()
+
+    stale_thread = (post.id, "thread", None, 20, 3)
+    async with session_factory() as writer:
+        await community_service.add_comment(writer, post.id, "author", "first!")
+        community_service._comment_thread_cache.set(stale_thread, ([], None))
+        community_service._sidebar_cache.set(("top_contributors",), [])
+        await writer.commit()
+
+    assert community_service._comment_thread_cache.get(stale_thread) is None
+    assert community_service._sidebar_cache.get(("top_contributors",)) is None
+
+
+async def test_progress_stats_drop_again_on_commit(session_factory):
+    key = ("progress_stats", "reader")
+    async with session_factory() as writer:
+        resources_service._invalidate_progress_stats("reader", writer)
+        resources_service._stats_cache.set(key, {"stale": True})
+        await writer.commit()
+
+    assert resources_service._stats_cache.get(key) is None
@@ -0,0 +1,35 @@
+"""Chatbot context snapshots are dropped once the write that staled them commits."""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from src.database.models import Users
+from src.services import chatbot_context_service, study_session_service
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_snapshot_cached_mid_transaction_is_dropped_on_commit(session_factory):
+    async with session_factory() as setup:
+        setup.add(Users(user_id="student", username="student", email="student@example.com"))
+        await setup.commit()
+
+    async with session_factory() as reader:
+        before = await chatbot_context_service.get_context_snapshot(reader, "student")
+    assert before.context["weekly_sessions"] == 0
+
+    async with session_factory() as writer:
+        started_at = datetime.now() - timedelta(minutes=30)
+        await study_session_service.create_study_session(
+            writer, "student", 1800, started_at, started_at + timedelta(minutes=30)
+        )
+        # A chat request racing the write re-caches the pre-commit numbers
+        # (the test database shares one connection, so plant them directly)
+        chatbot_context_service._context_cache.set(("student", date.today()), before)
+        await writer.commit()
+
+    async with session_factory() as reader:
+        after = await chatbot_context_service.get_context_snapshot(reader, "student")
+    assert after.context["weekly_sessions"] == 1
+    assert after.context["current_streak"] == 1
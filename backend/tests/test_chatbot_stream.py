@@ -0,0 +1,136 @@
+"""/api/chatbot/stream against the mock LLM server (routes/fake_llm.py)."""
+
+import json
+
+import anyio
+import httpx
+import openai
+import pytest
+from sqlalchemy import select
+
+from src.app import app
+from src.database.models import ChatConversations
+from src.services import chatbot_service
+from src.services.llm_gateway import llm_gateway
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def fake_llm_client(session_factory, monkeypatch):
+    """Points the gateway's OpenAI client at the mounted fake server, in process."""
+    fake = openai.AsyncOpenAI(
+        api_key="test",
+        base_url="http://localhost:8000/api/fake-llm/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+    )
+    monkeypatch.setattr(llm_gateway, "_openai", fake)
+    # The finished reply is saved through its own session
+    monkeypatch.setattr(chatbot_service, "async_session_local", session_factory)
+    yield fake
+    await fake.close()
+
+
+def _parse_sse(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+async def _messages(db, role: str) -> list:
+    result = await db.execute(
+        select(ChatConversations)
+        .where(ChatConversations.role == role)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().all()
+
+
+async def test_stream_sends_session_tokens_done_and_saves_reply(client, fake_llm_client, db):
+    response = await client.post("/api/chatbot/stream", json={"message": "how is my streak"})
+    assert response.status_code == 200
+
+    events = _parse_sse(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "session"
+    assert names[-1] == "done"
+    assert set(names[1:-1]) == {"token"}
+    session_id = events[0][1]["session_id"]
+    assert events[-1][1] == {"session_id": session_id}
+
+    reply = "".join(data["text"] for name, data in events if name == "token")
+    assert reply == "You said: how is my streak"
+
+    [assistant] = await _messages(db, "assistant")
+    assert assistant.session_id == session_id
+    assert assistant.content == reply
+    # Usage as reported by the fake server in the final chunk
+    assert assistant.tokens_used and assistant.tokens_used > len(reply.split())
+
+
+async def test_disconnect_mid_stream_saves_no_reply(current_user, fake_llm_client, session_factory, db):
+    from src.database.database import get_db
+    from src.dependencies import get_current_user
+
+    async def test_db():
+        async with session_factory() as session:
+            yield session
+            await session.commit()
+
+    async def test_user():
+        return current_user
+
+    app.dependency_overrides[get_db] = test_db
+    app.dependency_overrides[get_current_user] = test_user
+
+    # Raw ASGI so the client can go away after the first token, which
+    # httpx's ASGITransport (it buffers the whole response) can't do
+    request_body = json.dumps({"message": " ".join(["word"] * 50)}).encode()
+    sent = []
+    first_token = anyio.Event()
+    body_delivered = False
+
+    async def receive():
+        nonlocal body_delivered
+        if not body_delivered:
+            body_delivered = True
+            return {"type": "http.request", "body": request_body, "more_body": False}
+        await first_token.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if message["type"] == "http.response.body" and b"event: token" in message.get("body", b""):
+            first_token.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/chatbot/stream",
+        "raw_path": b"/api/chatbot/stream",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost:8000"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("localhost", 8000),
+    }
+    try:
+        await app(scope, receive, send)
+    finally:
+        app.dependency_overrides.clear()
+
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    assert b"event: session" in body
+    assert b"event: done" not in body
+    assert body.count(b"event: token") < 50
+
+    # The question is kept, the unfinished answer isn't
+    assert len(await _messages(db, "user")) == 1
+    assert await _messages(db, "assistant") == []
+
@@ -0,0 +1,118 @@
+"""Comment threads load a bounded slice of replies and page the rest."""
+
+from datetime import datetime, timedelta
+from itertools import count
+
+import pytest
+
+from src.database.models import Users, Posts, PostType, PostComments
+from src.services import community_service
+
+pytestmark = pytest.mark.anyio
+
+
+async def _seed_thread(db):
+    """
+    root
+    ├── reply_a
+    │   └── nested
+    │       └── deep
+    └── reply_b
+    """
+    user = Users(user_id="user", username="user", email="user@example.com")
+    db.add(user)
+    await db.flush()
+    post = Posts(user_id=user.user_id, post_type=PostType.QUESTION, title="Question")
+    db.add(post)
+    await db.flush()
+
+    # Explicit timestamps: SQLite's CURRENT_TIMESTAMP has one-second
+    # resolution and wouldn't compare cleanly against cursor values
+    start = datetime(2026, 1, 1)
+    minutes = count()
+
+    async def comment(text, parent=None):
+        c = PostComments(
+            post_id=post.id, user_id=user.user_id, text=text,
+            parent_comment_id=parent.id if parent else None,
+            created_at=start + timedelta(minutes=next(minutes)),
+        )
+        db.add(c)
+        await db.flush()
+        return c
+
+    root = await comment("root")
+    reply_a = await comment("reply_a", root)
+    nested = await comment("nested", reply_a)
+    await comment("deep", nested)
+    await comment("reply_b", root)
+    await db.commit()
+    return post
+
+
+def _shape(comment: dict):
+    return (comment["text"], [_shape(r) for r in comment["replies"]])
+
+
+EXPECTED = ("root", [("reply_a", [("nested", [("deep", [])])]), ("reply_b", [])])
+
+
+async def test_thread_page_includes_nested_replies(db, count_queries):
+    post = await _seed_thread(db)
+
+    with count_queries() as counter:
+        comments, next_cursor = await community_service.get_comment_thread(db, post.id)
+
+    assert next_cursor is None
+    assert [_shape(c) for c in comments] == [EXPECTED]
+    # Top level, one per reply level, the deepest level's counts, authors
+    assert counter.count == community_service.COMMENT_REPLY_DEPTH + 3
+
+
+async def test_more_replies_page_keeps_subtrees(db):
+    post = await _seed_thread(db)
+    comments, _ = await community_service.get_comment_thread(db, post.id, replies_per_comment=1)
+    root = comments[0]
+    assert root["reply_count"] == 2
+    assert [_shape(r) for r in root["replies"]] == EXPECTED[1][:1]
+
+    rest, _ = await community_service.get_comment_replies(
+        db, post.id, root["id"], cursor=root["replies_cursor"],
+    )
+    assert [_shape(r) for r in rest] == EXPECTED[1][1:]
+
+    everything, _ = await community_service.get_comment_replies(db, post.id, root["id"])
+    assert [_shape(r) for r in everything] == EXPECTED[1]
+
+
+async def test_deep_chains_stop_at_the_depth_limit(db, monkeypatch):
+    monkeypatch.setattr(community_service, "COMMENT_REPLY_DEPTH", 2)
+    post = await _seed_thread(db)
+
+    comments, _ = await community_service.get_comment_thread(db, post.id)
+    root = comments[0]
+    assert [_shape(c) for c in comments] == [("root", [("reply_a", [("nested", [])]), ("reply_b", [])])]
+
+    # "deep" isn't loaded, but "nested" says it has a reply to fetch
+    nested = root["replies"][0]["replies"][0]
+    assert nested["reply_count"] == 1
+    assert nested["replies_cursor"] is None
+
+    more, _ = await community_service.get_comment_replies(db, post.id, nested["id"])
+    assert [_shape(r) for r in more] == [("deep", [])]
+
+
+async def test_legacy_listing_is_the_first_page(client, db, current_user):
+    post = await _seed_thread(db)
+    top_level = [
+        PostComments(post_id=post.id, user_id="user", text=f"extra {i}", created_at=datetime(2026, 2, 1, 0, i))
+        for i in range(25)
+    ]
+    db.add_all(top_level)
+    await db.commit()
+
+    response = await client.get(f"/api/community/posts/{post.id}/comments")
+    assert response.status_code == 200
+    comments = response.json()
+    assert len(comments) == 20
+    assert _shape(comments[0]) == EXPECTED
@@ -0,0 +1,90 @@
+"""Feed pages must cost a fixed number of queries, whatever their size (N+1 regression)."""
+
+import pytest
+
+from src.database.models import (
+    Users, Groups, Resources, ResourceType, Posts, PostType, PostLikes, PostSaves,
+)
+from src.routes.communities import _build_post_responses
+from src.services import community_service
+
+pytestmark = pytest.mark.anyio
+
+# users + groups + resources + likes + saves
+HYDRATION_QUERIES = 5
+
+
+async def _seed_feed(db, posts: int = 30) -> Users:
+    users = [
+        Users(user_id=f"user_{i}", username=f"user_{i}", email=f"user_{i}@example.com")
+        for i in range(6)
+    ]
+    db.add_all(users)
+    await db.flush()
+
+    groups = [Groups(creator_id=users[0].user_id, group_name=f"Group {i}") for i in range(3)]
+    db.add_all(groups)
+    await db.flush()
+
+    resources = [
+        Resources(
+            uploaded_by=users[i].user_id,
+            url=f"https://example.com/{i}.pdf",
+            resource_type=ResourceType.PDF,
+            title=f"Resource {i}",
+        )
+        for i in range(4)
+    ]
+    db.add_all(resources)
+    await db.flush()
+
+    feed = []
+    for i in range(posts):
+        feed.append(Posts(
+            user_id=users[i % len(users)].user_id,
+            group_id=groups[i % len(groups)].id if i % 4 else None,
+            post_type=PostType.RESOURCE if i % 2 else PostType.QUESTION,
+            title=f"Post {i}",
+            resource_id=resources[i % len(resources)].id if i % 2 else None,
+        ))
+    db.add_all(feed)
+    await db.flush()
+
+    viewer = users[0]
+    db.add_all([PostLikes(user_id=viewer.user_id, post_id=p.id) for p in feed[::3]])
+    db.add_all([PostSaves(user_id=viewer.user_id, post_id=p.id) for p in feed[::5]])
+    await db.commit()
+    return viewer
+
+
+@pytest.mark.parametrize("page_size", [1, 5, 20])
+async def test_hydrate_posts_query_count_is_independent_of_page_size(db, count_queries, page_size):
+    viewer = await _seed_feed(db)
+    posts, _ = await community_service.get_posts(db, limit=page_size)
+    assert len(posts) == page_size
+
+    with count_queries() as counter:
+        hydrated = await community_service.hydrate_posts(db, viewer.user_id, posts)
+
+    assert counter.count == HYDRATION_QUERIES, counter.statements
+    assert set(hydrated["authors"]) == {p.user_id for p in posts}
+
+
+async def test_feed_page_response_does_not_query_per_post(db, count_queries):
+    viewer = await _seed_feed(db)
+    posts, next_cursor = await community_service.get_posts(db, limit=20)
+    assert next_cursor is not None
+
+    with count_queries() as counter:
+        responses = await _build_post_responses(db, posts, viewer)
+
+    assert len(responses) == 20
+    assert counter.count == HYDRATION_QUERIES, counter.statements
+    liked = {r.id for r in responses if r.liked_by_me}
+    assert liked == {p.id for p in posts if (p.id - 1) % 3 == 0}
+
+
+async def test_empty_page_runs_no_queries(db, count_queries):
+    with count_queries() as counter:
+        await community_service.hydrate_posts(db, "nobody", [])
+    assert counter.count == 0
@@ -0,0 +1,162 @@
+"""Direct-to-storage uploads through the local mock storage (routes/storage.py)."""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from src.database.models import DirectUploads, Resources, ResourceType
+from src.routes import resources as resources_routes
+from src.services import upload_service
+from src.services.object_store import get_object_store, sign_token
+
+pytestmark = pytest.mark.anyio
+
+PDF_BYTES = b"%PDF-1.4\n" + b"0" * 2048
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"0" * 2048
+
+
+@pytest.fixture(autouse=True)
+def no_background_work(monkeypatch):
+    extractions = []
+    monkeypatch.setattr(upload_service, "schedule_direct_upload_sweep", lambda: None)
+    monkeypatch.setattr(resources_routes.pdf_extraction_service, "schedule_extraction", extractions.append)
+    return extractions
+
+
+async def _sign(client, filename="notes.pdf", content_type="application/pdf", size=len(PDF_BYTES)):
+    response = await client.post(
+        "/api/resources/uploads/sign",
+        json={"filename": filename, "content_type": content_type, "size": size},
+    )
+    return response
+
+
+async def _put(client, ticket, body):
+    assert ticket["method"] == "PUT"
+    return await client.put(ticket["upload_url"], content=body, headers=ticket["headers"])
+
+
+async def test_sign_put_complete_round_trip(client, db, no_background_work):
+    signed = await _sign(client)
+    assert signed.status_code == 200
+    ticket = signed.json()
+
+    uploaded = await _put(client, ticket, PDF_BYTES)
+    assert uploaded.status_code == 201
+    assert uploaded.json()["size"] == len(PDF_BYTES)
+
+    completed = await client.post("/api/resources/uploads/complete", json={"upload_token": ticket["upload_token"]})
+    assert completed.status_code == 201
+    resource = completed.json()
+    assert resource["title"] == "notes.pdf"
+    assert resource["file_size"] == len(PDF_BYTES)
+    assert no_background_work == [resource["id"]]  # text extraction queued once
+
+    # Retrying the completion (on any worker) returns the same resource
+    retried = await client.post("/api/resources/uploads/complete", json={"upload_token": ticket["upload_token"]})
+    assert retried.status_code == 201
+    assert retried.json()["id"] == resource["id"]
+    ids = await db.execute(select(Resources.id))
+    assert ids.scalars().all() == [resource["id"]]
+
+
+async def test_completion_is_claimed_once(client, db, current_user):
+    ticket = (await _sign(client)).json()
+    await _put(client, ticket, PDF_BYTES)
+    key = (await db.execute(select(DirectUploads.storage_key))).scalar_one()
+
+    resource = Resources(
+        uploaded_by=current_user.user_id, url="https://example.com/a.pdf",
+        resource_type=ResourceType.PDF, title="a.pdf",
+    )
+    db.add(resource)
+    await db.flush()
+
+    assert await upload_service.mark_direct_upload_completed(db, key, resource.id) is True
+    assert await upload_service.mark_direct_upload_completed(db, key, resource.id) is False
+
+
+async def test_declared_oversize_is_rejected_at_signing(client):
+    response = await _sign(client, size=(upload_service.UPLOAD_MAX_SIZE_MB + 1) * 1024 * 1024)
+    assert response.status_code == 413
+
+
+async def test_oversize_body_is_rejected_while_streaming(client):
+    store = get_object_store()
+    ticket = store.create_upload_ticket("big.pdf", "application/pdf", max_bytes=1024)
+
+    response = await client.put(ticket.upload_url, content=PDF_BYTES, headers=ticket.headers)
+
+    assert response.status_code == 413
+    assert await store.stat(ticket.key, ticket.storage) is None  # partial file removed
+
+
+async def test_wrong_type_is_rejected_and_deleted(client, db):
+    ticket = (await _sign(client)).json()
+    await _put(client, ticket, PNG_BYTES)  # declared a PDF, sent a PNG
+    key = (await db.execute(select(DirectUploads.storage_key))).scalar_one()
+
+    response = await client.post("/api/resources/uploads/complete", json={"upload_token": ticket["upload_token"]})
+
+    assert response.status_code == 400
+    assert await get_object_store().stat(key, {}) is None
+    assert (await db.execute(select(Resources.id))).first() is None
+
+
+async def test_forged_tokens_are_rejected(client):
+    ticket = (await _sign(client)).json()
+    body, signature = ticket["upload_token"].rsplit(".", 1)
+    forged = f"{body}.{'0' * len(signature)}"
+
+    put_headers = {**ticket["headers"], "X-Upload-Token": forged}
+    assert (await client.put(ticket["upload_url"], content=PDF_BYTES, headers=put_headers)).status_code == 403
+
+    completed = await client.post("/api/resources/uploads/complete", json={"upload_token": forged})
+    assert completed.status_code == 400
+
+
+async def test_expired_tokens_are_rejected(client, current_user):
+    store = get_object_store()
+    ticket = store.create_upload_ticket("late.pdf", "application/pdf", max_bytes=1024 * 1024)
+    expired = sign_token({"key": ticket.key, "max_bytes": 1024 * 1024}, ttl_seconds=-1)
+
+    put = await client.put(ticket.upload_url, content=PDF_BYTES, headers={**ticket.headers, "X-Upload-Token": expired})
+    assert put.status_code == 403
+
+    # Completion allows UPLOAD_COMPLETE_LEEWAY_SECONDS past expiry, not more
+    past_leeway = sign_token(
+        {"user_id": current_user.user_id, "key": ticket.key},
+        ttl_seconds=-(upload_service.UPLOAD_COMPLETE_LEEWAY_SECONDS + 1),
+    )
+    completed = await client.post("/api/resources/uploads/complete", json={"upload_token": past_leeway})
+    assert completed.status_code == 400
+    assert "expired" in completed.json()["detail"]
+
+
+async def test_sweep_removes_abandoned_uploads(client, db):
+    abandoned = (await _sign(client, filename="abandoned.pdf")).json()
+    await _put(client, abandoned, PDF_BYTES)
+    kept = (await _sign(client, filename="kept.pdf")).json()
+    await _put(client, kept, PDF_BYTES + b"kept")
+    assert (await client.post("/api/resources/uploads/complete", json={"upload_token": kept["upload_token"]})).status_code == 201
+
+    tickets = dict((await db.execute(select(DirectUploads.storage_key, DirectUploads.resource_id))).all())
+    abandoned_key = next(k for k, resource_id in tickets.items() if resource_id is None)
+    assert os.path.exists(get_object_store()._path(abandoned_key))
+
+    # Both tickets run out; only the never-completed one owns its object
+    await db.execute(update(DirectUploads).values(expires_at=datetime.utcnow() - timedelta(days=1)))
+    await db.commit()
+
+    assert await upload_service.sweep_abandoned_direct_uploads(db) == 1
+    assert not os.path.exists(get_object_store()._path(abandoned_key))
+    assert (await db.execute(select(DirectUploads))).first() is None
+    (resource,) = (await db.execute(select(Resources))).scalars().all()
+    store = get_object_store()
+    assert os.path.exists(store._path(store.key_for_url(resource.url)))
+
+    # The swept ticket can't be completed any more
+    late = await client.post("/api/resources/uploads/complete", json={"upload_token": abandoned["upload_token"]})
+    assert late.status_code == 400
@@ -0,0 +1,67 @@
+"""Concurrent joins never overfill a group or double-book a member."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import select, func
+
+from src.database.models import Users, Groups, Groupings
+from src.services import group_service
+
+pytestmark = pytest.mark.anyio
+
+
+async def _seed(session_factory, joiners: int, max_members: int):
+    async with session_factory() as db:
+        db.add_all(
+            [Users(user_id="leader", username="leader", email="leader@example.com")]
+            + [Users(user_id=f"u{i}", username=f"u{i}", email=f"u{i}@example.com") for i in range(joiners)]
+        )
+        await db.flush()
+        group = await group_service.create_group(db, "leader", "Study group", max_members=max_members)
+        await db.commit()
+        return group.id
+
+
+async def _join(session_factory, user_id: str, group_id: int):
+    async with session_factory() as db:
+        membership = await group_service.join_group(db, user_id, group_id)
+        await db.commit()
+        return membership is not None
+
+
+async def _seats(session_factory, group_id: int):
+    async with session_factory() as db:
+        member_count = (await db.execute(
+            select(Groups.member_count).where(Groups.id == group_id)
+        )).scalar_one()
+        rows = (await db.execute(
+            select(Groupings.user_id, func.count()).where(Groupings.group_id == group_id).group_by(Groupings.user_id)
+        )).all()
+        return member_count, dict(rows)
+
+
+async def test_concurrent_joins_stop_at_capacity(concurrent_session_factory):
+    group_id = await _seed(concurrent_session_factory, joiners=10, max_members=4)
+
+    joined = await asyncio.gather(*(
+        _join(concurrent_session_factory, f"u{i}", group_id) for i in range(10)
+    ))
+
+    member_count, rows = await _seats(concurrent_session_factory, group_id)
+    assert sum(joined) == 3  # the leader holds the fourth seat
+    assert member_count == len(rows) == 4
+    assert set(rows.values()) == {1}
+
+
+async def test_duplicate_concurrent_joins_give_the_seat_back(concurrent_session_factory):
+    group_id = await _seed(concurrent_session_factory, joiners=1, max_members=10)
+
+    joined = await asyncio.gather(*(
+        _join(concurrent_session_factory, "u0", group_id) for _ in range(5)
+    ))
+
+    member_count, rows = await _seats(concurrent_session_factory, group_id)
+    assert sum(joined) == 1
+    assert rows == {"leader": 1, "u0": 1}
+    assert member_count == 2
@@ -0,0 +1,66 @@
+"""Joined-group paging is keyed on membership time, so edits can't reshuffle pages."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.database.models import Users, Groups, Groupings, GroupRole, InvitationStatus
+from src.services import group_service
+from src.services.keyset import encode_cursor, decode_cursor
+
+pytestmark = pytest.mark.anyio
+
+
+async def _seed_memberships(db, count: int):
+    user = Users(user_id="member", username="member", email="member@example.com")
+    db.add(user)
+    await db.flush()
+
+    groups = [Groups(creator_id=user.user_id, group_name=f"Group {i}") for i in range(count)]
+    db.add_all(groups)
+    await db.flush()
+
+    start = datetime(2026, 1, 1)
+    db.add_all([
+        Groupings(
+            user_id=user.user_id,
+            group_id=group.id,
+            role=GroupRole.MEMBER,
+            invitation_status=InvitationStatus.ACCEPTED,
+            joined_at=start + timedelta(minutes=i),
+        )
+        for i, group in enumerate(groups)
+    ])
+    await db.commit()
+    return user, groups
+
+
+async def test_joined_pages_survive_group_edits(db):
+    user, groups = await _seed_memberships(db, count=5)
+
+    first, cursor = await group_service.list_groups(db, user.user_id, only_joined=True, limit=2)
+    assert cursor is not None
+
+    # Editing a group already shown used to move it back into later pages
+    first[0][0].description = "edited"
+    first[0][0].updated_at = datetime(2030, 1, 1)
+    await db.commit()
+
+    seen = [g.id for g, _ in first]
+    while cursor:
+        page, cursor = await group_service.list_groups(
+            db, user.user_id, only_joined=True, cursor=cursor, limit=2,
+        )
+        seen += [g.id for g, _ in page]
+
+    assert seen == [g.id for g in reversed(groups)]
+
+
+def test_cursor_round_trip():
+    when = datetime(2026, 5, 4, 3, 2, 1, 123456)
+    assert decode_cursor(encode_cursor(when, 42)) == (when, 42)
+
+
+def test_malformed_cursor_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
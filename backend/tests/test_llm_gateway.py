@@ -0,0 +1,52 @@
+"""LLM gateway retries stay inside the provider rate limits."""
+
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from src.services import llm_gateway as gateway_module
+from src.services.llm_gateway import LLMGateway
+
+pytestmark = pytest.mark.anyio
+
+
+def _completion(text: str):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+        usage=SimpleNamespace(prompt_tokens=10, completion_tokens=2, total_tokens=12),
+    )
+
+
+async def test_every_retry_takes_its_own_rate_limit_budget(monkeypatch):
+    monkeypatch.setattr(gateway_module, "LLM_BACKOFF_BASE_SECONDS", 0)
+    gateway = LLMGateway()
+
+    drawn = []
+    requests, tokens = gateway._buckets["groq"]
+    for name, bucket in (("requests", requests), ("tokens", tokens)):
+        async def acquire(amount=1, name=name, original=bucket.acquire):
+            drawn.append(name)
+            await original(amount)
+        monkeypatch.setattr(bucket, "acquire", acquire)
+
+    attempts = 0
+
+    async def create(**kwargs):
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise openai.APIConnectionError(request=httpx.Request("POST", "http://llm.test"))
+        return _completion("hello")
+
+    gateway._openai = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    text, metrics = await gateway.chat(
+        model="test-model", messages=[{"role": "user", "content": "hi"}], max_tokens=10
+    )
+
+    assert text == "hello"
+    assert metrics.attempts == 3
+    assert drawn == ["requests", "tokens"] * 3
+    assert gateway.stats()["models"]["groq/test-model"]["retries"] == 2
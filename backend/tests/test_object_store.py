@@ -0,0 +1,92 @@
+"""Object keys never collide, whatever the uploaded file is called."""
+
+import io
+
+import cloudinary.uploader
+import pytest
+
+from src.services.object_store import CloudinaryObjectStore
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def cloudinary_uploads(monkeypatch):
+    """Records upload() calls instead of sending them to Cloudinary."""
+    calls = []
+
+    def upload(fileobj, **options):
+        calls.append(options)
+        return {"public_id": options["public_id"], "secure_url": f"https://res.cloudinary.com/demo/{options['public_id']}"}
+
+    monkeypatch.setattr(cloudinary.uploader, "upload", upload)
+    return calls
+
+
+@pytest.mark.parametrize("filename, content_type", [
+    ("lecture.pdf", "application/pdf"),
+    ("diagram.png", "image/png"),
+])
+async def test_same_filename_gets_distinct_keys(cloudinary_uploads, filename, content_type):
+    store = CloudinaryObjectStore()
+
+    first = await store.put(io.BytesIO(b"one"), filename, content_type, folder="study-resources")
+    second = await store.put(io.BytesIO(b"two"), filename, content_type, folder="study-resources")
+
+    assert first.key != second.key
+    assert all(key.startswith("study-resources/") for key in (first.key, second.key))
+    assert all(options["overwrite"] is False for options in cloudinary_uploads)
+
+
+async def test_put_and_delete_carry_the_cloudinary_resource_type(cloudinary_uploads, monkeypatch):
+    destroyed = []
+
+    def destroy(key, **options):
+        destroyed.append((key, options))
+        return {"result": "ok"}
+
+    monkeypatch.setattr(cloudinary.uploader, "destroy", destroy)
+    store = CloudinaryObjectStore()
+
+    stored = await store.put(io.BytesIO(b"%PDF"), "notes.pdf", "application/pdf")
+    assert stored.storage == {"resource_type": "raw"}
+
+    assert await store.delete(stored.key, stored.storage)
+    assert destroyed == [(stored.key, {"resource_type": "raw"})]
+
+
+@pytest.mark.parametrize("url, key, resource_type", [
+    (
+        "https://res.cloudinary.com/demo/raw/upload/v1712345678/study-resources/ab12_notes.pdf",
+        "study-resources/ab12_notes.pdf",
+        "raw",
+    ),
+    (
+        "https://res.cloudinary.com/demo/image/upload/v1712345678/study-resources/ab12_diagram.png",
+        "study-resources/ab12_diagram",
+        "image",
+    ),
+    (
+        "https://res.cloudinary.com/demo/video/upload/study-resources/ab12_lecture.mp4",
+        "study-resources/ab12_lecture",
+        "video",
+    ),
+])
+async def test_delete_by_url_finds_key_and_resource_type(monkeypatch, url, key, resource_type):
+    from src.services import object_store, upload_service
+
+    destroyed = []
+
+    def destroy(public_id, **options):
+        destroyed.append((public_id, options))
+        return {"result": "ok"}
+
+    monkeypatch.setattr(cloudinary.uploader, "destroy", destroy)
+    monkeypatch.setattr(object_store, "_store", CloudinaryObjectStore())
+
+    assert await upload_service.delete_stored_file(url)
+    assert destroyed == [(key, {"resource_type": resource_type})]
+
+
+async def test_urls_elsewhere_are_not_ours():
+    assert CloudinaryObjectStore().key_for_url("https://example.com/files/notes.pdf") is None
@@ -0,0 +1,66 @@
+"""
+Reaction counters stay equal to the reaction rows under concurrent toggles.
+
+SQLite serializes from a transaction's first write, so this catches
+read-then-write toggles (the check or the counter read before any write),
+not lost updates that only Postgres' row-level locking would allow.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import select, func
+
+from src.database.models import Users, Posts, PostType, PostLikes, PostSaves
+from src.services import community_service
+
+pytestmark = pytest.mark.anyio
+
+USERS = 6
+
+
+async def _seed(session_factory):
+    async with session_factory() as db:
+        db.add_all([Users(user_id=f"u{i}", username=f"u{i}", email=f"u{i}@example.com") for i in range(USERS)])
+        await db.flush()
+        post = Posts(user_id="u0", post_type=PostType.QUESTION, title="Question")
+        db.add(post)
+        await db.commit()
+        return post.id
+
+
+async def _toggle(session_factory, toggle, user_id: str, post_id: int):
+    async with session_factory() as db:
+        await toggle(db, user_id, post_id)
+        await db.commit()
+
+
+async def _counts(session_factory, model, counter, post_id: int):
+    async with session_factory() as db:
+        stored = (await db.execute(select(counter).where(Posts.id == post_id))).scalar_one()
+        rows = (await db.execute(
+            select(func.count()).select_from(model).where(model.post_id == post_id)
+        )).scalar_one()
+        return stored, rows
+
+
+@pytest.mark.parametrize("toggle, model, counter", [
+    (community_service.toggle_like, PostLikes, Posts.like_count),
+    (community_service.toggle_save, PostSaves, Posts.save_count),
+])
+async def test_like_unlike_relike_keeps_counter_exact(concurrent_session_factory, toggle, model, counter):
+    post_id = await _seed(concurrent_session_factory)
+
+    # Every user likes, unlikes and likes again, all at once
+    await asyncio.gather(*(
+        _toggle(concurrent_session_factory, toggle, f"u{i}", post_id)
+        for _ in range(3)
+        for i in range(USERS)
+    ))
+
+    stored, rows = await _counts(concurrent_session_factory, model, counter, post_id)
+    assert stored == rows == USERS
+
+    # And one more round: everyone unlikes
+    await asyncio.gather(*(_toggle(concurrent_session_factory, toggle, f"u{i}", post_id) for i in range(USERS)))
+    assert await _counts(concurrent_session_factory, model, counter, post_id) == (0, 0)
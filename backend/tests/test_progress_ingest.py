@@ -0,0 +1,109 @@
+"""Write-behind reading progress: coalesced writes and isolation of bad rows."""
+
+import pytest
+from sqlalchemy import select
+
+from src.database.models import Users, Resources, ResourceType, ResourceProgress, ResourceStatus
+from src.services import progress_ingest_service
+from src.services.progress_ingest_service import ProgressIngestor
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def ingestor(session_factory, monkeypatch):
+    monkeypatch.setattr(progress_ingest_service, "async_session_local", session_factory)
+    monkeypatch.setattr(progress_ingest_service, "PROGRESS_DURABILITY", progress_ingest_service.DURABILITY_BUFFERED)
+    ingestor = ProgressIngestor()
+    monkeypatch.setattr(ingestor, "_ensure_flush_loop", lambda: None)  # tests flush explicitly
+    yield ingestor
+
+
+async def _seed(db, resources: int = 2):
+    user = Users(user_id="reader", username="reader", email="reader@example.com")
+    db.add(user)
+    await db.flush()
+    docs = [
+        Resources(
+            uploaded_by=user.user_id, url=f"https://example.com/{i}.pdf",
+            resource_type=ResourceType.PDF, title=f"Doc {i}", total_pages=100,
+        )
+        for i in range(resources)
+    ]
+    db.add_all(docs)
+    await db.commit()
+    return user, docs
+
+
+async def _progress(db, user_id):
+    result = await db.execute(
+        select(ResourceProgress)
+        .where(ResourceProgress.user_id == user_id)
+        .execution_options(populate_existing=True)  # rows were written by other sessions
+    )
+    return {p.resource_id: p for p in result.scalars().all()}
+
+
+async def test_page_turns_coalesce_into_one_row_write(db, ingestor):
+    user, (doc, other) = await _seed(db)
+
+    for page in range(1, 61):
+        await ingestor.record(user.user_id, doc.id, page, doc.total_pages)
+    await ingestor.record(user.user_id, other.id, 100, other.total_pages)
+
+    assert await ingestor.flush() == 2
+    assert ingestor.events_received == 61
+    assert ingestor.rows_written == 2  # one upsert row per (user, resource), not per event
+
+    progress = await _progress(db, user.user_id)
+    assert progress[doc.id].current_page == 60
+    assert progress[doc.id].status == ResourceStatus.IN_PROGRESS
+    assert progress[other.id].status == ResourceStatus.COMPLETED
+
+    # Later turns update the same row
+    await ingestor.record(user.user_id, doc.id, 61, doc.total_pages)
+    assert await ingestor.flush() == 1
+    assert (await _progress(db, user.user_id))[doc.id].current_page == 61
+
+
+async def test_bad_row_is_retried_once_then_dropped_without_blocking_others(db, ingestor):
+    user, (doc, _) = await _seed(db)
+    missing_resource_id = 9999
+
+    await ingestor.record(user.user_id, doc.id, 10, doc.total_pages)
+    await ingestor.record(user.user_id, missing_resource_id, 3, 10)
+
+    # The FK violation fails the batch, but the good row still lands
+    assert await ingestor.flush() == 1
+    assert ingestor.pending(user.user_id, missing_resource_id) is not None
+    assert (await _progress(db, user.user_id))[doc.id].current_page == 10
+
+    # Later events flush normally; the bad row gets its second and last try
+    await ingestor.record(user.user_id, doc.id, 11, doc.total_pages)
+    assert await ingestor.flush() == 1
+    assert ingestor.pending(user.user_id, missing_resource_id) is None
+    assert ingestor.rows_dropped == 1
+
+    assert (await _progress(db, user.user_id))[doc.id].current_page == 11
+    assert await ingestor.flush() == 0
+
+
+async def test_progress_listings_see_pending_page_turns(db, ingestor, monkeypatch):
+    from src.services import resources_service
+    monkeypatch.setattr(progress_ingest_service, "progress_ingestor", ingestor)
+    user, (doc, other) = await _seed(db)
+
+    await ingestor.record(user.user_id, doc.id, 30, doc.total_pages)
+
+    # Both listings filter by status in SQL, so the buffered event must land first
+    rows, _ = await resources_service.list_resources_with_progress(
+        db, user.user_id, status=ResourceStatus.IN_PROGRESS
+    )
+    assert [(resource.id, progress.current_page) for resource, progress in rows] == [(doc.id, 30)]
+    assert ingestor.pending(user.user_id, doc.id) is None
+
+    await ingestor.record(user.user_id, other.id, 100, other.total_pages)
+    completed = await resources_service.get_all_user_progress(
+        db, user.user_id, status_filter=ResourceStatus.COMPLETED
+    )
+    assert [p.resource_id for p in completed] == [other.id]
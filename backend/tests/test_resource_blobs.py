@@ -0,0 +1,142 @@
+"""Releasing blobs removes their storage: everything under a deleted folder,
+with the backend details each object was stored with."""
+
+import io
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import select
+from starlette.datastructures import Headers
+
+from src.database.models import Resources, ResourceType, StoredBlobs
+from src.services import blob_service, object_store
+from src.services.object_store import LocalObjectStore, get_object_store
+
+pytestmark = pytest.mark.anyio
+
+
+async def _store(content: bytes, name: str):
+    return await get_object_store().put(io.BytesIO(content), name, "application/pdf")
+
+
+async def test_permanent_folder_delete_releases_subtree_blobs(client, db, current_user):
+    store = get_object_store()
+    shared = await _store(b"%PDF shared", "shared.pdf")
+    solo = await _store(b"%PDF solo", "solo.pdf")
+    legacy = await _store(b"%PDF legacy", "legacy.pdf")  # uploaded before dedup: no blob
+
+    shared_blob = await blob_service.register_blob(db, "a" * 64, shared)
+    solo_blob = await blob_service.register_blob(db, "b" * 64, solo)
+
+    def resource(title, parent=None, blob=None, url="", resource_type=ResourceType.PDF):
+        return Resources(
+            uploaded_by=current_user.user_id, title=title, resource_type=resource_type,
+            url=blob.url if blob else url, blob_id=blob.id if blob else None,
+            parent_folder_id=parent.id if parent else None,
+        )
+
+    folder = resource("Course", resource_type=ResourceType.FOLDER)
+    outside = resource("Kept elsewhere", blob=shared_blob)
+    db.add_all([folder, outside])
+    await db.flush()
+    week = resource("Week 1", parent=folder, resource_type=ResourceType.FOLDER)
+    db.add(week)
+    await db.flush()
+    db.add_all([
+        resource("shared copy 1", parent=folder, blob=shared_blob),
+        resource("shared copy 2", parent=week, blob=shared_blob),
+        resource("solo", parent=week, blob=solo_blob),
+        resource("legacy", parent=week, url=legacy.url),
+    ])
+    # register_blob took the first reference of each; add the rest
+    shared_blob.ref_count = 3
+    await db.commit()
+
+    response = await client.delete(f"/api/resources/{folder.id}/permanent")
+    assert response.status_code == 204
+
+    blobs = {b.content_hash[0]: b for b in (await db.execute(
+        select(StoredBlobs).execution_options(populate_existing=True)
+    )).scalars().all()}
+    # Still referenced from outside the folder
+    assert blobs["a"].ref_count == 1
+    assert await store.stat(shared.key, {}) is not None
+    # Last references lived in the folder: rows and objects are gone
+    assert "b" not in blobs
+    assert await store.stat(solo.key, {}) is None
+    assert await store.stat(legacy.key, {}) is None
+
+    subtree = (await db.execute(
+        select(Resources).where(Resources.id != outside.id).execution_options(populate_existing=True)
+    )).scalars().all()
+    assert all(r.is_deleted and r.blob_id is None for r in subtree if r.resource_type != ResourceType.FOLDER)
+
+
+class RecordingStore(LocalObjectStore):
+    """Local store that remembers what delete() was told."""
+
+    def __init__(self, root):
+        super().__init__(root=root)
+        self.deletes = []
+
+    async def delete(self, key, storage=None):
+        self.deletes.append((key, storage))
+        return await super().delete(key, storage)
+
+
+async def test_released_blob_is_deleted_with_its_storage_details(client, db, current_user, tmp_path, monkeypatch):
+    store = RecordingStore(str(tmp_path))
+    monkeypatch.setattr(object_store, "_store", store)
+
+    stored = await store.put(io.BytesIO(b"%PDF notes"), "notes.pdf", "application/pdf")
+    # What a Cloudinary put reports for a PDF
+    stored.storage = {"resource_type": "raw"}
+    blob = await blob_service.register_blob(db, "c" * 64, stored)
+    pdf = Resources(
+        uploaded_by=current_user.user_id, title="notes", resource_type=ResourceType.PDF,
+        url=blob.url, blob_id=blob.id,
+    )
+    db.add(pdf)
+    await db.commit()
+
+    response = await client.delete(f"/api/resources/{pdf.id}/permanent")
+    assert response.status_code == 204
+
+    assert store.deletes == [(stored.key, {"resource_type": "raw"})]
+
+
+async def test_losing_racer_deletes_its_copy_with_storage_details(db, tmp_path, monkeypatch):
+    store = RecordingStore(str(tmp_path))
+    monkeypatch.setattr(object_store, "_store", store)
+
+    winner = await store.put(io.BytesIO(b"same"), "a.mp4", "video/mp4")
+    winner.storage = {"resource_type": "video"}
+    await blob_service.register_blob(db, "d" * 64, winner)
+
+    upload = UploadFile(io.BytesIO(b"same"), filename="b.mp4", headers=Headers({"content-type": "video/mp4"}))
+    # Both uploads missed the lookup, so the second one stores its bytes too
+    monkeypatch.setattr(blob_service, "acquire_existing", _never_found)
+    monkeypatch.setattr(blob_service, "hash_upload", _fixed_hash("d" * 64))
+
+    async def put_video(*args, **kwargs):
+        stored = await LocalObjectStore.put(store, io.BytesIO(b"same"), "b.mp4", "video/mp4")
+        stored.storage = {"resource_type": "video"}
+        return stored
+    monkeypatch.setattr(blob_service, "store_upload", put_video)
+
+    blob = await blob_service.store_deduplicated(db, upload, folder="study-resources", max_size_mb=1)
+
+    assert blob.storage_key == winner.key
+    [(deleted_key, storage)] = store.deletes
+    assert deleted_key != winner.key
+    assert storage == {"resource_type": "video"}
+
+
+async def _never_found(session, content_hash):
+    return None
+
+
+def _fixed_hash(content_hash):
+    async def hash_upload(file, max_size_mb):
+        return content_hash
+    return hash_upload
@@ -0,0 +1,80 @@
+"""Chunk summary cache: failed siblings and page edits only cost the chunks they touch."""
+
+import pytest
+from sqlalchemy import select, func
+
+from src.database.models import SummaryChunks
+from src.services import summary_service
+from src.services.llm_gateway import LLMError
+
+pytestmark = pytest.mark.anyio
+
+
+class FlakyBackend(summary_service.FakeLLMBackend):
+    """Fails every prompt containing "BAD" until healed."""
+
+    def __init__(self):
+        super().__init__(latency_seconds=0)
+        self.healed = False
+
+    async def generate(self, prompt: str) -> str:
+        if "BAD" in prompt and not self.healed:
+            self.calls += 1
+            raise LLMError("model unavailable")
+        return await super().generate(prompt)
+
+
+@pytest.fixture
+def backend(session_factory, monkeypatch):
+    monkeypatch.setattr(summary_service, "async_session_local", session_factory)
+    backend = FlakyBackend()
+    monkeypatch.setattr(summary_service, "_backend", backend)
+    return backend
+
+
+async def test_successful_chunks_survive_a_failed_sibling(db, backend):
+    prompts = ["chunk one", "chunk BAD", "chunk three"]
+
+    with pytest.raises(LLMError):
+        await summary_service._generate_cached(db, prompts)
+    # The job's own transaction goes away with the failure
+    await db.rollback()
+
+    cached = await db.execute(select(func.count()).select_from(SummaryChunks))
+    assert cached.scalar() == 2
+
+    # The retry only pays for the chunk that failed
+    backend.healed = True
+    backend.calls = 0
+    summaries = await summary_service._generate_cached(db, prompts)
+    assert backend.calls == 1
+    assert len(summaries) == 3
+
+
+def _pages(count: int) -> list:
+    return [f"Page {i}. " + " ".join(f"term{i}x{w}" for w in range(40)) for i in range(count)]
+
+
+async def test_editing_one_page_only_misses_the_chunks_around_it(db, backend):
+    pages = _pages(60)
+    before = summary_service.chunk_pages(pages, max_tokens=1000)
+    await summary_service._generate_cached(db, [summary_service.build_chunk_prompt(c) for c in before])
+    assert len(before) >= 5
+
+    edited = list(pages)
+    # Longer than before: with size-only packing every later boundary would shift
+    edited[30] = "Page 30, revised. " + " ".join(f"added{w}" for w in range(90))
+    after = summary_service.chunk_pages(edited, max_tokens=1000)
+
+    backend.calls = 0
+    await summary_service._generate_cached(db, [summary_service.build_chunk_prompt(c) for c in after])
+
+    # Only the edited page's chunk (and the next one, if its cut point moved) is regenerated
+    changed = [i for i, chunk in enumerate(after) if chunk not in before]
+    assert backend.calls == len(changed)
+    assert 1 <= len(changed) <= 2
+    assert "Page 30, revised." in after[changed[0]]
+    assert changed == list(range(changed[0], changed[0] + len(changed)))
+    # Chunks before and after the edit are byte-for-byte the same
+    assert after[:changed[0]] == before[:changed[0]]
+    assert after[changed[-1] + 1:] == before[len(before) - len(after) + changed[-1] + 1:]
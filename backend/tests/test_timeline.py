@@ -0,0 +1,58 @@
+"""Home timeline entries follow group membership."""
+
+import pytest
+from sqlalchemy import select
+
+from src.database.models import Users, Groups, Posts, PostType, TimelineEntries
+from src.services import timeline_service
+
+pytestmark = pytest.mark.anyio
+
+
+async def _seed_group(db, posts: int):
+    author = Users(user_id="author", username="author", email="author@example.com")
+    reader = Users(user_id="reader", username="reader", email="reader@example.com")
+    db.add_all([author, reader])
+    await db.flush()
+
+    group = Groups(creator_id=author.user_id, group_name="Group")
+    db.add(group)
+    await db.flush()
+
+    group_posts = [
+        Posts(user_id=author.user_id, group_id=group.id, post_type=PostType.QUESTION, title=f"Post {i}")
+        for i in range(posts)
+    ]
+    own_post = Posts(user_id=reader.user_id, group_id=group.id, post_type=PostType.QUESTION, title="Mine")
+    db.add_all(group_posts + [own_post])
+    await db.flush()
+    return reader, group, group_posts, own_post
+
+
+async def _timeline_post_ids(db, user_id):
+    result = await db.execute(select(TimelineEntries.post_id).where(TimelineEntries.user_id == user_id))
+    return set(result.scalars().all())
+
+
+async def test_joining_backfills_newest_group_posts(db, monkeypatch):
+    monkeypatch.setattr(timeline_service, "TIMELINE_BACKFILL_POSTS", 3)
+    reader, group, group_posts, own_post = await _seed_group(db, posts=5)
+
+    await timeline_service.backfill_group_posts(db, reader.user_id, group.id)
+    # Backfilling twice (e.g. rejoin) is a no-op
+    await timeline_service.backfill_group_posts(db, reader.user_id, group.id)
+
+    newest = sorted(group_posts + [own_post], key=lambda p: p.id, reverse=True)[:3]
+    assert await _timeline_post_ids(db, reader.user_id) == {p.id for p in newest}
+
+
+async def test_leaving_removes_group_posts_but_keeps_own(db):
+    reader, group, group_posts, own_post = await _seed_group(db, posts=4)
+    await timeline_service.backfill_group_posts(db, reader.user_id, group.id)
+    assert own_post.id in await _timeline_post_ids(db, reader.user_id)
+
+    await timeline_service.remove_group_posts(db, reader.user_id, group.id)
+
+    assert await _timeline_post_ids(db, reader.user_id) == {own_post.id}
+    posts, _ = await timeline_service.get_timeline(db, reader.user_id, ranked=False)
+    assert [p.id for p in posts] == [own_post.id]
@@ -390,7 +390,7 @@ const ReactionBar = ({ post, onToggleReaction, onToggleDiscussion, onShare }) =>
 );
 
 /* ── CommentItem ── */
-const CommentItem = ({ comment, currentUserId, onDeleteComment }) => (
+const CommentItem = ({ comment, currentUserId, onDeleteComment, onLoadMoreReplies }) => (
   <div style={{ background: "#fff", border: "1px solid #e2e8f0", borderRadius: 14, padding: 16 }}>
     <div style={{ display: "flex", alignItems: "flex-start", gap: 10 }}>
       <div
@@ -445,6 +445,19 @@ const CommentItem = ({ comment, currentUserId, onDeleteComment }) => (
         ))}
       </div>
     )}
+
+    {comment.reply_count > (comment.replies?.length || 0) && (
+      <button
+        onClick={() => onLoadMoreReplies(comment)}
+        style={{
+          marginTop: 8, marginLeft: 16, background: "none", border: "none",
+          cursor: "pointer", fontSize: 12, fontWeight: 600, color: "#64748b", padding: 0,
+        }}
+      >
+        View {comment.reply_count - (comment.replies?.length || 0)} more repl
+        {comment.reply_count - (comment.replies?.length || 0) === 1 ? "y" : "ies"}
+      </button>
+    )}
   </div>
 );
 
@@ -454,6 +467,7 @@ const DiscussionSection = ({
   isExpanded,
   postComments,
   isLoadingComments,
+  hasMoreComments,
   replyDraft,
   isSendingReply,
   currentUserId,
@@ -461,6 +475,8 @@ const DiscussionSection = ({
   onReplyChange,
   onSendReply,
   onDeleteComment,
+  onLoadMoreComments,
+  onLoadMoreReplies,
 }) => (
   <div style={{ marginTop: 16 }}>
     <button
@@ -507,10 +523,21 @@ const DiscussionSection = ({
                   comment={comment}
                   currentUserId={currentUserId}
                   onDeleteComment={(commentId) => onDeleteComment(post.id, commentId)}
+                  onLoadMoreReplies={(comment) => onLoadMoreReplies(post.id, comment)}
                 />
               ))
             )}
 
+            {!isLoadingComments && hasMoreComments && (
+              <button
+                className="cm-btn"
+                style={{ alignSelf: "center", padding: "6px 14px" }}
+                onClick={() => onLoadMoreComments(post.id)}
+              >
+                Load more comments
+              </button>
+            )}
+
             <div className="cm-thread-input-wrap">
               <div className="cm-avatar" style={{ width: 30, height: 30, fontSize: 10, background: "#1e293b" }}>
                 You
@@ -684,6 +711,7 @@ const PostCard = ({
   isExpanded,
   postComments,
   isLoadingComments,
+  hasMoreComments,
   replyDraft,
   isSendingReply,
   currentUserId,
@@ -694,6 +722,8 @@ const PostCard = ({
   onSendReply,
   onDeletePost,
   onDeleteComment,
+  onLoadMoreComments,
+  onLoadMoreReplies,
   onOpenProfile,
 }) => (
   <MotionArticle
@@ -737,6 +767,7 @@ const PostCard = ({
       isExpanded={isExpanded}
       postComments={postComments}
       isLoadingComments={isLoadingComments}
+      hasMoreComments={hasMoreComments}
       replyDraft={replyDraft}
       isSendingReply={isSendingReply}
       currentUserId={currentUserId}
@@ -744,6 +775,8 @@ const PostCard = ({
       onReplyChange={onReplyChange}
       onSendReply={onSendReply}
       onDeleteComment={onDeleteComment}
+      onLoadMoreComments={onLoadMoreComments}
+      onLoadMoreReplies={onLoadMoreReplies}
     />
   </MotionArticle>
 );
@@ -966,6 +999,7 @@ const Communities = () => {
 
   const [expandedPosts, setExpandedPosts] = useState([]);
   const [comments, setComments] = useState({});
+  const [commentCursors, setCommentCursors] = useState({});
   const [commentsLoading, setCommentsLoading] = useState({});
   const [replyDrafts, setReplyDrafts] = useState({});
   const [replySending, setReplySending] = useState({});
@@ -991,15 +1025,47 @@ const Communities = () => {
     try {
       const token = await getToken();
       const data = await communityService.getComments(token, postId);
-      setComments((cur) => ({ ...cur, [postId]: Array.isArray(data) ? data : [] }));
+      setComments((cur) => ({ ...cur, [postId]: Array.isArray(data?.comments) ? data.comments : [] }));
+      setCommentCursors((cur) => ({ ...cur, [postId]: data?.next_cursor || null }));
     } catch (err) {
       console.error("Failed to load comments", err);
       setComments((cur) => ({ ...cur, [postId]: [] }));
+      setCommentCursors((cur) => ({ ...cur, [postId]: null }));
     } finally {
       setCommentsLoading((cur) => ({ ...cur, [postId]: false }));
     }
   }, [getToken]);
 
+  const loadMoreComments = useCallback(async (postId) => {
+    const cursor = commentCursors[postId];
+    if (!cursor) return;
+    try {
+      const token = await getToken();
+      const data = await communityService.getComments(token, postId, { cursor });
+      setComments((cur) => ({ ...cur, [postId]: [...(cur[postId] || []), ...(data?.comments || [])] }));
+      setCommentCursors((cur) => ({ ...cur, [postId]: data?.next_cursor || null }));
+    } catch (err) {
+      console.error("Failed to load more comments", err);
+    }
+  }, [getToken, commentCursors]);
+
+  const loadMoreReplies = useCallback(async (postId, comment) => {
+    try {
+      const token = await getToken();
+      const data = await communityService.getCommentReplies(token, comment.id, { cursor: comment.replies_cursor });
+      const more = data?.replies || [];
+      setComments((cur) => ({
+        ...cur,
+        [postId]: (cur[postId] || []).map((c) => {
+          if (c.id !== comment.id) return c;
+          return { ...c, replies: [...(c.replies || []), ...more], replies_cursor: data?.next_cursor || null };
+        }),
+      }));
+    } catch (err) {
+      console.error("Failed to load replies", err);
+    }
+  }, [getToken]);
+
   const fetchPosts = useCallback(async () => {
     try {
       setLoading(true);
@@ -1330,6 +1396,7 @@ const Communities = () => {
                   isExpanded={expandedPosts.includes(post.id)}
                   postComments={comments[post.id] || []}
                   isLoadingComments={!!commentsLoading[post.id]}
+                  hasMoreComments={!!commentCursors[post.id]}
                   replyDraft={replyDrafts[post.id] || ""}
                   isSendingReply={!!replySending[post.id]}
                   currentUserId={currentUserId}
@@ -1340,6 +1407,8 @@ const Communities = () => {
                   onSendReply={handleSendReply}
                   onDeletePost={handleDeletePost}
                   onDeleteComment={handleDeleteComment}
+                  onLoadMoreComments={loadMoreComments}
+                  onLoadMoreReplies={loadMoreReplies}
                   onOpenProfile={handleOpenProfile}
                 />
               ))
@@ -130,8 +130,17 @@ export const communityService = {
   // COMMENTS
   // ========================================================================
 
-  getComments: async (token, postId) => {
-    return apiCall(`/api/community/posts/${postId}/comments`, token);
+  // One page of top-level comments with their first replies:
+  // { comments, next_cursor, has_more }
+  getComments: async (token, postId, { cursor = null, limit = 20 } = {}) => {
+    const qs = buildQueryString({ cursor, limit });
+    return apiCall(`/api/community/posts/${postId}/comments/thread${qs}`, token);
+  },
+
+  // The rest of a comment's replies: { replies, next_cursor, has_more }
+  getCommentReplies: async (token, commentId, { cursor = null, limit = 20 } = {}) => {
+    const qs = buildQueryString({ cursor, limit });
+    return apiCall(`/api/community/comments/${commentId}/replies${qs}`, token);
   },
 
   addComment: async (token, postId, { text, parentCommentId = null } = {}) => {